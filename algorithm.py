@@ -1,191 +1,178 @@
 import time
-import math
 
 from player import Player
-from visualization import PruningVisualizer
+from engine import SearchEngine
+from evaluation import open_lines
+from ponder import Ponderer
+
 
 class AIPlayer(Player):
-    def __init__(self, name, symbol, use_alpha_beta=False, visualize_pruning=False):
+    """Player that moves by game tree search. The search itself is
+    engine.SearchEngine; this class adds the console reports, the pruning
+    visualizer and the per-move history of a game."""
+    is_human = False
+
+    def __init__(self, name, symbol, use_alpha_beta=False, visualize_pruning=False,
+                 use_transposition=False, tt_size=1 << 20, tt_replacement="depth",
+                 use_symmetry=False, max_depth=None, time_limit=None, evaluator=open_lines,
+                 move_ordering=False, use_negascout=False, opening_book=None, workers=1,
+                 verbose=True, collect_stats=False, trace_path=None, candidate_radius=None,
+                 batch_eval=False, ponder=False):
         super().__init__(name, symbol)
+        self.verbose = verbose  # print per-move search reports
+        # per-move SearchStats in last_stats / stats_history
+        self.collect_stats = collect_stats
+        self.last_stats = None
+        self.stats_history = []
         self.use_alpha_beta = use_alpha_beta
         self.visualize_pruning = visualize_pruning
-        self.total_thinking_time = 0
+        # depth-limited search: iterative deepening up to max_depth plies
+        # and/or until time_limit seconds have passed
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self.last_score = None
+        self.last_result = None  # engine.SearchResult of the last move
+        tracer = None
         if visualize_pruning:
-            self.visualizer = PruningVisualizer()
+            # with a trace_path the tree is streamed to that log file
+            # instead of kept in memory, see search_trace.py; matplotlib
+            # and networkx are only imported for a visualizing player
+            if trace_path is not None:
+                from search_trace import TraceWriter
+
+                self.visualizer = TraceWriter(trace_path)
+            else:
+                from visualization import PruningVisualizer
+
+                self.visualizer = PruningVisualizer()
+            tracer = self.visualizer
+        # kept for the whole game so later moves reuse the transposition
+        # table and history scores of earlier searches
+        self.engine = SearchEngine(
+            use_alpha_beta=use_alpha_beta, use_transposition=use_transposition, tt_size=tt_size,
+            tt_replacement=tt_replacement, use_symmetry=use_symmetry, evaluator=evaluator,
+            move_ordering=move_ordering, use_negascout=use_negascout, opening_book=opening_book,
+            workers=workers, candidate_radius=candidate_radius, batch_eval=batch_eval, tracer=tracer,
+        )
+        # search the opponent's likely replies during their turn (ponder.py)
+        self.ponderer = None
+        if ponder:
+            self.ponderer = Ponderer(self.engine, symbol, max_depth, time_limit, collect_stats)
         # AI player class
 
+    # what the last search did, read from the engine
+    @property
+    def nodes_searched(self):
+        return self.engine.nodes_searched
+
+    @property
+    def transposition_table(self):
+        return self.engine.transposition_table
+
+    @property
+    def cutoffs(self):
+        return self.engine.cutoffs
+
+    @property
+    def first_move_cutoffs(self):
+        return self.engine.first_move_cutoffs
+
+    @property
+    def cutoff_sources(self):
+        return self.engine.cutoff_sources
+
+    @property
+    def aspiration_researches(self):
+        return self.engine.aspiration_researches
+
+    @property
+    def completed_depth(self):
+        return self.engine.completed_depth
+
+    @property
+    def principal_variation(self):
+        return self.engine.principal_variation
+
+    @property
+    def search_options(self):
+        return self.engine.search_options
+
     def make_move(self, board):
         print(f"{self.name} is thinking...")
-        time.sleep(1)
-        
+
         if self.visualize_pruning and self.use_alpha_beta:
             # Reset visualizer for new move
             self.visualizer.reset()
-            
+
         best_move = self.find_best_move(board)
         # function call to make move using Minimax/Alphabeta
         if self.visualize_pruning and self.use_alpha_beta:
             self.visualizer.visualize(f"{self.name} - Alpha-Beta Pruning Analysis")
         # check for visualizer mode
-            
+
         return best_move
 
-    def minimax(self, board, depth, is_maximizing):
-        winner = board.check_winner()
-        if winner == self.symbol:
-            return 10 - depth
-        elif winner is not None and winner != 'Tie':
-            return depth - 10
-        elif winner == 'Tie':
-            return 0
-        # check to see if player has won
-        
-        if is_maximizing:
-            best_score = -math.inf
-            for move in board.get_available_moves():
-                board.make_move(move, self.symbol)
-                score = self.minimax(board, depth + 1, False)
-                board.undo_move(move)
-                best_score = max(best_score, score)
-            return best_score
-        else:
-            opponent_symbol = 'X' if self.symbol == 'O' else 'O'
-            best_score = math.inf
-            for move in board.get_available_moves():
-                board.make_move(move, opponent_symbol)
-                score = self.minimax(board, depth + 1, True)
-                board.undo_move(move)
-                best_score = min(best_score, score)
-            return best_score
-        # Minimax algoritim 
-
-    def alpha_beta_pruning(self, board, depth, alpha, beta, is_maximizing, parent_node=None):
-        # Create a node for the current state if visualizing
-        current_node = None
-        if self.visualize_pruning:
-            current_node = self.visualizer.add_node(
-                board_state=str(board.grid), 
-                depth=depth, 
-                is_maximizing=is_maximizing, 
-                alpha=alpha, 
-                beta=beta, 
-                parent=parent_node
-            )
-        
-        # Terminal state evaluation
-        winner = board.check_winner()
-        if winner == self.symbol:
-            value = 10 - depth
-            if self.visualize_pruning:
-                self.visualizer.set_node_value(current_node, value)
-            return value
-        elif winner is not None and winner != 'Tie':
-            value = depth - 10
-            if self.visualize_pruning:
-                self.visualizer.set_node_value(current_node, value)
-            return value
-        elif winner == 'Tie':
-            if self.visualize_pruning:
-                self.visualizer.set_node_value(current_node, 0)
-            return 0
-        
-        # Maximizing player
-        if is_maximizing:
-            best_score = -math.inf
-            for move in board.get_available_moves():
-                board.make_move(move, self.symbol)
-                score = self.alpha_beta_pruning(board, depth + 1, alpha, beta, False, current_node)
-                board.undo_move(move)
-                best_score = max(best_score, score)
-                alpha = max(alpha, score)
-                
-                # Pruning check
-                if beta <= alpha:
-                    # Mark remaining moves as pruned
-                    if self.visualize_pruning:
-                        # Mark future possible nodes as pruned
-                        for future_move in board.get_available_moves():
-                            if future_move != move:  # Skip the move we just evaluated
-                                dummy_node = self.visualizer.add_node(
-                                    board_state=f"Pruned at {depth+1}", 
-                                    depth=depth+1, 
-                                    is_maximizing=False, 
-                                    alpha=alpha, 
-                                    beta=beta, 
-                                    parent=current_node
-                                )
-                                self.visualizer.mark_pruned(current_node, dummy_node)
-                    break
-            
-            if self.visualize_pruning:
-                self.visualizer.set_node_value(current_node, best_score)
-            return best_score
-        # Minimizing player
-        else:
-            opponent_symbol = 'X' if self.symbol == 'O' else 'O'
-            best_score = math.inf
-            for move in board.get_available_moves():
-                board.make_move(move, opponent_symbol)
-                score = self.alpha_beta_pruning(board, depth + 1, alpha, beta, True, current_node)
-                board.undo_move(move)
-                best_score = min(best_score, score)
-                beta = min(beta, score)
-                
-                # Pruning check
-                if beta <= alpha:
-                    # Mark remaining moves as pruned
-                    if self.visualize_pruning:
-                        # Mark future possible nodes as pruned
-                        for future_move in board.get_available_moves():
-                            if future_move != move:  # Skip the move we just evaluated
-                                dummy_node = self.visualizer.add_node(
-                                    board_state=f"Pruned at {depth+1}", 
-                                    depth=depth+1, 
-                                    is_maximizing=True, 
-                                    alpha=alpha, 
-                                    beta=beta, 
-                                    parent=current_node
-                                )
-                                self.visualizer.mark_pruned(current_node, dummy_node)
-                    break
-            
-            if self.visualize_pruning:
-                self.visualizer.set_node_value(current_node, best_score)
-            return best_score
-    
-    def find_best_move(self, board):
-        best_score = -math.inf
-        best_move = None
-        
-        # Root node for visualization
-        root_node = None
-        if self.visualize_pruning and self.use_alpha_beta:
-            root_node = self.visualizer.add_node(
-                board_state="Root", 
-                depth=0, 
-                is_maximizing=True, 
-                alpha=-math.inf, 
-                beta=math.inf, 
-                parent=None
-            )
-        start_time = time.time()
-        for move in board.get_available_moves():
-            board.make_move(move, self.symbol)
-            if self.use_alpha_beta:
-                score = self.alpha_beta_pruning(board, 0, -math.inf, math.inf, False, root_node)
+    def find_best_move(self, board, stoppable=False):
+        """A stoppable search raises engine.SearchTimeout once another
+        thread calls self.engine.stop()"""
+        start_time = time.perf_counter()
+        result = None
+        if self.ponderer is not None:
+            result = self.ponderer.answer(board)
+        pondered = result is not None
+        if not pondered:
+            # the engine searches a copy, the caller's board is left untouched
+            result = self.engine.search(board, self.symbol, self.max_depth, self.time_limit,
+                                        collect_stats=self.collect_stats, pv=False,
+                                        stoppable=stoppable)
+        self.last_result = result
+        self.last_score = result.score
+
+        thinking_time = time.perf_counter() - start_time
+        self.record_thinking_time(thinking_time)
+        if self.collect_stats:
+            self.last_stats = result.stats
+            self.stats_history.append(result.stats)
+        if self.verbose:
+            if result.stats.book_hit:
+                print(f"{self.name} plays {result.move} from the opening book.")
+            elif pondered:
+                print(f"{self.name} plays {result.move}, searched on the opponent's time "
+                      f"({thinking_time:.6f} seconds to answer).")
             else:
-                score = self.minimax(board, 0, False)
-            board.undo_move(move)
-            if score > best_score:
-                best_score = score
-                best_move = move
-                
+                self._report(thinking_time)
+            if self.ponderer is not None and self.ponderer.moves:
+                ponderer = self.ponderer
+                print(f"Pondering answered {ponderer.hits} of {ponderer.moves} opponent moves "
+                      f"({ponderer.hit_rate():.1%}), the predicted reply came {ponderer.predicted_hits} times.")
+        if self.ponderer is not None:
+            self.ponderer.start(board, result.move, result.pv)
+        # time tracking for move calculation
+        return result.move
+
+    def close(self):
+        """Shut down the worker processes of a parallel player and close
+        the search trace"""
+        if self.ponderer is not None:
+            self.ponderer.stop()
+        self.engine.close()
         if self.visualize_pruning:
-            self.visualizer.set_node_value(root_node, best_score)
+            from search_trace import TraceWriter
 
-        end_time = time.time()
-        thinking_time = end_time - start_time
-        self.total_thinking_time += thinking_time
+            if isinstance(self.visualizer, TraceWriter):
+                self.visualizer.close()
+
+    def _report(self, thinking_time):
         print(f"{self.total_thinking_time:.6f} seconds total to decide, {thinking_time:.6f} seconds thinking.")
-        # time tracking for move calculation
-        return best_move
+        if self.completed_depth is not None:
+            print(f"Searched {self.completed_depth} plies deep, principal variation {self.principal_variation}.")
+        if self.engine.move_ordering and self.cutoffs:
+            print(f"{self.cutoffs} cutoffs, {self.first_move_cutoffs / self.cutoffs:.1%} on the first move, "
+                  f"by heuristic {dict(self.cutoff_sources)}.")
+        if self.collect_stats and self.last_stats is not None:
+            stats = self.last_stats
+            print(f"{stats.nodes} nodes ({stats.terminal_nodes} terminal) at {stats.nodes_per_second:.0f} nodes/s, "
+                  f"{stats.max_depth} plies deep, branching factor {stats.branching_factor:.2f}.")
+        if self.transposition_table is not None:
+            tt = self.transposition_table
+            print(f"Transposition table: {tt.hits} hits, {tt.misses} misses ({tt.hit_rate():.1%}), {len(tt)} entries.")
@@ -0,0 +1,138 @@
+"""
+Vectorized evaluation of many positions at once with NumPy.
+
+A batch is an (N, cells) int8 array, one row per position with X, O or
+EMPTY in each cell (cell move - 1, the BitBoard bit order). The win lines of
+the board shape become a 0/1 matrix, so the pieces each side has on every
+line of every position are two matrix products, and the winners, the
+static evaluations or one step of N random playouts come out of a few
+whole-array operations instead of a Python loop per position.
+
+NumPy is only needed by the callers that ask for batching:
+AIPlayer(batch_eval=True) evaluates all the leaves below a frontier node in
+one call and MCTSPlayer(playout_batch=N) runs N playouts per expanded node.
+"""
+
+import numpy as np
+
+from bitboard import BitBoard, win_lines
+
+EMPTY, X, O = 0, 1, -1
+# winners() result codes, RESULTS maps them back to check_winner values
+NONE, X_WINS, O_WINS, TIE = 0, 1, 2, 3
+RESULTS = (None, 'X', 'O', 'Tie')
+
+_MATRIX_CACHE = {}
+
+
+def line_matrix(rows, cols=None, k=None):
+    """(cells, lines) float32 matrix, column j is 1 on the cells of win line j"""
+    cols = rows if cols is None else cols
+    k = min(rows, cols) if k is None else k
+    key = (rows, cols, k)
+    if key not in _MATRIX_CACHE:
+        lines = win_lines(rows, cols, k)[0]
+        matrix = np.zeros((rows * cols, len(lines)), dtype=np.float32)
+        for j, line in enumerate(lines):
+            for i in range(rows * cols):
+                if line >> i & 1:
+                    matrix[i, j] = 1
+        _MATRIX_CACHE[key] = matrix
+    return _MATRIX_CACHE[key]
+
+
+def states_from_bits(x_bits, o_bits, cells):
+    """Batch of the positions given by parallel lists of X and O bitmasks"""
+    size = (cells + 7) // 8
+
+    def unpack(masks):
+        data = np.frombuffer(b"".join(mask.to_bytes(size, "little") for mask in masks), dtype=np.uint8)
+        return np.unpackbits(data.reshape(len(masks), size), axis=1, bitorder="little")[:, :cells]
+
+    states = unpack(x_bits).astype(np.int8)
+    states -= unpack(o_bits).astype(np.int8)
+    return states
+
+
+def encode_boards(boards):
+    """Batch of Board or BitBoard positions, which must share a shape"""
+    boards = [board if isinstance(board, BitBoard) else BitBoard.from_board(board) for board in boards]
+    return states_from_bits([board.bits['X'] for board in boards],
+                            [board.bits['O'] for board in boards], boards[0].cells)
+
+
+def line_counts(states, rows, cols=None, k=None):
+    """(x, o) arrays of shape (N, lines): pieces of each side on every line"""
+    matrix = line_matrix(rows, cols, k)
+    return (states == X).astype(np.float32) @ matrix, (states == O).astype(np.float32) @ matrix
+
+
+def winners(states, rows, cols=None, k=None):
+    """Result code (NONE, X_WINS, O_WINS or TIE) of every position"""
+    cols = rows if cols is None else cols
+    k = min(rows, cols) if k is None else k
+    x_counts, o_counts = line_counts(states, rows, cols, k)
+    result = np.full(len(states), NONE, dtype=np.int8)
+    result[~(states == EMPTY).any(axis=1)] = TIE
+    result[(o_counts == k).any(axis=1)] = O_WINS
+    result[(x_counts == k).any(axis=1)] = X_WINS
+    return result
+
+
+def random_playouts(states, to_move, rows, cols=None, k=None, rng=None):
+    """Play every position of the batch to the end with uniformly random
+    moves, symbol to_move first; returns the result codes.
+
+    All N games advance one move per step: each game fills its empty cells
+    in its own random order until it is won or full.
+    """
+    cols = rows if cols is None else cols
+    k = min(rows, cols) if k is None else k
+    rng = np.random.default_rng(rng)
+    states = np.array(states, dtype=np.int8)
+    count = len(states)
+    side = np.full(count, X if to_move == 'X' else O, dtype=np.int8)
+    result = winners(states, rows, cols, k)
+    # random order of the empty cells, occupied cells sort last
+    keys = rng.random(states.shape)
+    keys[states != EMPTY] = 2.0
+    order = np.argsort(keys, axis=1)
+    for step in range(states.shape[1]):
+        active = np.flatnonzero(result == NONE)
+        if not active.size:
+            break
+        states[active, order[active, step]] = side[active]
+        side[active] = -side[active]
+        result[active] = winners(states[active], rows, cols, k)
+    return result
+
+
+def _counts(states, rows, cols, k, symbol):
+    x_counts, o_counts = line_counts(states, rows, cols, k)
+    return (x_counts, o_counts) if symbol == 'X' else (o_counts, x_counts)
+
+
+def open_lines(states, rows, cols, k, symbol):
+    """evaluation.open_lines of every position, from symbol's point of view"""
+    mine, theirs = _counts(states, rows, cols, k, symbol)
+    # 10 ** (count - 1) per piece count, 0 for an empty line
+    weights = np.array([0] + [10.0 ** (count - 1) for count in range(1, k + 1)])
+    mine = mine.astype(np.intp)
+    theirs = theirs.astype(np.intp)
+    score = (weights[mine] * (theirs == 0)).sum(axis=1) - (weights[theirs] * (mine == 0)).sum(axis=1)
+    bound = mine.shape[1] * 10 ** (k - 2) + 1
+    return score / bound
+
+
+def line_count(states, rows, cols, k, symbol):
+    """evaluation.line_count of every position, from symbol's point of view"""
+    mine, theirs = _counts(states, rows, cols, k, symbol)
+    score = ((mine > 0) & (theirs == 0)).sum(axis=1) - ((theirs > 0) & (mine == 0)).sum(axis=1)
+    return score / (mine.shape[1] + 1)
+
+
+# batch version of each evaluation.EVALUATORS entry
+BATCH_EVALUATORS = {
+    "open_lines": open_lines,
+    "line_count": line_count,
+}
@@ -0,0 +1,342 @@
+"""
+Benchmark suite with a fixed position corpus and regression thresholds.
+
+Every search engine searches every corpus position (openings, midgames and
+near-terminal positions on 3x3, 4x4 and 5x5) with a fresh SearchEngine.
+For each pair the suite records the move, score, nodes, nodes per second,
+wall time (best of --repeats) and the peak memory traced during one more
+run, checks that all engines agree on the move and score of every
+position, and writes the results as JSON.
+
+The engines answering from a table (opening book, retrograde solved table)
+only run on positions searched to the end of a size their table covers;
+the solved table has no distance to the end, so it only has to agree on
+win, draw or loss. MCTS is not exact and is timed separately: its moves
+are recorded but not compared, only its time counts.
+
+    python bench_suite.py --out bench_results.json
+    python bench_suite.py --baseline bench_results.json --out new.json --max-slowdown 1.2
+
+With --baseline the results are compared with an earlier run: a pair that
+searched more nodes or used more memory than the thresholds allow, or
+changed its move or score, is a regression, and so is an engine whose
+total time over the corpus (or a single search of at least --min-time
+seconds) got slower than --max-slowdown allows. The exit status is
+1 on any regression or disagreement between engines.
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+from bitboard import BitBoard
+
+# name, board size, moves played from the empty board (X first), max_depth
+# (None searches to the end). The depths keep minimax within seconds.
+CORPUS = (
+    ("3x3-opening", 3, (), None),
+    ("3x3-midgame", 3, (1, 5, 9), None),
+    ("3x3-endgame", 3, (1, 5, 9, 3, 7), None),
+    ("4x4-opening", 4, (6, 11), 4),
+    ("4x4-midgame", 4, (6, 11, 7, 10, 1, 16), 5),
+    ("4x4-endgame", 4, (6, 11, 7, 10, 1, 16, 4, 13), None),
+    ("5x5-opening", 5, (13,), 3),
+    ("5x5-midgame", 5, (13, 7, 19, 9, 17, 1), 3),
+    ("5x5-endgame", 5, (13, 7, 19, 9, 17, 1, 25, 5, 21, 3, 23, 11), 4),
+)
+
+# SearchEngine options of every engine; all of them are exact, so they
+# must agree on every position they run on
+ENGINES = {
+    "minimax": {},
+    "alpha_beta_pruning": {"use_alpha_beta": True},
+    "alpha_beta_tt": {"use_alpha_beta": True, "use_transposition": True, "use_symmetry": True,
+                      "move_ordering": True},
+    "negascout": {"use_negascout": True},
+    "negascout_tt": {"use_negascout": True, "use_transposition": True, "move_ordering": True},
+    "negascout_batch": {"use_negascout": True, "use_transposition": True, "move_ordering": True,
+                        "batch_eval": True},
+    # root moves split over two worker processes
+    "negascout_parallel": {"use_negascout": True, "use_transposition": True, "move_ordering": True,
+                           "workers": 2},
+    "negascout_book": {"use_negascout": True, "use_transposition": True, "move_ordering": True},
+    "negascout_solved": {"use_negascout": True, "use_transposition": True, "move_ordering": True},
+}
+# what an engine needs besides the search: an optional package (the engine
+# is skipped when it is missing), or a table (opening_book.py's book or
+# retrograde.py's solved table) for the position's board size
+ENGINE_REQUIRES = {
+    "negascout_batch": {"module": "numpy"},
+    "negascout_book": {"table": "book"},
+    "negascout_solved": {"table": "solved"},
+}
+# win, draw or loss must match, the scores don't
+OUTCOME_ONLY = {"negascout_solved"}
+# node counts depend on which worker finishes first, and the peak memory
+# is only the calling process's
+VARIABLE_NODES = {"negascout_parallel"}
+
+# MCTSPlayer options, timed on every corpus position
+MCTS_ENGINES = {
+    "mcts": {"simulations": 2000},
+}
+
+MAX_SLOWDOWN = 1.25  # wall time ratio against the baseline
+MAX_NODE_INCREASE = 1.0  # node counts are deterministic
+MAX_MEMORY_INCREASE = 1.25
+# seconds; a faster search is only timed as part of its engine's total
+# over the corpus, alone its timings are mostly scheduler noise
+MIN_TIME = 0.05
+
+
+def corpus_position(size, moves):
+    """(BitBoard, side to move) after moves"""
+    board = BitBoard(size)
+    symbol = 'X'
+    for move in moves:
+        board.make_move(move, symbol)
+        symbol = 'O' if symbol == 'X' else 'X'
+    return board, symbol
+
+
+def available_engines(names=None):
+    engines = {}
+    for name in names or ENGINES:
+        if name not in ENGINES:
+            continue
+        requirement = ENGINE_REQUIRES.get(name, {}).get("module")
+        if requirement is not None:
+            try:
+                __import__(requirement)
+            except ImportError:
+                print(f"Skipping {name}: {requirement} is not installed")
+                continue
+        engines[name] = ENGINES[name]
+    return engines
+
+
+_tables = {}
+
+
+def _table(kind, size):
+    """The opening book or solved table for size, None if there is none"""
+    if (kind, size) not in _tables:
+        if kind == "book":
+            from opening_book import OpeningBook
+
+            table = OpeningBook.load_default(size)
+        else:
+            from retrograde import SolvedTable
+
+            table = SolvedTable.load_default(size)
+        if table is None:
+            print(f"No {kind} table for {size}x{size}, its {kind} engine is skipped there")
+        _tables[(kind, size)] = table
+    return _tables[(kind, size)]
+
+
+def engine_options(name, size, max_depth):
+    """SearchEngine options of engine name for a corpus position, None
+    where the engine doesn't apply"""
+    options = ENGINES[name]
+    kind = ENGINE_REQUIRES.get(name, {}).get("table")
+    if kind is None:
+        return options
+    # a table answer is exact, a depth-limited search's is not
+    table = _table(kind, size) if max_depth is None else None
+    return None if table is None else dict(options, opening_book=table)
+
+
+def outcome(score):
+    return 1 if score >= 1 else -1 if score <= -1 else 0
+
+
+def measure(options, board, symbol, max_depth, repeats=3):
+    """One engine on one position: the result of its fastest run and the
+    peak memory of a traced run, each with a new engine"""
+    from engine import SearchEngine
+
+    best = None
+    for _ in range(repeats):
+        engine = SearchEngine(**options)
+        start = time.perf_counter()
+        result = engine.search(board, symbol, max_depth, pv=False)
+        seconds = time.perf_counter() - start
+        engine.close()
+        if best is None or seconds < best[0]:
+            best = (seconds, result)
+    seconds, result = best
+
+    tracemalloc.start()
+    engine = SearchEngine(**options)
+    engine.search(board, symbol, max_depth, pv=False)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    engine.close()
+    return {
+        "move": result.move,
+        "score": result.score,
+        "nodes": result.stats.nodes,
+        "wall_time_s": round(seconds, 6),
+        "nodes_per_second": round(result.stats.nodes / seconds) if seconds > 0 else None,
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def measure_mcts(options, board, symbol, repeats=3):
+    """One MCTS player on one position, the fastest of repeats runs"""
+    from mcts import MCTSPlayer
+
+    best = None
+    for seed in range(repeats):
+        player = MCTSPlayer("MCTS", symbol, seed=seed, verbose=False, reuse_tree=False, **options)
+        start = time.perf_counter()
+        move = player.find_best_move(board)
+        seconds = time.perf_counter() - start
+        player.close()
+        if best is None or seconds < best[0]:
+            best = (seconds, move, player.playouts)
+    seconds, move, playouts = best
+    return {
+        "move": move,
+        "playouts": playouts,
+        "wall_time_s": round(seconds, 6),
+        "playouts_per_second": round(playouts / seconds) if seconds > 0 else None,
+    }
+
+
+def run_suite(engine_names=None, sizes=(3, 4, 5), repeats=3, progress=True):
+    engines = available_engines(engine_names)
+    mcts_engines = {name: options for name, options in MCTS_ENGINES.items()
+                    if engine_names is None or name in engine_names}
+    results = []
+    mcts_results = []
+    disagreements = []
+    start = time.perf_counter()
+    for name, size, moves, max_depth in CORPUS:
+        if size not in sizes:
+            continue
+        board, symbol = corpus_position(size, moves)
+        answers = {}
+        for engine_name in engines:
+            options = engine_options(engine_name, size, max_depth)
+            if options is None:
+                continue
+            entry = {"position": name, "engine": engine_name, "size": size, "moves": list(moves),
+                     "side": symbol, "max_depth": max_depth}
+            entry.update(measure(options, board, symbol, max_depth, repeats))
+            results.append(entry)
+            answers[engine_name] = (entry["move"], round(entry["score"], 9))
+            if progress:
+                print(f"{name:12} {engine_name:20} move {entry['move']:2} score {entry['score']:8.4f} "
+                      f"{entry['nodes']:9} nodes {entry['wall_time_s']:9.4f}s "
+                      f"{entry['peak_memory_kb']:9.1f}KB")
+        exact = {answer for engine, answer in answers.items() if engine not in OUTCOME_ONLY}
+        outcomes = {outcome(score) for _, score in answers.values()}
+        if len(exact) > 1 or len(outcomes) > 1:
+            disagreements.append({"position": name, "answers": {engine: {"move": move, "score": score}
+                                                                for engine, (move, score) in answers.items()}})
+        for engine_name, options in mcts_engines.items():
+            entry = {"position": name, "engine": engine_name, "size": size, "moves": list(moves),
+                     "side": symbol}
+            entry.update(measure_mcts(options, board, symbol, repeats))
+            mcts_results.append(entry)
+            if progress:
+                print(f"{name:12} {engine_name:20} move {entry['move']:2} {entry['playouts']:15} playouts "
+                      f"{entry['wall_time_s']:9.4f}s")
+    return {
+        "config": {"engines": list(engines), "mcts": list(mcts_engines), "sizes": list(sizes),
+                   "repeats": repeats, "python": sys.version.split()[0]},
+        "wall_time_s": round(time.perf_counter() - start, 3),
+        "results": results,
+        "mcts": mcts_results,
+        "disagreements": disagreements,
+    }
+
+
+def compare(report, baseline, max_slowdown=MAX_SLOWDOWN, max_node_increase=MAX_NODE_INCREASE,
+            max_memory_increase=MAX_MEMORY_INCREASE, min_time=MIN_TIME):
+    """Regressions of report against baseline, one message each"""
+    regressions = []
+    for entry, old in _pairs(report["results"], baseline["results"]):
+        pair = f"{entry['position']} {entry['engine']}"
+        if (entry["move"], round(entry["score"], 9)) != (old["move"], round(old["score"], 9)):
+            regressions.append(f"{pair}: result changed from move {old['move']} score {old['score']} "
+                               f"to move {entry['move']} score {entry['score']}")
+        if entry["engine"] in VARIABLE_NODES:
+            continue
+        if entry["nodes"] > old["nodes"] * max_node_increase:
+            regressions.append(f"{pair}: {entry['nodes']} nodes, was {old['nodes']}")
+        if entry["peak_memory_kb"] > old["peak_memory_kb"] * max_memory_increase:
+            regressions.append(f"{pair}: {entry['peak_memory_kb']}KB peak, was {old['peak_memory_kb']}KB")
+    # MCTS only counts by its time
+    for results, old_results in ((report["results"], baseline["results"]),
+                                 (report.get("mcts", []), baseline.get("mcts", []))):
+        regressions += _slowdowns(_pairs(results, old_results), max_slowdown, min_time)
+    return regressions
+
+
+def _pairs(results, old_results):
+    """(entry, baseline entry) for the positions and engines in both runs"""
+    previous = {(entry["position"], entry["engine"]): entry for entry in old_results}
+    return [(entry, previous[(entry["position"], entry["engine"])]) for entry in results
+            if (entry["position"], entry["engine"]) in previous]
+
+
+def _slowdowns(pairs, max_slowdown, min_time):
+    regressions = []
+    totals = {}  # engine -> [seconds, baseline seconds] over the positions in both runs
+    for entry, old in pairs:
+        total = totals.setdefault(entry["engine"], [0.0, 0.0])
+        total[0] += entry["wall_time_s"]
+        total[1] += old["wall_time_s"]
+        if old["wall_time_s"] >= min_time and entry["wall_time_s"] > old["wall_time_s"] * max_slowdown:
+            regressions.append(f"{entry['position']} {entry['engine']}: {entry['wall_time_s']:.4f}s, "
+                               f"was {old['wall_time_s']:.4f}s ({entry['wall_time_s'] / old['wall_time_s']:.2f}x)")
+    for engine, (seconds, old_seconds) in totals.items():
+        if seconds > old_seconds * max_slowdown:
+            regressions.append(f"{engine}: {seconds:.4f}s over the corpus, was {old_seconds:.4f}s "
+                               f"({seconds / old_seconds:.2f}x)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--engines", nargs="+", choices=sorted(ENGINES) + sorted(MCTS_ENGINES), default=None)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[3, 4, 5])
+    parser.add_argument("--repeats", type=int, default=3, help="timed runs per search, the fastest counts")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--baseline", default=None, help="results of an earlier run to compare with")
+    parser.add_argument("--max-slowdown", type=float, default=MAX_SLOWDOWN)
+    parser.add_argument("--max-node-increase", type=float, default=MAX_NODE_INCREASE)
+    parser.add_argument("--max-memory-increase", type=float, default=MAX_MEMORY_INCREASE)
+    parser.add_argument("--min-time", type=float, default=MIN_TIME,
+                        help="shortest search whose own slowdown counts, shorter ones only count in the totals")
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.engines, tuple(args.sizes), args.repeats)
+    failed = False
+    for disagreement in report["disagreements"]:
+        failed = True
+        print(f"DISAGREEMENT on {disagreement['position']}: {disagreement['answers']}")
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.max_slowdown, args.max_node_increase,
+                              args.max_memory_increase, args.min_time)
+        report["baseline"] = args.baseline
+        report["regressions"] = regressions
+        for regression in regressions:
+            failed = True
+            print(f"REGRESSION {regression}")
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"{len(report['results']) + len(report['mcts'])} searches in {report['wall_time_s']}s, results written to {args.out}"
+          + (", FAILED" if failed else ""))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
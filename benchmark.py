@@ -0,0 +1,722 @@
+"""
+Benchmarks for the search components.
+
+Run with `python benchmark.py` to print every benchmark, or import the
+individual bench_* functions.
+"""
+
+import contextlib
+import io
+import sys
+import time
+
+from board import Board
+from bitboard import BitBoard
+
+
+class RescanBoard:
+    """The original list-of-lists Board, frozen as the baseline: square,
+    size in a row wins and check_winner rescans every line"""
+
+    def __init__(self, size=3):
+        self.size = size
+        self.grid = [[' ' for _ in range(size)] for _ in range(size)]
+
+    def is_valid_move(self, move):
+        row = (move - 1) // self.size
+        col = (move - 1) % self.size
+        return self.grid[row][col] == ' '
+
+    def make_move(self, move, symbol):
+        row = (move - 1) // self.size
+        col = (move - 1) % self.size
+        if self.is_valid_move(move):
+            self.grid[row][col] = symbol
+            return True
+        return False
+
+    def check_winner(self):
+        for row in self.grid:
+            if row.count(row[0]) == self.size and row[0] != ' ':
+                return row[0]
+        for col in range(self.size):
+            if all(self.grid[row][col] == self.grid[0][col] != ' ' for row in range(self.size)):
+                return self.grid[0][col]
+        if all(self.grid[i][i] == self.grid[0][0] != ' ' for i in range(self.size)):
+            return self.grid[0][0]
+        if all(self.grid[i][self.size-1-i] == self.grid[0][self.size-1] != ' ' for i in range(self.size)):
+            return self.grid[0][self.size-1]
+        if all(cell != ' ' for row in self.grid for cell in row):
+            return 'Tie'
+        return None
+
+    def get_available_moves(self):
+        return [i * self.size + j + 1 for i in range(self.size) for j in range(self.size) if self.grid[i][j] == ' ']
+
+    def undo_move(self, move):
+        row = (move - 1) // self.size
+        col = (move - 1) % self.size
+        self.grid[row][col] = ' '
+
+
+def perft(board, symbol, depth=None):
+    """Count every node of the game tree below board, the same
+    make_move / check_winner / get_available_moves / undo_move loop
+    the AI search runs"""
+    nodes = 1
+    if board.check_winner() is not None or depth == 0:
+        return nodes
+    other = 'O' if symbol == 'X' else 'X'
+    next_depth = None if depth is None else depth - 1
+    for move in board.get_available_moves():
+        board.make_move(move, symbol)
+        nodes += perft(board, other, next_depth)
+        board.undo_move(move)
+    return nodes
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+# builds the players of the mode in argv[1] in a fresh interpreter and
+# prints its peak resident memory
+_STARTUP_SCRIPT = """
+import resource, sys
+import game
+game.create_players(sys.argv[1], 3)
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def _import_profile(stderr):
+    """(total microseconds, {module: cumulative microseconds}) of the
+    top-level imports in -X importtime output"""
+    total = 0
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):
+            total += int(cumulative)
+            modules[name.strip()] = int(cumulative)
+    return total, modules
+
+
+def bench_startup(modes=("1", "2", "3", "5", "8"), repeats=3):
+    """Cold start of game.py per game mode: a new interpreter imports game
+    and builds the mode's players. Wall time, import time (-X importtime)
+    and peak RSS, with the heaviest imports"""
+    import os
+    import subprocess
+
+    names = {"1": "Human vs Human", "2": "Human vs Minimax", "3": "Human vs Alpha-Beta",
+             "4": "Minimax vs Alpha-Beta", "5": "Human vs Gemini", "6": "Minimax vs Gemini",
+             "7": "Alpha-Beta vs Gemini", "8": "Human vs visualized Alpha-Beta",
+             "9": "Minimax vs visualized Alpha-Beta"}
+    print(f"Startup per game mode (best of {repeats})")
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for mode in modes:
+        runs = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            process = subprocess.run([sys.executable, "-X", "importtime", "-c", _STARTUP_SCRIPT, mode],
+                                     cwd=directory, capture_output=True, text=True)
+            runs.append((time.perf_counter() - start, process))
+        seconds, process = min(runs, key=lambda run: run[0])
+        if process.returncode != 0:
+            error = process.stderr.strip().splitlines()[-1]
+            print(f"  {mode}. {names[mode]}: failed ({error})")
+            continue
+        import_us, modules = _import_profile(process.stderr)
+        heaviest = sorted((name for name in modules if name not in ("site", "encodings")),
+                          key=modules.get, reverse=True)[:3]
+        rss_mb = int(process.stdout.split()[-1]) / 1024
+        print(f"  {mode}. {names[mode]}: {seconds * 1000:.0f}ms, imports {import_us / 1000:.1f}ms, "
+              f"{rss_mb:.1f}MB peak RSS, heaviest "
+              + ", ".join(f"{name} {modules[name] / 1000:.1f}ms" for name in heaviest))
+
+
+def bench_board(cases=((3, (), None), (4, (1, 6, 11), 5), (5, (1, 7, 13), 4))):
+    """Compare the original rescanning board (RescanBoard), the incremental
+    Board and BitBoard on full tree walks.
+
+    Each case is (size, opening moves, perft depth); depth None walks to the
+    end of the game.
+    """
+    print("RescanBoard vs Board vs BitBoard (perft)")
+    board_classes = (RescanBoard, Board, BitBoard)
+    for size, opening, depth in cases:
+        times = {}
+        nodes = None
+        for board_class in board_classes:
+            board = board_class(size)
+            symbol = 'X'
+            for move in opening:
+                board.make_move(move, symbol)
+                symbol = 'O' if symbol == 'X' else 'X'
+            nodes, times[board_class.__name__] = _timed(perft, board, symbol, depth)
+        baseline = times['RescanBoard']
+        print(f"  {size}x{size} depth={depth or 'full'}: {nodes} nodes, "
+              + ", ".join(f"{name} {seconds:.3f}s ({baseline / seconds:.1f}x)" for name, seconds in times.items()))
+
+
+def bench_k_in_a_row(rows=15, cols=15, k=5, opening=(113, 112, 114, 99), depth=2):
+    """Tree walks on a gomoku board: Board and BitBoard over every empty
+    cell, and BitBoard over the cells next to a stone only"""
+    print(f"{rows}x{cols}, {k} in a row (perft depth {depth})")
+    for board_class in (Board, BitBoard):
+        board = board_class(rows=rows, cols=cols, k=k)
+        symbol = 'X'
+        for move in opening:
+            board.make_move(move, symbol)
+            symbol = 'O' if symbol == 'X' else 'X'
+        nodes, seconds = _timed(perft, board, symbol, depth)
+        print(f"  {board_class.__name__}, all empty cells: {nodes} nodes in {seconds:.3f}s "
+              f"({nodes / seconds:.0f} nodes/s)")
+
+    def near_perft(board, symbol, depth):
+        nodes = 1
+        if board.check_winner() is not None or depth == 0:
+            return nodes
+        other = 'O' if symbol == 'X' else 'X'
+        for move in board.candidate_moves():
+            board.make_move(move, symbol)
+            nodes += near_perft(board, other, depth - 1)
+            board.undo_move(move)
+        return nodes
+
+    nodes, seconds = _timed(near_perft, board, symbol, depth + 1)
+    print(f"  BitBoard, cells next to a stone, depth {depth + 1}: {nodes} nodes in {seconds:.3f}s "
+          f"({nodes / seconds:.0f} nodes/s)")
+
+
+def _position(size, moves, first='X'):
+    board = BitBoard(size)
+    symbol = first
+    for move in moves:
+        board.make_move(move, symbol)
+        symbol = 'O' if symbol == 'X' else 'X'
+    return board, symbol
+
+
+def _quiet_best_move(player, board):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return player.find_best_move(board)
+
+
+def bench_transposition(cases=((3, ()), (4, (1, 6, 11, 16, 2, 3)), (4, (6, 11, 1, 16)))):
+    """Time alpha-beta with and without the transposition table"""
+    from algorithm import AIPlayer
+
+    print("Alpha-beta with/without transposition table")
+    for size, moves in cases:
+        board, symbol = _position(size, moves)
+        for use_tt in (False, True):
+            player = AIPlayer("bench", symbol, use_alpha_beta=True, use_transposition=use_tt)
+            move, seconds = _timed(_quiet_best_move, player, board)
+            line = f"  {size}x{size} {list(moves)} tt={use_tt}: move {move} in {seconds:.3f}s"
+            if use_tt:
+                tt = player.transposition_table
+                line += f" ({tt.hits} hits, {tt.misses} misses)"
+            print(line)
+
+
+def bench_symmetry(cases=((3, ()), (4, (6, 11, 7, 10)), (5, (13, 7, 19, 9, 17, 1, 25, 5, 21, 3, 23)))):
+    """Node counts of alpha-beta + transposition table with and without
+    symmetry canonicalization"""
+    from algorithm import AIPlayer
+
+    print("Symmetry canonicalization (alpha-beta + transposition table)")
+    for size, moves in cases:
+        board, symbol = _position(size, moves)
+        nodes = {}
+        for use_symmetry in (False, True):
+            player = AIPlayer("bench", symbol, use_alpha_beta=True, use_transposition=True,
+                              use_symmetry=use_symmetry)
+            move, seconds = _timed(_quiet_best_move, player, board)
+            nodes[use_symmetry] = player.nodes_searched
+            print(f"  {size}x{size} {list(moves)} symmetry={use_symmetry}: move {move}, "
+                  f"{player.nodes_searched} nodes in {seconds:.3f}s")
+        print(f"  -> {nodes[False] / nodes[True]:.1f}x fewer nodes")
+
+
+def bench_iterative_deepening(sizes=(4, 5), time_limit=1.0):
+    """Depth reached from the empty board within a per-move time budget"""
+    from algorithm import AIPlayer
+
+    print(f"Iterative deepening ({time_limit}s per move)")
+    for size in sizes:
+        board, symbol = _position(size, ())
+        player = AIPlayer("bench", symbol, use_alpha_beta=True, use_transposition=True,
+                          use_symmetry=True, time_limit=time_limit)
+        move, seconds = _timed(_quiet_best_move, player, board)
+        print(f"  {size}x{size}: move {move} in {seconds:.3f}s, depth {player.completed_depth}, "
+              f"{player.nodes_searched} nodes, pv {player.principal_variation}")
+
+
+def bench_move_ordering(cases=((3, ()), (4, (6, 11, 7, 10))),
+                        orderings=(False, True, ("static",), ("tactics",), ("killers",), ("history",))):
+    """Plain alpha-beta with each move ordering heuristic on its own and all
+    together: nodes, cutoffs, share of cutoffs on the first move tried and
+    which heuristic ordered the cutting move"""
+    from algorithm import AIPlayer
+
+    print("Move ordering (plain alpha-beta)")
+    for size, moves in cases:
+        board, symbol = _position(size, moves)
+        for ordering in orderings:
+            player = AIPlayer("bench", symbol, use_alpha_beta=True, move_ordering=ordering)
+            move, seconds = _timed(_quiet_best_move, player, board)
+            first = player.first_move_cutoffs / player.cutoffs if player.cutoffs else 0
+            print(f"  {size}x{size} {list(moves)} ordering={ordering}: move {move}, "
+                  f"{player.nodes_searched} nodes in {seconds:.3f}s, {player.cutoffs} cutoffs "
+                  f"({first:.1%} first move) {dict(player.cutoff_sources)}")
+
+
+ENGINE_CASES = (
+    (3, ()),
+    (4, (6, 11, 7, 10, 1, 16, 4, 13)),
+    (5, (13, 7, 19, 9, 17, 1, 25, 5, 21, 3, 23, 11, 15, 2, 24)),
+)
+
+ENGINES = (
+    ("minimax", {}),
+    ("alpha-beta", {"use_alpha_beta": True}),
+    ("negascout", {"use_negascout": True}),
+    ("negascout+tt+ordering", {"use_negascout": True, "use_transposition": True, "move_ordering": True}),
+)
+
+
+def bench_engines(cases=ENGINE_CASES, engines=ENGINES):
+    """Nodes and wall time of every search engine on 3x3, 4x4 and 5x5, and
+    whether they all pick the same move"""
+    from algorithm import AIPlayer
+
+    print("Search engines")
+    for size, moves in cases:
+        board, symbol = _position(size, moves)
+        chosen = set()
+        for name, options in engines:
+            player = AIPlayer("bench", symbol, **options)
+            move, seconds = _timed(_quiet_best_move, player, board)
+            chosen.add(move)
+            print(f"  {size}x{size} {name}: move {move}, {player.nodes_searched} nodes in {seconds:.3f}s")
+        print(f"  -> {'same move' if len(chosen) == 1 else 'DIFFERENT moves ' + str(sorted(chosen))}")
+
+
+def bench_engine_api(size=4, positions=200, max_depth=3, seed=0):
+    """Searches per second through engine.search on position encodings: a
+    new engine per call (the module level search()) against one engine
+    kept across calls, as a service would"""
+    from engine import SearchEngine, search
+
+    options = dict(use_negascout=True, use_transposition=True, move_ordering=True, tt_size=1 << 16)
+    encodings = []
+    for board in _random_positions(size, positions * 3, seed):
+        if board.check_winner() is None and len(encodings) < positions:
+            side = 'X' if board.bits['X'].bit_count() == board.bits['O'].bit_count() else 'O'
+            encodings.append((board.encode(), side))
+
+    print(f"Engine API ({len(encodings)} {size}x{size} positions, depth {max_depth})")
+    moves, seconds = _timed(lambda: [search(e, side, max_depth, **options).move for e, side in encodings])
+    print(f"  search(): {len(encodings) / seconds:.0f} searches/s")
+    engine = SearchEngine(**options)
+    kept, seconds = _timed(lambda: [engine.search(e, side, max_depth, pv=False).move for e, side in encodings])
+    print(f"  one SearchEngine: {len(encodings) / seconds:.0f} searches/s, "
+          f"{'same moves' if kept == moves else 'DIFFERENT moves'}")
+
+
+def bench_opening_book(lookups=10000):
+    """3x3 book lookup against a full negascout search of the same move"""
+    from algorithm import AIPlayer
+    from opening_book import build_dense_book
+
+    print("3x3 opening book")
+    book, seconds = _timed(build_dense_book, 3)
+    print(f"  built in {seconds:.3f}s")
+    board, symbol = _position(3, ())
+    player = AIPlayer("bench", symbol, use_negascout=True, use_transposition=True, move_ordering=True)
+    move, search_seconds = _timed(_quiet_best_move, player, board)
+    start = time.perf_counter()
+    for _ in range(lookups):
+        book_move, _ = book.lookup(board, symbol)
+    lookup_seconds = (time.perf_counter() - start) / lookups
+    print(f"  empty board: search {move} in {search_seconds * 1000:.3f}ms, "
+          f"book {book_move} in {lookup_seconds * 1e6:.2f}us")
+
+
+def bench_retrograde(size=4, workers=1, lookups=2000, positions=20, seed=0):
+    """Solve the 4x4 table into a temporary file, then a table lookup
+    against a full negascout search of the same midgame positions"""
+    import os
+    import tempfile
+    from engine import search
+    from retrograde import SolvedTable, solve
+
+    print(f"Retrograde {size}x{size} solver ({workers} workers)")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "solved.bin")
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, seconds = _timed(solve, size, path, workers)
+        print(f"  solved in {seconds:.1f}s ({os.path.getsize(path) / 1e6:.1f}MB)")
+        table = SolvedTable.load(path)
+        boards = [board for board in _random_positions(size, positions * 4, seed)
+                  if board.check_winner() is None and board.empty_count() <= 10][:positions]
+        sides = ['X' if board.bits['X'].bit_count() == board.bits['O'].bit_count() else 'O' for board in boards]
+        results, search_seconds = _timed(lambda: [
+            search(board, side, use_negascout=True, use_transposition=True, move_ordering=True, pv=False)
+            for board, side in zip(boards, sides)])
+        start = time.perf_counter()
+        for _ in range(lookups // len(boards)):
+            answers = [table.lookup(board, side) for board, side in zip(boards, sides)]
+        lookup_seconds = (time.perf_counter() - start) / (lookups // len(boards) * len(boards))
+        agree = sum((answer[1] > 0) - (answer[1] < 0) == (result.score > 0) - (result.score < 0)
+                    for answer, result in zip(answers, results))
+        print(f"  {len(boards)} positions with 10 or fewer empty cells: search {search_seconds / len(boards) * 1000:.1f}ms, "
+              f"lookup {lookup_seconds * 1e6:.0f}us a move, {agree}/{len(boards)} same result")
+
+
+def bench_parallel(size=4, moves=(6, 11, 7, 10), worker_counts=(2, 4)):
+    """Root-split parallel alpha-beta against the serial alpha_beta_pruning
+    path on a 4x4 midgame"""
+    from algorithm import AIPlayer
+
+    print(f"Parallel root split ({size}x{size} {list(moves)})")
+    board, symbol = _position(size, moves)
+    serial = AIPlayer("bench", symbol, use_alpha_beta=True)
+    move, serial_seconds = _timed(_quiet_best_move, serial, board)
+    print(f"  serial: move {move}, {serial.nodes_searched} nodes in {serial_seconds:.3f}s")
+    for workers in worker_counts:
+        player = AIPlayer("bench", symbol, use_alpha_beta=True, workers=workers)
+        # the first search starts the pool, process startup isn't search time
+        _quiet_best_move(player, board)
+        move, seconds = _timed(_quiet_best_move, player, board)
+        player.close()
+        print(f"  {workers} workers: move {move}, {player.nodes_searched} nodes in {seconds:.3f}s "
+              f"({serial_seconds / seconds:.2f}x speedup)")
+
+
+def bench_mcts(cases=((3, 20), (4, 6)), simulations=2000, time_limit=0.5):
+    """MCTSPlayer against alpha-beta AIPlayer: playout speed, then games
+    from both sides (4x4: both players get time_limit seconds a move)"""
+    from bitboard import BitBoard
+    from mcts import MCTSPlayer
+    from tournament import play_game, summarize
+
+    print("Monte Carlo tree search")
+    for size in (3, 4):
+        player = MCTSPlayer("bench", 'X', simulations=simulations, seed=0, verbose=False)
+        _, seconds = _timed(player.find_best_move, BitBoard(size))
+        print(f"  {size}x{size} empty board: {player.playouts} playouts in {seconds:.3f}s "
+              f"({player.playouts / seconds:.0f} playouts/s)")
+    player = MCTSPlayer("bench", 'X', simulations=simulations * 8, workers=4, seed=0, verbose=False)
+    player.find_best_move(BitBoard(4))  # starts the pool
+    _, seconds = _timed(player.find_best_move, BitBoard(4))
+    player.close()
+    print(f"  4x4 root-parallel, 4 workers: {player.playouts} playouts in {seconds:.3f}s "
+          f"({player.playouts / seconds:.0f} playouts/s)")
+    for size, games in cases:
+        results = [play_game(size, *pair, seed, 1, time_limit)
+                   for seed in range(games // 2)
+                   for pair in (("mcts", "alphabeta-tt"), ("alphabeta-tt", "mcts"))]
+        for name, entry in summarize(results).items():
+            print(f"  {size}x{size} {name}: {entry['wins']} wins, {entry['draws']} draws, "
+                  f"{entry['losses']} losses, median move {entry['latency_p50_ms']}ms")
+
+
+def _allocations_per_call(operation, targets):
+    """(blocks, bytes) still allocated per call after operation(target) on
+    every target, with the results kept alive"""
+    import gc
+    import tracemalloc
+
+    gc.collect()
+    gc.disable()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        results = [operation(target) for target in targets]
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+        gc.enable()
+    diff = after.compare_to(before, "filename")
+    blocks = sum(stat.count_diff for stat in diff) - 1  # the results list
+    size = sum(stat.size_diff for stat in diff) - sys.getsizeof(results)
+    return blocks / len(targets), size / len(targets)
+
+
+def bench_allocations(shapes=((3, 3, 3), (4, 4, 4), (15, 15, 5)), calls=2000, cases=((4, 5), (5, 4))):
+    """Memory allocated by the search core, measured with tracemalloc:
+    blocks and bytes left behind per make_move and per move generation
+    (a new list from get_available_moves, nothing from moves_into filling
+    a ply's reused buffer), then the peak traced memory of alpha-beta
+    searches, which holds everything live along the deepest path"""
+    import tracemalloc
+    from algorithm import AIPlayer
+
+    print("Allocations (tracemalloc)")
+    for rows, cols, k in shapes:
+        def position():
+            board = BitBoard(rows=rows, cols=cols, k=k)
+            board.make_move(1, 'X')
+            return board
+
+        boards = [position() for _ in range(calls)]
+        buffer = [0] * boards[0].cells
+        made = _allocations_per_call(lambda board: board.make_move(2, 'O'), boards)
+        listed = _allocations_per_call(BitBoard.get_available_moves, boards)
+        filled = _allocations_per_call(lambda board: board.moves_into(buffer), boards)
+        print(f"  {rows}x{cols} k={k}: make_move {made[0]:.1f} blocks {made[1]:.0f}B, "
+              f"get_available_moves {listed[0]:.1f} blocks {listed[1]:.0f}B, "
+              f"moves_into {filled[0]:.1f} blocks {filled[1]:.0f}B")
+    for size, depth in cases:
+        player = AIPlayer("bench", 'X', use_alpha_beta=True, max_depth=depth, verbose=False)
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        player.find_best_move(BitBoard(size))
+        peak = tracemalloc.get_traced_memory()[1] - base
+        tracemalloc.stop()
+        _, seconds = _timed(player.find_best_move, BitBoard(size))
+        print(f"  {size}x{size} alpha-beta depth {depth}: {player.nodes_searched} nodes, "
+              f"peak {peak / 1024:.1f}KiB, {seconds / player.nodes_searched * 1e6:.2f}us per node")
+
+
+def _random_positions(size, count, seed=0):
+    """count BitBoards reached by random moves, some of them finished games"""
+    import random
+
+    rng = random.Random(seed)
+    positions = []
+    for _ in range(count):
+        board = BitBoard(size)
+        symbol = 'X'
+        for _ in range(rng.randrange(size * size + 1)):
+            if board.check_winner() is not None:
+                break
+            board.make_move(rng.choice(board.get_available_moves()), symbol)
+            symbol = 'O' if symbol == 'X' else 'X'
+        positions.append(board)
+    return positions
+
+
+def bench_batch_eval(sizes=(3, 4, 5), positions=20000, playouts=20000, gomoku_depth=3):
+    """NumPy batches (batch_eval.py) against the scalar BitBoard code:
+    winners and open_lines of random positions, random playouts from the
+    empty board, and depth-limited negascout with and without batched leaves"""
+    import batch_eval
+    from algorithm import AIPlayer
+    from evaluation import open_lines
+    from mcts import MCTSPlayer
+
+    print(f"NumPy batch evaluation ({positions} positions)")
+    for size in sizes:
+        boards = _random_positions(size, positions)
+        encodings = [board.encode() for board in boards]
+        _, built = _timed(lambda: [board.check_winner() for board in boards])
+        _, rebuilt = _timed(lambda: [BitBoard.from_encoding(e).check_winner() for e in encodings])
+        states, packed = _timed(batch_eval.encode_boards, boards)
+        _, batched = _timed(batch_eval.winners, states, size)
+        print(f"  {size}x{size} winners: check_winner {positions / built:,.0f}/s on built boards, "
+              f"{positions / rebuilt:,.0f}/s from encodings; batch {positions / batched:,.0f}/s "
+              f"({positions / (batched + packed):,.0f}/s with packing)")
+        _, scalar = _timed(lambda: [open_lines(board, 'X') for board in boards])
+        _, batched = _timed(batch_eval.open_lines, states, size, size, size, 'X')
+        print(f"  {size}x{size} open_lines: scalar {positions / scalar:,.0f}/s, "
+              f"batch {positions / batched:,.0f}/s ({scalar / batched:.1f}x)")
+        start = BitBoard(size)
+        _, scalar = _timed(lambda: [_random_playout(start, 'X') for _ in range(playouts // 10)])
+        scalar *= 10
+        empty = batch_eval.encode_boards([start]).repeat(playouts, axis=0)
+        _, batched = _timed(batch_eval.random_playouts, empty, 'X', size, None, None, 0)
+        print(f"  {size}x{size} playouts: scalar {playouts / scalar:,.0f}/s, "
+              f"batch {playouts / batched:,.0f}/s ({scalar / batched:.1f}x)")
+        rates = []
+        for playout_batch in (1, 32):
+            player = MCTSPlayer("bench", 'X', time_limit=0.5, playout_batch=playout_batch, seed=0, verbose=False)
+            _, seconds = _timed(player.find_best_move, start)
+            rates.append(player.playouts / seconds)
+        print(f"  {size}x{size} MCTSPlayer: {rates[0]:,.0f} playouts/s, "
+              f"playout_batch=32 {rates[1]:,.0f} playouts/s")
+
+    board = BitBoard(rows=15, cols=15, k=5)
+    symbol = 'X'
+    for move in (113, 112, 114, 99):
+        board.make_move(move, symbol)
+        symbol = 'O' if symbol == 'X' else 'X'
+    times = {}
+    for batch in (False, True):
+        player = AIPlayer("bench", symbol, use_alpha_beta=True, use_negascout=True, use_transposition=True,
+                          move_ordering=True, max_depth=gomoku_depth, candidate_radius=1,
+                          batch_eval=batch, verbose=False)
+        move, times[batch] = _timed(player.find_best_move, board)
+    print(f"  15x15 k=5 negascout depth {gomoku_depth}: move {move}, scalar leaves {times[False]:.3f}s, "
+          f"batched leaves {times[True]:.3f}s ({times[False] / times[True]:.1f}x)")
+
+
+def _random_playout(board, symbol):
+    """Scalar random playout, the one MCTSPlayer runs per simulation"""
+    import random
+
+    moves = board.get_available_moves()
+    random.shuffle(moves)
+    played = []
+    winner = board.check_winner()
+    for move in moves:
+        if winner is not None:
+            break
+        board.make_move(move, symbol)
+        played.append(move)
+        symbol = 'O' if symbol == 'X' else 'X'
+        winner = board.check_winner()
+    for move in reversed(played):
+        board.undo_move(move)
+    return winner
+
+
+async def _gemini_game(player, seed):
+    """One game of player against random moves, player moving second"""
+    import random
+
+    rng = random.Random(seed)
+    board = BitBoard(3)
+    symbol = 'X'
+    while board.check_winner() is None:
+        if symbol == player.symbol:
+            move = await player.make_move_async(board)
+        else:
+            move = rng.choice(board.get_available_moves())
+        board.make_move(move, symbol)
+        symbol = 'O' if symbol == 'X' else 'X'
+
+
+def bench_move_server(size=4, positions=100, requests=1000, concurrency=16, max_depth=3, workers=2):
+    """move_server over a Unix socket: a cold run that fills the cache,
+    then the same load again against the warm cache"""
+    import asyncio
+    import os
+    import tempfile
+    from move_server import MoveServer, run_load, sample_positions
+
+    print(f"Move server ({requests} requests on {positions} {size}x{size} positions, "
+          f"{concurrency} clients, {workers} workers, depth {max_depth})")
+    encodings = sample_positions(size, positions)
+
+    async def run(path):
+        server = MoveServer(workers=workers, max_depth=max_depth, time_limit=None)
+        await server.start(path=path)
+        try:
+            for label in ("cold", "warm"):
+                report = await run_load(encodings, requests, concurrency, path=path)
+                print(f"  {label}: {report['requests_per_s']:.0f} requests/s, "
+                      f"p50 {report['latency_p50_ms']:.2f}ms, p99 {report['latency_p99_ms']:.2f}ms, "
+                      f"{report['sources']}")
+        finally:
+            await server.close()
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(os.path.join(directory, "moves.sock")))
+
+
+def bench_pondering(cases=((3, None, 0.2), (4, 0.1, 1.0)), games=3):
+    """AIPlayer as O against a random opponent that takes opponent_delay
+    seconds a move without holding the GIL, like a human at input():
+    the AI's thinking time with and without pondering, and how often the
+    opponent's move had been pondered"""
+    import random
+    from algorithm import AIPlayer
+
+    print("Pondering")
+    for size, time_limit, opponent_delay in cases:
+        thinking = {}
+        for ponder in (False, True):
+            total = 0.0
+            hits = moves = 0
+            for game in range(games):
+                rng = random.Random(game)
+                player = AIPlayer("bench", 'O', use_negascout=True, use_transposition=True, move_ordering=True,
+                                  time_limit=time_limit, ponder=ponder, verbose=False)
+                board = Board(size)
+                symbol = 'X'
+                while board.check_winner() is None:
+                    if symbol == 'X':
+                        time.sleep(opponent_delay)
+                        move = rng.choice(board.get_available_moves())
+                    else:
+                        move = player.find_best_move(board)
+                    board.make_move(move, symbol)
+                    symbol = 'O' if symbol == 'X' else 'X'
+                player.close()
+                total += player.total_thinking_time
+                if ponder:
+                    hits += player.ponderer.hits
+                    moves += player.ponderer.moves
+            thinking[ponder] = total / games
+        print(f"  {size}x{size} ({opponent_delay}s opponent): {thinking[False]:.3f}s thinking a game, "
+              f"{thinking[True]:.3f}s pondering ({thinking[False] / thinking[True]:.1f}x), "
+              f"{hits} of {moves} replies pondered")
+
+
+def bench_gemini_batching(games=32, delay=0.05, per_board_delay=0.002):
+    """Gemini requests of many games against the offline stub model: one
+    request per move, one game at a time (the plain GeminiPlayer path)
+    against concurrent games sharing a BatchDispatcher"""
+    import asyncio
+    from gemini_batch import BatchDispatcher
+    from gemini_player import GeminiPlayer
+    from gemini_stub import StubModel
+
+    print(f"Gemini batching ({games} games, stub model {delay * 1000:.0f}ms per call)")
+
+    def player(model, dispatcher=None):
+        return GeminiPlayer("bench", 'O', model=model, local_fallback=False, dispatcher=dispatcher)
+
+    async def sequential(model):
+        for game in range(games):
+            await _gemini_game(player(model), game)
+
+    async def concurrent(model, dispatcher):
+        await asyncio.gather(*(_gemini_game(player(model, dispatcher), game) for game in range(games)))
+
+    model = StubModel(delay, per_board_delay=per_board_delay, seed=0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        _, base_seconds = _timed(asyncio.run, sequential(model))
+    base_moves = model.requests
+    print(f"  one request per move: {base_moves} moves in {base_seconds:.3f}s "
+          f"({base_moves / base_seconds:.0f} moves/s)")
+    for label, options in (("multi-board prompts", {"batch_prompts": True}),
+                           ("concurrent requests", {"batch_prompts": False, "max_concurrency": 8,
+                                                    "rate_limit": 200})):
+        model = StubModel(delay, per_board_delay=per_board_delay, seed=0)
+        dispatcher = BatchDispatcher(model, **options)
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, seconds = _timed(asyncio.run, concurrent(model, dispatcher))
+        moves = dispatcher.requests
+        print(f"  {label}: {moves} moves in {model.requests} calls, {seconds:.3f}s "
+              f"({moves / seconds:.0f} moves/s, {base_seconds / seconds:.1f}x), "
+              f"at most {model.max_in_flight} calls in flight")
+
+
+if __name__ == "__main__":
+    bench_startup()
+    bench_board()
+    bench_allocations()
+    bench_k_in_a_row()
+    bench_transposition()
+    bench_symmetry()
+    bench_iterative_deepening()
+    bench_move_ordering()
+    bench_engines()
+    bench_engine_api()
+    bench_opening_book()
+    bench_retrograde()
+    bench_parallel()
+    bench_mcts()
+    bench_pondering()
+    bench_batch_eval()
+    bench_move_server()
+    bench_gemini_batching()
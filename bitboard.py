@@ -0,0 +1,344 @@
+"""
+Bitboard implementation of the tic-tac-toe board.
+
+Each side is stored as one integer bitmask (bit ``move - 1`` is set when that
+side owns cell ``move``). The win lines for every board shape are precomputed
+once, so make_move only has to test the few lines through the placed cell and
+check_winner / the tie check are O(1).
+
+Boards can be rows x cols with k in a row to win (BitBoard(rows=15, cols=15,
+k=5) is gomoku); the default is the classic size x size board where a line
+must span the whole board. The empty cells are kept in a linked list that
+make_move / undo_move update in place; moves_into() writes them to a
+caller's buffer so a search can reuse one move list per ply, and
+candidate_moves() narrows them to the cells near the stones already placed
+for boards too big to search every move.
+
+BitBoard exposes the same API as board.Board (size, grid, current_player,
+is_valid_move, make_move, undo_move, check_winner, get_available_moves,
+display) so it can be handed to Player, GeminiPlayer and the visualizer.
+
+The position also carries a Zobrist hash that make_move / undo_move keep up
+to date with one xor per stone, for transposition table lookups. With
+track_symmetry=True the hash of all 8 symmetric images of the position is
+kept as well, and canonical_hash() (their minimum) is the same for every
+position in a symmetry class.
+"""
+
+import random
+from operator import xor
+
+from symmetry import symmetries
+
+SYMBOLS = ('X', 'O')
+
+_LINE_CACHE = {}
+_ZOBRIST_CACHE = {}
+_SYMMETRY_KEY_CACHE = {}
+_EDGE_CACHE = {}
+
+
+def win_lines(rows, cols=None, k=None):
+    """Return (lines, lines_through) bitmasks for a rows x cols board with k
+    in a row (cols defaults to rows, k to the shorter side, which for a
+    square board gives the classic full-length lines).
+
+    lines is a tuple with one mask per run of k cells along a row, column
+    or diagonal. lines_through[i] holds the masks of every line that passes
+    through bit i.
+    """
+    cols = rows if cols is None else cols
+    k = min(rows, cols) if k is None else k
+    key = (rows, cols, k)
+    if key not in _LINE_CACHE:
+        lines = []
+        for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            for r in range(rows):
+                for c in range(cols):
+                    end_r = r + dr * (k - 1)
+                    end_c = c + dc * (k - 1)
+                    if 0 <= end_r < rows and 0 <= end_c < cols:
+                        lines.append(sum(1 << ((r + dr * i) * cols + c + dc * i) for i in range(k)))
+
+        lines_through = tuple(
+            tuple(line for line in lines if line >> i & 1)
+            for i in range(rows * cols)
+        )
+        _LINE_CACHE[key] = (tuple(lines), lines_through)
+    return _LINE_CACHE[key]
+
+
+def zobrist_keys(rows, cols=None):
+    """Return {symbol: tuple of one random 64-bit key per cell} for a board
+    shape.
+
+    Seeded, so hashes are stable between runs and processes.
+    """
+    cols = rows if cols is None else cols
+    key = (rows, cols)
+    if key not in _ZOBRIST_CACHE:
+        rng = random.Random(rows if rows == cols else f"{rows}x{cols}")
+        _ZOBRIST_CACHE[key] = {
+            symbol: tuple(rng.getrandbits(64) for _ in range(rows * cols))
+            for symbol in SYMBOLS
+        }
+    return _ZOBRIST_CACHE[key]
+
+
+def symmetry_keys(rows, cols=None):
+    """Return {symbol: per cell, the tuple of Zobrist keys of that cell's
+    image under each symmetry}"""
+    cols = rows if cols is None else cols
+    key = (rows, cols)
+    if key not in _SYMMETRY_KEY_CACHE:
+        keys = zobrist_keys(rows, cols)
+        perms = symmetries(rows, cols)
+        _SYMMETRY_KEY_CACHE[key] = {
+            symbol: tuple(
+                tuple(keys[symbol][perm[i]] for perm in perms)
+                for i in range(rows * cols)
+            )
+            for symbol in SYMBOLS
+        }
+    return _SYMMETRY_KEY_CACHE[key]
+
+
+class BitBoard:
+    __slots__ = ("rows", "cols", "k", "size", "cells", "full_mask", "lines", "lines_through", "zobrist",
+                 "hash", "track_symmetry", "symmetry_keys", "hashes", "bits", "occupied", "winner",
+                 "history", "current_player", "_next", "_prev", "_win_ply")
+
+    def __init__(self, size=3, track_symmetry=False, rows=None, cols=None, k=None):
+        self.rows = size if rows is None else rows
+        self.cols = self.rows if cols is None else cols
+        self.k = min(self.rows, self.cols) if k is None else k
+        # size is only meaningful for square boards
+        self.size = self.rows if self.rows == self.cols else None
+        self.cells = self.rows * self.cols
+        self.full_mask = (1 << self.cells) - 1
+        self.lines, self.lines_through = win_lines(self.rows, self.cols, self.k)
+        self.zobrist = zobrist_keys(self.rows, self.cols)
+        self.hash = 0
+        self.track_symmetry = track_symmetry
+        if track_symmetry:
+            self.symmetry_keys = symmetry_keys(self.rows, self.cols)
+            self.hashes = (0,) * len(symmetries(self.rows, self.cols))
+        self.bits = {'X': 0, 'O': 0}
+        self.occupied = 0
+        self.winner = None
+        self._win_ply = 0  # len(history) when the winner appeared, None if unknown
+        self.history = []  # moves played, in order
+        # the empty cells as a linked list in ascending order, 0 and cells + 1
+        # are the ends; a move unlinks its cell and undo relinks it, so
+        # move generation walks it without building anything
+        self._next = list(range(1, self.cells + 2))
+        self._prev = list(range(-1, self.cells + 1))
+        self.current_player = None
+
+    @classmethod
+    def from_board(cls, board, track_symmetry=False):
+        """Build a BitBoard holding the same position as any Board-like object"""
+        bitboard = cls(track_symmetry=track_symmetry, rows=board.rows, cols=board.cols, k=board.k)
+        for i, row in enumerate(board.grid):
+            for j, cell in enumerate(row):
+                if cell != ' ':
+                    bitboard.make_move(i * board.cols + j + 1, cell)
+        bitboard.current_player = board.current_player
+        return bitboard
+
+    @classmethod
+    def from_encoding(cls, encoding, track_symmetry=False):
+        """Inverse of encode()"""
+        rows, cols, k, x_bits, o_bits = encoding
+        bitboard = cls(track_symmetry=track_symmetry, rows=rows, cols=cols, k=k)
+        for symbol, bits in (('X', x_bits), ('O', o_bits)):
+            while bits:
+                low = bits & -bits
+                bitboard.make_move(low.bit_length(), symbol)
+                bits ^= low
+        return bitboard
+
+    def encode(self):
+        """Compact, hashable and picklable snapshot of the position"""
+        return (self.rows, self.cols, self.k, self.bits['X'], self.bits['O'])
+
+    def copy(self):
+        return BitBoard.from_encoding(self.encode(), self.track_symmetry)
+
+    @property
+    def grid(self):
+        x_bits = self.bits['X']
+        o_bits = self.bits['O']
+        grid = []
+        for r in range(self.rows):
+            row = []
+            for c in range(self.cols):
+                i = r * self.cols + c
+                if x_bits >> i & 1:
+                    row.append('X')
+                elif o_bits >> i & 1:
+                    row.append('O')
+                else:
+                    row.append(' ')
+            grid.append(row)
+        return grid
+
+    def canonical_hash(self):
+        """Zobrist hash shared by all symmetric images of the position"""
+        return min(self.hashes)
+
+    def empty_count(self):
+        return self.cells - len(self.history)
+
+    def is_valid_move(self, move):
+        return not self.occupied >> (move - 1) & 1
+
+    def make_move(self, move, symbol):
+        bit = 1 << (move - 1)
+        if self.occupied & bit:
+            return False
+        history = self.history
+        history.append(move)
+        bits = self.bits[symbol] | bit
+        self.bits[symbol] = bits
+        self.occupied |= bit
+        self.hash ^= self.zobrist[symbol][move - 1]
+        if self.track_symmetry:
+            self.hashes = tuple(map(xor, self.hashes, self.symmetry_keys[symbol][move - 1]))
+        nxt = self._next
+        prv = self._prev
+        nxt[prv[move]] = nxt[move]
+        prv[nxt[move]] = prv[move]
+        if self.winner is None:
+            # only lines through the new stone can have been completed
+            for line in self.lines_through[move - 1]:
+                if bits & line == line:
+                    self.winner = symbol
+                    self._win_ply = len(history)
+                    break
+        return True
+
+    def undo_move(self, move):
+        bit = 1 << (move - 1)
+        if not self.occupied & bit:
+            return
+        history = self.history
+        symbol = 'X' if self.bits['X'] & bit else 'O'
+        self.bits[symbol] ^= bit
+        self.occupied ^= bit
+        self.hash ^= self.zobrist[symbol][move - 1]
+        if self.track_symmetry:
+            self.hashes = tuple(map(xor, self.hashes, self.symmetry_keys[symbol][move - 1]))
+        if history[-1] == move:
+            history.pop()
+            nxt = self._next
+            prv = self._prev
+            nxt[prv[move]] = move
+            prv[nxt[move]] = move
+            if self.winner is not None:
+                if self._win_ply is None:
+                    self._rescan()
+                elif self._win_ply > len(history):
+                    self.winner = None
+            return
+        # out of order undo: drop the move, then replay the unlinking of
+        # the rest so later undos find the links they expect
+        history.remove(move)
+        nxt = self._next = list(range(1, self.cells + 2))
+        prv = self._prev = list(range(-1, self.cells + 1))
+        for played in history:
+            nxt[prv[played]] = nxt[played]
+            prv[nxt[played]] = prv[played]
+        self._rescan()
+
+    def _rescan(self):
+        self.winner = self._scan_winner()
+        # the ply it was completed at is lost, undo rescans until then
+        self._win_ply = None if self.winner is not None else 0
+
+    def _scan_winner(self):
+        for symbol in SYMBOLS:
+            bits = self.bits[symbol]
+            for line in self.lines:
+                if bits & line == line:
+                    return symbol
+        return None
+
+    def check_winner(self):
+        if self.winner is not None:
+            return self.winner
+        if self.occupied == self.full_mask:
+            return 'Tie'
+        return None
+
+    def get_available_moves(self):
+        moves = []
+        nxt = self._next
+        end = self.cells + 1
+        move = nxt[0]
+        while move != end:
+            moves.append(move)
+            move = nxt[move]
+        return moves
+
+    def moves_into(self, buffer):
+        """Write the empty cells in ascending order to the front of buffer
+        (a list of at least cells entries) and return how many there are"""
+        nxt = self._next
+        end = self.cells + 1
+        count = 0
+        move = nxt[0]
+        while move != end:
+            buffer[count] = move
+            count += 1
+            move = nxt[move]
+        return count
+
+    def _near(self, bits):
+        # bits grown by one cell in all 8 directions, without wrapping
+        # around the left and right edges
+        edges = _EDGE_CACHE.get((self.rows, self.cols))
+        if edges is None:
+            first = sum(1 << (r * self.cols) for r in range(self.rows))
+            last = first << (self.cols - 1)
+            edges = _EDGE_CACHE[(self.rows, self.cols)] = (self.full_mask ^ first, self.full_mask ^ last)
+        not_first, not_last = edges
+        row = bits | (bits << 1) & not_first | (bits >> 1) & not_last
+        return (row | row << self.cols | row >> self.cols) & self.full_mask
+
+    def candidate_moves(self, radius=1):
+        """Empty cells within radius cells (any direction) of a stone, in
+        ascending order; the centre on an empty board"""
+        moves = [0] * self.cells
+        return moves[:self.candidates_into(moves, radius)]
+
+    def candidates_into(self, buffer, radius=1):
+        """candidate_moves written to the front of buffer, like moves_into"""
+        if not self.occupied:
+            buffer[0] = (self.rows // 2) * self.cols + self.cols // 2 + 1
+            return 1
+        near = self.occupied
+        for _ in range(radius):
+            near = self._near(near)
+        free = near & ~self.occupied
+        count = 0
+        while free:
+            low = free & -free
+            buffer[count] = low.bit_length()
+            count += 1
+            free ^= low
+        return count
+
+    def display(self):
+        max_width = len(str(self.cells))
+        cell_width = max(max_width, 3)
+        for i, row in enumerate(self.grid):
+            display_row = []
+            for j, cell in enumerate(row):
+                if cell == ' ':
+                    display_row.append(str(i * self.cols + j + 1).rjust(cell_width))
+                else:
+                    display_row.append(cell.center(cell_width))
+            print(' | '.join(display_row))
+            if i < self.rows - 1:
+                print('-' * (self.cols * (cell_width + 3) - 1))
@@ -0,0 +1,105 @@
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+_CELL_CACHE = {}
+
+
+def cell_index(rows, cols):
+    """Tuple of (row, col) for every move number, index 0 unused"""
+    if (rows, cols) not in _CELL_CACHE:
+        _CELL_CACHE[(rows, cols)] = (None,) + tuple((r, c) for r in range(rows) for c in range(cols))
+    return _CELL_CACHE[(rows, cols)]
+
+
+class Board:
+    __slots__ = ("rows", "cols", "k", "size", "cells", "cell_index", "grid", "current_player",
+                 "empty", "winner", "history")
+
+    def __init__(self, size=3, rows=None, cols=None, k=None):
+        # rows x cols cells, k in a row wins; Board(3) is classic tic-tac-toe
+        # and Board(rows=15, cols=15, k=5) gomoku
+        self.rows = size if rows is None else rows
+        self.cols = self.rows if cols is None else cols
+        self.k = min(self.rows, self.cols) if k is None else k
+        self.size = self.rows if self.rows == self.cols else None
+        self.cells = self.rows * self.cols
+        self.cell_index = cell_index(self.rows, self.cols)
+        self.grid = [[' ' for _ in range(self.cols)] for _ in range(self.rows)]
+        self.current_player = None
+        self.empty = set(range(1, self.cells + 1))
+        self.winner = None
+        self.history = []  # (move, winner before the move)
+        # grid size
+    def is_valid_move(self, move):
+        return move in self.empty
+        # checks to see if move is valid
+    def make_move(self, move, symbol):
+        if self.is_valid_move(move):
+            row, col = self.cell_index[move]
+            self.grid[row][col] = symbol
+            self.empty.discard(move)
+            self.history.append((move, self.winner))
+            # only lines through the new stone can have been completed
+            if self.winner is None and self._wins(row, col, symbol):
+                self.winner = symbol
+            return True
+        return False
+        # changes printed grid to show moves made
+    def _wins(self, row, col, symbol):
+        # k in a row through (row, col) in any direction
+        for dr, dc in DIRECTIONS:
+            count = 1
+            for sign in (1, -1):
+                r, c = row + sign * dr, col + sign * dc
+                while 0 <= r < self.rows and 0 <= c < self.cols and self.grid[r][c] == symbol:
+                    count += 1
+                    r += sign * dr
+                    c += sign * dc
+            if count >= self.k:
+                return True
+        return False
+
+    def check_winner(self):
+        if self.winner is not None:
+            return self.winner
+
+        # check tie
+        if not self.empty:
+            return 'Tie'
+
+        return None
+
+    def display(self):
+        max_width = len(str(self.cells))
+        cell_width = max(max_width, 3)  # Ensure at least 3 spaces for X and O centering
+        for i, row in enumerate(self.grid):
+            display_row = []
+            for j, cell in enumerate(row):
+                if cell == ' ':
+                    num = str(i * self.cols + j + 1)
+                    display_row.append(num.rjust(cell_width))  # right justify the number
+                else:
+                    display_row.append(cell.center(cell_width))  # center the X or O with consistent width
+            print(' | '.join(display_row))
+            if i < self.rows - 1:  # don't print divider after the last row
+                print('-' * (self.cols * (cell_width + 3) - 1))
+
+    def get_available_moves(self):
+        return sorted(self.empty)
+
+    def undo_move(self, move):
+        row, col = self.cell_index[move]
+        if self.grid[row][col] == ' ':
+            return
+        self.grid[row][col] = ' '
+        self.empty.add(move)
+        if self.history and self.history[-1][0] == move:
+            _, self.winner = self.history.pop()
+            return
+        # out of order undo: rescan every stone
+        self.history = [entry for entry in self.history if entry[0] != move]
+        self.winner = None
+        for r in range(self.rows):
+            for c in range(self.cols):
+                if self.grid[r][c] != ' ' and self._wins(r, c, self.grid[r][c]):
+                    self.winner = self.grid[r][c]
+                    return
@@ -0,0 +1,923 @@
+"""
+Game tree search, independent of any player or user interface.
+
+SearchEngine holds the search options and the tables that are worth keeping
+between searches (transposition table, history heuristic, worker pool), and
+search() runs one search for whichever side is to move:
+
+    engine = SearchEngine(use_negascout=True, use_transposition=True, move_ordering=True)
+    result = engine.search((3, 3, 3, 0b000010001, 0b000000100), 'X')
+    result.move, result.score, result.pv, result.stats
+
+Positions can be BitBoard.encode() tuples (rows, cols, k, X bits, O bits),
+BitBoards or Boards; the caller's board is never modified. Nothing here
+prints or sleeps. The module level search() builds a throwaway engine for
+one call; a long running caller (a service, a batch job) should keep one
+SearchEngine per thread or process so its tables carry over. Table entries
+are keyed on the side to move and hold that side's score, so one engine
+can answer for either side of any position.
+
+Scores are from the side to move's point of view: win_score - ply for a
+win, ply - win_score for a loss, 0 for a draw and the evaluator's value in
+(-1, 1) at the frontier of a depth-limited search.
+"""
+
+import math
+import time
+from collections import Counter
+
+from bitboard import BitBoard
+from evaluation import open_lines
+from opening_book import OpeningBook, position_code
+from search_stats import SearchStats
+from symmetry import unique_moves
+from transposition import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+
+# xored into the Zobrist hash when O is to move: the same stones with the
+# other side to move are a different position
+O_TO_MOVE_KEY = 0x9E3779B97F4A7C15
+
+
+# a bound on the opponent's score is the opposite bound on ours
+_FLIPPED = {EXACT: EXACT, LOWER_BOUND: UPPER_BOUND, UPPER_BOUND: LOWER_BOUND}
+
+# move ordering heuristics, in priority order
+ORDERING_HEURISTICS = ("tactics", "killers", "history", "static")
+# sort keys: the previous iteration's best move, then immediate wins,
+# forced blocks, killer moves, history score and finally the static prior
+PV_BONUS = 1 << 40
+WIN_BONUS = 1 << 36
+BLOCK_BONUS = 1 << 32
+KILLER_BONUS = 1 << 28
+
+# width of the null windows used by principal variation search, far below
+# the gap between two distinct scores (heuristic scores included)
+NULL_WINDOW = 1e-6
+# half width of the root aspiration window around the expected score
+ASPIRATION_WINDOW = 2
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the per-move time budget runs out"""
+
+
+def to_bitboard(position, track_symmetry=False):
+    """A new BitBoard holding position: an encode() tuple, a BitBoard or a
+    Board"""
+    if isinstance(position, tuple):
+        return BitBoard.from_encoding(position, track_symmetry)
+    if isinstance(position, BitBoard):
+        return BitBoard.from_encoding(position.encode(), track_symmetry)
+    return BitBoard.from_board(position, track_symmetry)
+
+
+class SearchResult:
+    __slots__ = ("move", "score", "pv", "depth", "stats")
+
+    def __init__(self, move, score, pv, depth, stats):
+        self.move = move
+        self.score = score
+        self.pv = pv  # expected line of play, starting with move
+        self.depth = depth  # plies of the last completed iteration, None for a full search
+        self.stats = stats
+
+    def as_dict(self):
+        return {"move": self.move, "score": self.score, "pv": list(self.pv),
+                "depth": self.depth, "stats": self.stats.as_dict()}
+
+    def __repr__(self):
+        return f"SearchResult(move={self.move}, score={self.score}, pv={self.pv}, depth={self.depth})"
+
+
+class SearchEngine:
+    def __init__(self, use_alpha_beta=False, use_transposition=False, tt_size=1 << 20,
+                 tt_replacement="depth", use_symmetry=False, evaluator=open_lines,
+                 move_ordering=False, use_negascout=False, opening_book=None, workers=1,
+                 candidate_radius=None, batch_eval=False, tracer=None):
+        # what a worker process needs to rebuild the same engine
+        self.search_options = dict(
+            use_alpha_beta=use_alpha_beta, use_transposition=use_transposition,
+            tt_size=tt_size, tt_replacement=tt_replacement, use_symmetry=use_symmetry,
+            evaluator=evaluator, move_ordering=move_ordering, use_negascout=use_negascout,
+            candidate_radius=candidate_radius, batch_eval=batch_eval,
+        )
+        # only search empty cells within this many cells of a stone, for
+        # big k-in-a-row boards (None searches every empty cell)
+        self.candidate_radius = candidate_radius
+        # root moves are split across this many processes when > 1
+        self.workers = workers
+        self._parallel = None
+        self.use_alpha_beta = use_alpha_beta
+        # negamax with principal variation search, replaces minimax/alpha-beta
+        self.use_negascout = use_negascout
+        self.aspiration_researches = 0
+        self._aspiration_guess = None
+        # receives every alpha-beta node (PruningVisualizer or TraceWriter)
+        self.tracer = tracer
+        self.win_score = 10
+        self.use_symmetry = use_symmetry
+        self.side = None  # side to move at the root of the current search
+        self.nodes_searched = 0
+        # True loads solved_NxN.bin or else book_NxN.bin for the board size
+        # (the 3x3 book is built on first use), or pass an OpeningBook or
+        # retrograde.SolvedTable
+        self.opening_book = opening_book
+        self._books = {}
+        # depth-limited search: iterative deepening up to max_depth plies
+        # and/or until time_limit seconds have passed, scoring the frontier
+        # with evaluator(board, symbol)
+        self.max_depth = None
+        self.time_limit = None
+        self.evaluator = evaluator
+        # batch_eval scores all the leaves below a node one ply above the
+        # depth limit with one NumPy call (batch_eval.py)
+        self._batch_evaluator = None
+        if batch_eval:
+            from batch_eval import BATCH_EVALUATORS
+            self._batch_evaluator = BATCH_EVALUATORS.get(evaluator.__name__)
+            if self._batch_evaluator is None:
+                raise ValueError(f"no batch version of evaluator {evaluator.__name__}")
+        self.completed_depth = None
+        self.principal_variation = []
+        self._depth_limit = None
+        self._deadline = None
+        # set by stop() from another thread to abort a stoppable search
+        self.stop_requested = False
+        self._pv_moves = {}
+        # per search SearchStats, None unless collecting so the search only
+        # pays a None check per node
+        self.stats = None
+        # move ordering for alpha-beta: True for every heuristic or a
+        # collection of names from ORDERING_HEURISTICS
+        if move_ordering is True:
+            move_ordering = ORDERING_HEURISTICS
+        self.move_ordering = frozenset(move_ordering or ())
+        unknown = self.move_ordering - set(ORDERING_HEURISTICS)
+        if unknown:
+            raise ValueError(f"unknown move ordering heuristics: {sorted(unknown)}")
+        self.killers = []  # per ply, the last two moves that caused a cutoff
+        self._move_stack = []
+        self.history_table = {}  # symbol -> per move cutoff score, kept between searches
+        # pruning statistics of the last search
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.cutoff_sources = Counter()
+        # kept between searches so later moves reuse earlier ones
+        self.transposition_table = None
+        if use_transposition:
+            self.transposition_table = TranspositionTable(tt_size, tt_replacement)
+
+    def search(self, position, side, max_depth=None, time_limit=None, collect_stats=False, pv=True,
+               stoppable=False):
+        """Best move for side ('X' or 'O') to move in position, as a
+        SearchResult. max_depth and/or time_limit (seconds) make it a
+        depth-limited iterative deepening search; collect_stats fills the
+        per-node counters of result.stats (nodes and timings are always
+        there). A full-depth search finds its principal variation by
+        searching every position along it, pv=False skips that and
+        returns the move alone. A stoppable search raises SearchTimeout
+        soon after another thread calls stop()."""
+        start_time = time.perf_counter()
+        board = to_bitboard(position, self.use_symmetry)
+        self.side = side
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self._prepare_search(board)
+        # an endless deadline turns on the per-node checks that see the stop
+        self._deadline = math.inf if stoppable else None
+        self.stats = SearchStats() if collect_stats else None
+        tt = self.transposition_table
+        tt_hits, tt_misses = (tt.hits, tt.misses) if tt is not None else (0, 0)
+        self.completed_depth = None
+        self.principal_variation = []
+        self._pv_moves = {}
+
+        # books only exist for classic square boards
+        entry = None
+        if self.opening_book and board.size == board.k:
+            book = self._book_for(board.size)
+            entry = book.lookup(board, side) if book is not None else None
+        if entry is not None:
+            best_move, best_score = entry
+            self.principal_variation = [best_move]
+        else:
+            moves = self._moves(board)
+            if self.use_symmetry:
+                # e.g. on an empty board only one corner, edge and centre are searched
+                moves = unique_moves(board, moves)
+
+            # Root node for visualization
+            root_node = None
+            if self.tracer is not None and self.use_alpha_beta:
+                self.tracer.board_size = board.size or (board.rows, board.cols)
+                root_node = self.tracer.add_node(
+                    board_state="Root",
+                    depth=0,
+                    is_maximizing=True,
+                    alpha=-math.inf,
+                    beta=math.inf,
+                    parent=None
+                )
+            if max_depth is None and time_limit is None:
+                best_move, best_score = self._search_root(board, moves, root_node)
+                self.principal_variation = self._full_pv(board, best_move) if pv else [best_move]
+            else:
+                best_move, best_score = self._iterative_deepening(board, moves, root_node)
+            if self.tracer is not None:
+                self.tracer.set_node_value(root_node, best_score)
+
+        stats = self.stats if self.stats is not None else SearchStats()
+        self.stats = None
+        stats.book_hit = entry is not None
+        stats.elapsed = time.perf_counter() - start_time
+        stats.move = best_move
+        stats.score = best_score
+        # includes the nodes of parallel workers
+        stats.nodes = self.nodes_searched
+        if tt is not None:
+            stats.tt_hits = tt.hits - tt_hits
+            stats.tt_misses = tt.misses - tt_misses
+        return SearchResult(best_move, best_score, list(self.principal_variation), self.completed_depth, stats)
+
+    def _tt_key(self, board, symbol):
+        # keyed on the side to move itself, not on whether it is the root
+        # side, so one engine can search for either side of any position;
+        # symmetric positions share one entry when canonical keys are on
+        key = board.canonical_hash() if self.use_symmetry else board.hash
+        return key ^ O_TO_MOVE_KEY if symbol == 'O' else key
+
+    def _mover(self, is_maximizing):
+        # side to move at a minimax / alpha-beta node
+        if is_maximizing:
+            return self.side
+        return 'X' if self.side == 'O' else 'O'
+
+    def _value_to_tt(self, value, depth):
+        # win/loss scores depend on the ply they were found at, store them
+        # relative to this node so the entry is valid at any depth
+        # (heuristic scores are always inside (-1, 1) and left alone)
+        if value >= 1:
+            return value + depth
+        if value <= -1:
+            return value - depth
+        return value
+
+    def _value_from_tt(self, value, depth):
+        if value >= 1:
+            return value - depth
+        if value <= -1:
+            return value + depth
+        return value
+
+    def _remaining_depth(self, board, depth):
+        # plies left below this node, the root move was ply 1
+        empty = board.empty_count()
+        if self._depth_limit is None:
+            return empty
+        return min(empty, self._depth_limit - depth - 1)
+
+    def _check_deadline(self):
+        if self.nodes_searched & 1023 == 0 and (time.perf_counter() > self._deadline or self.stop_requested):
+            raise SearchTimeout()
+
+    def stop(self):
+        """Abort a stoppable search running in another thread. The flag
+        stays set until the caller clears stop_requested."""
+        self.stop_requested = True
+
+    def _moves(self, board):
+        if self.candidate_radius is None:
+            return board.get_available_moves()
+        return board.candidate_moves(self.candidate_radius)
+
+    def _ply_moves(self, board, depth):
+        """The node's moves written to the reusable buffer of its ply, as
+        (buffer, count); only the first count entries are valid"""
+        buffer = self._move_stack[depth]
+        if self.candidate_radius is None:
+            return buffer, board.moves_into(buffer)
+        return buffer, board.candidates_into(buffer, self.candidate_radius)
+
+    def _ordered_moves(self, board, depth, symbol):
+        # previous iteration's best move at this node goes first
+        moves, count = self._ply_moves(board, depth)
+        pv_move = self._pv_moves.get(board.hash)
+        if self.move_ordering:
+            return self._sort_moves(board, moves[:count], depth, symbol, pv_move), count
+        if pv_move is not None and moves[0] != pv_move:
+            index = moves.index(pv_move, 0, count)
+            while index:
+                moves[index] = moves[index - 1]
+                index -= 1
+            moves[0] = pv_move
+        return moves, count
+
+    def _sort_moves(self, board, moves, depth, symbol, pv_move):
+        heuristics = self.move_ordering
+        tactics = "tactics" in heuristics
+        static = "static" in heuristics
+        killers = self.killers[depth] if "killers" in heuristics and depth < len(self.killers) else ()
+        history = self.history_table[symbol] if "history" in heuristics else None
+        mine = board.bits[symbol]
+        theirs = board.bits['X' if symbol == 'O' else 'O']
+        lines_through = board.lines_through
+
+        keyed = []
+        for move in moves:
+            if move == pv_move:
+                keyed.append((-PV_BONUS, move))
+                continue
+            score = 0
+            if tactics:
+                bit = 1 << (move - 1)
+                for line in lines_through[move - 1]:
+                    if (mine | bit) & line == line:
+                        score = WIN_BONUS
+                        break
+                    if (theirs | bit) & line == line:
+                        score = BLOCK_BONUS
+            if move in killers:
+                score += KILLER_BONUS
+            if history is not None:
+                score += min(history[move], KILLER_BONUS - 1) * 16
+            if static:
+                # centre > corner > edge on 3x3: more lines through the cell
+                score += len(lines_through[move - 1])
+            keyed.append((-score, move))
+        keyed.sort()
+        return [move for _, move in keyed]
+
+    def _cutoff_source(self, board, move, depth, symbol):
+        """Name the ordering heuristic that put move where it caused a cutoff"""
+        if move == self._pv_moves.get(board.hash):
+            return "pv"
+        if "tactics" in self.move_ordering:
+            bit = 1 << (move - 1)
+            mine = board.bits[symbol] | bit
+            theirs = board.bits['X' if symbol == 'O' else 'O'] | bit
+            lines = board.lines_through[move - 1]
+            if any(mine & line == line for line in lines):
+                return "win"
+            if any(theirs & line == line for line in lines):
+                return "block"
+        if "killers" in self.move_ordering and depth < len(self.killers) and move in self.killers[depth]:
+            return "killer"
+        if "history" in self.move_ordering and self.history_table[symbol][move]:
+            return "history"
+        if "static" in self.move_ordering:
+            return "static"
+        return "index"
+
+    def _record_cutoff(self, board, move, move_index, depth, symbol, remaining):
+        self.cutoffs += 1
+        if move_index == 0:
+            self.first_move_cutoffs += 1
+        if self.stats is not None:
+            self.stats.record_cutoff(move_index)
+        if not self.move_ordering:
+            return
+        # attribute before updating, so the stats show what ordered the move
+        self.cutoff_sources[self._cutoff_source(board, move, depth, symbol)] += 1
+        if "killers" in self.move_ordering:
+            while len(self.killers) <= depth:
+                self.killers.append([])
+            killers = self.killers[depth]
+            if move not in killers:
+                killers.insert(0, move)
+                del killers[2:]
+        if "history" in self.move_ordering:
+            self.history_table[symbol][move] += remaining * remaining
+
+    def _batch_leaves(self, board, moves, count, depth, remaining, symbol, view):
+        """With batch_eval, the score from view's side of each of the count
+        moves symbol can make at a node one ply above the depth limit, as
+        {move: score}; None when the children are searched one by one"""
+        if remaining != 1 or self._batch_evaluator is None or self.tracer is not None:
+            return None
+        scores = {}
+        leaves = []
+        x_bits = []
+        o_bits = []
+        for move in moves[:count]:
+            board.make_move(move, symbol)
+            winner = board.check_winner()
+            if winner is None:
+                leaves.append(move)
+                x_bits.append(board.bits['X'])
+                o_bits.append(board.bits['O'])
+            elif winner == 'Tie':
+                scores[move] = 0
+            elif winner == view:
+                scores[move] = self.win_score - depth - 1
+            else:
+                scores[move] = depth + 1 - self.win_score
+            board.undo_move(move)
+        # every child counts as a searched leaf, as in the unbatched search
+        self.nodes_searched += count
+        stats = self.stats
+        if stats is not None and count:
+            stats.enter(depth + 1)
+            stats.terminal_nodes += count
+        if leaves:
+            from batch_eval import states_from_bits
+            states = states_from_bits(x_bits, o_bits, board.cells)
+            values = self._batch_evaluator(states, board.rows, board.cols, board.k, view)
+            scores.update(zip(leaves, values.tolist()))
+        return scores
+
+    def minimax(self, board, depth, is_maximizing):
+        self.nodes_searched += 1
+        stats = self.stats
+        if stats is not None:
+            stats.enter(depth)
+        winner = board.check_winner()
+        if winner is not None and stats is not None:
+            stats.terminal_nodes += 1
+        if winner == self.side:
+            return self.win_score - depth
+        elif winner is not None and winner != 'Tie':
+            return depth - self.win_score
+        elif winner == 'Tie':
+            return 0
+        # check to see if player has won
+
+        if self._deadline is not None:
+            self._check_deadline()
+        remaining = self._remaining_depth(board, depth)
+        if remaining <= 0:
+            if stats is not None:
+                stats.terminal_nodes += 1
+            return self.evaluator(board, self.side)
+
+        key = None
+        if self.transposition_table is not None:
+            key = self._tt_key(board, self._mover(is_maximizing))
+            entry = self.transposition_table.probe(key)
+            if entry is not None and entry[3] >= remaining:
+                value = self._value_from_tt(entry[1], depth)
+                return value if is_maximizing else -value
+        
+        moves, count = self._ply_moves(board, depth)
+        if is_maximizing:
+            best_score = -math.inf
+            for index in range(count):
+                move = moves[index]
+                board.make_move(move, self.side)
+                score = self.minimax(board, depth + 1, False)
+                board.undo_move(move)
+                best_score = max(best_score, score)
+        else:
+            opponent_symbol = 'X' if self.side == 'O' else 'O'
+            best_score = math.inf
+            for index in range(count):
+                move = moves[index]
+                board.make_move(move, opponent_symbol)
+                score = self.minimax(board, depth + 1, True)
+                board.undo_move(move)
+                best_score = min(best_score, score)
+
+        if key is not None:
+            # entries hold the side to move's score, like negascout's
+            value = best_score if is_maximizing else -best_score
+            self.transposition_table.store(key, self._value_to_tt(value, depth), EXACT, remaining)
+        return best_score
+        # Minimax algoritim 
+
+    def alpha_beta_pruning(self, board, depth, alpha, beta, is_maximizing, parent_node=None):
+        self.nodes_searched += 1
+        stats = self.stats
+        if stats is not None:
+            stats.enter(depth)
+        # Create a node for the current state if visualizing
+        current_node = None
+        if self.tracer is not None:
+            current_node = self.tracer.add_node(
+                board_state=position_code(board), 
+                depth=depth, 
+                is_maximizing=is_maximizing, 
+                alpha=alpha, 
+                beta=beta, 
+                parent=parent_node
+            )
+        
+        # Terminal state evaluation
+        winner = board.check_winner()
+        if winner is not None and stats is not None:
+            stats.terminal_nodes += 1
+        if winner == self.side:
+            value = self.win_score - depth
+            if self.tracer is not None:
+                self.tracer.set_node_value(current_node, value)
+            return value
+        elif winner is not None and winner != 'Tie':
+            value = depth - self.win_score
+            if self.tracer is not None:
+                self.tracer.set_node_value(current_node, value)
+            return value
+        elif winner == 'Tie':
+            if self.tracer is not None:
+                self.tracer.set_node_value(current_node, 0)
+            return 0
+
+        # Depth limit reached, fall back to the static evaluation
+        if self._deadline is not None:
+            self._check_deadline()
+        remaining = self._remaining_depth(board, depth)
+        if remaining <= 0:
+            if stats is not None:
+                stats.terminal_nodes += 1
+            value = self.evaluator(board, self.side)
+            if self.tracer is not None:
+                self.tracer.set_node_value(current_node, value)
+            return value
+
+        # Transposition table lookup, bounds narrow the window
+        key = None
+        if self.transposition_table is not None:
+            key = self._tt_key(board, self._mover(is_maximizing))
+            entry = self.transposition_table.probe(key)
+            if entry is not None and entry[3] >= remaining:
+                value = self._value_from_tt(entry[1], depth)
+                flag = entry[2]
+                if not is_maximizing:
+                    # stored for the opponent, bounds swap with the sign
+                    value, flag = -value, _FLIPPED[flag]
+                if flag == LOWER_BOUND:
+                    alpha = max(alpha, value)
+                elif flag == UPPER_BOUND:
+                    beta = min(beta, value)
+                if flag == EXACT or beta <= alpha:
+                    if self.tracer is not None:
+                        self.tracer.set_node_value(current_node, value)
+                    return value
+        alpha_orig, beta_orig = alpha, beta
+        best_move = None
+        
+        # Maximizing player
+        if is_maximizing:
+            best_score = -math.inf
+            moves, count = self._ordered_moves(board, depth, self.side)
+            leaf_scores = self._batch_leaves(board, moves, count, depth, remaining, self.side, self.side)
+            for move_index in range(count):
+                move = moves[move_index]
+                if leaf_scores is not None:
+                    score = leaf_scores[move]
+                else:
+                    board.make_move(move, self.side)
+                    score = self.alpha_beta_pruning(board, depth + 1, alpha, beta, False, current_node)
+                    board.undo_move(move)
+                if score > best_score:
+                    best_score = score
+                    best_move = move
+                alpha = max(alpha, score)
+                
+                # Pruning check
+                if beta <= alpha:
+                    self._record_cutoff(board, move, move_index, depth, self.side, remaining)
+                    # Mark remaining moves as pruned
+                    if self.tracer is not None:
+                        # Mark future possible nodes as pruned
+                        for future_move in board.get_available_moves():
+                            if future_move != move:  # Skip the move we just evaluated
+                                dummy_node = self.tracer.add_node(
+                                    board_state=f"Pruned at {depth+1}", 
+                                    depth=depth+1, 
+                                    is_maximizing=False, 
+                                    alpha=alpha, 
+                                    beta=beta, 
+                                    parent=current_node
+                                )
+                                self.tracer.mark_pruned(current_node, dummy_node)
+                    break
+            
+        # Minimizing player
+        else:
+            opponent_symbol = 'X' if self.side == 'O' else 'O'
+            best_score = math.inf
+            moves, count = self._ordered_moves(board, depth, opponent_symbol)
+            leaf_scores = self._batch_leaves(board, moves, count, depth, remaining, opponent_symbol,
+                                             self.side)
+            for move_index in range(count):
+                move = moves[move_index]
+                if leaf_scores is not None:
+                    score = leaf_scores[move]
+                else:
+                    board.make_move(move, opponent_symbol)
+                    score = self.alpha_beta_pruning(board, depth + 1, alpha, beta, True, current_node)
+                    board.undo_move(move)
+                if score < best_score:
+                    best_score = score
+                    best_move = move
+                beta = min(beta, score)
+                
+                # Pruning check
+                if beta <= alpha:
+                    self._record_cutoff(board, move, move_index, depth, opponent_symbol, remaining)
+                    # Mark remaining moves as pruned
+                    if self.tracer is not None:
+                        # Mark future possible nodes as pruned
+                        for future_move in board.get_available_moves():
+                            if future_move != move:  # Skip the move we just evaluated
+                                dummy_node = self.tracer.add_node(
+                                    board_state=f"Pruned at {depth+1}", 
+                                    depth=depth+1, 
+                                    is_maximizing=True, 
+                                    alpha=alpha, 
+                                    beta=beta, 
+                                    parent=current_node
+                                )
+                                self.tracer.mark_pruned(current_node, dummy_node)
+                    break
+
+        if self._depth_limit is not None and remaining > 1:
+            self._pv_moves[board.hash] = best_move
+
+        if key is not None:
+            if best_score <= alpha_orig:
+                flag = UPPER_BOUND
+            elif best_score >= beta_orig:
+                flag = LOWER_BOUND
+            else:
+                flag = EXACT
+            value = best_score
+            if not is_maximizing:
+                value, flag = -value, _FLIPPED[flag]
+            self.transposition_table.store(key, self._value_to_tt(value, depth), flag, remaining)
+
+        if self.tracer is not None:
+            self.tracer.set_node_value(current_node, best_score)
+        return best_score
+    
+    def negascout(self, board, depth, alpha, beta, symbol):
+        """Negamax with principal variation search. symbol is the side to
+        move and the score is from its point of view."""
+        self.nodes_searched += 1
+        stats = self.stats
+        if stats is not None:
+            stats.enter(depth)
+        winner = board.check_winner()
+        if winner is not None and stats is not None:
+            stats.terminal_nodes += 1
+        if winner == 'Tie':
+            return 0
+        elif winner == symbol:
+            return self.win_score - depth
+        elif winner is not None:
+            return depth - self.win_score
+
+        if self._deadline is not None:
+            self._check_deadline()
+        remaining = self._remaining_depth(board, depth)
+        if remaining <= 0:
+            if stats is not None:
+                stats.terminal_nodes += 1
+            # evaluators are symmetric: evaluator(b, 'X') == -evaluator(b, 'O')
+            return self.evaluator(board, symbol)
+
+        key = None
+        if self.transposition_table is not None:
+            key = self._tt_key(board, symbol)
+            entry = self.transposition_table.probe(key)
+            if entry is not None and entry[3] >= remaining:
+                value = self._value_from_tt(entry[1], depth)
+                flag = entry[2]
+                if flag == LOWER_BOUND:
+                    alpha = max(alpha, value)
+                elif flag == UPPER_BOUND:
+                    beta = min(beta, value)
+                if flag == EXACT or beta <= alpha:
+                    return value
+        alpha_orig = alpha
+
+        opponent_symbol = 'X' if symbol == 'O' else 'O'
+        best_score = -math.inf
+        best_move = None
+        moves, count = self._ordered_moves(board, depth, symbol)
+        leaf_scores = self._batch_leaves(board, moves, count, depth, remaining, symbol, symbol)
+        for move_index in range(count):
+            move = moves[move_index]
+            if leaf_scores is not None:
+                score = leaf_scores[move]
+            else:
+                board.make_move(move, symbol)
+                if move_index == 0:
+                    score = -self.negascout(board, depth + 1, -beta, -alpha, opponent_symbol)
+                else:
+                    # null window: only prove the move is not better than alpha
+                    score = -self.negascout(board, depth + 1, -alpha - NULL_WINDOW, -alpha, opponent_symbol)
+                    if alpha < score < beta:
+                        score = -self.negascout(board, depth + 1, -beta, -alpha, opponent_symbol)
+                board.undo_move(move)
+            if score > best_score:
+                best_score = score
+                best_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                self._record_cutoff(board, move, move_index, depth, symbol, remaining)
+                break
+
+        if self._depth_limit is not None and remaining > 1:
+            self._pv_moves[board.hash] = best_move
+
+        if key is not None:
+            if best_score <= alpha_orig:
+                flag = UPPER_BOUND
+            elif best_score >= beta:
+                flag = LOWER_BOUND
+            else:
+                flag = EXACT
+            self.transposition_table.store(key, self._value_to_tt(best_score, depth), flag, remaining)
+        return best_score
+
+    def _negascout_root(self, board, moves, alpha, beta):
+        opponent_symbol = 'X' if self.side == 'O' else 'O'
+        best_score = -math.inf
+        best_move = None
+        for move in moves:
+            board.make_move(move, self.side)
+            if best_move is None:
+                score = -self.negascout(board, 0, -beta, -alpha, opponent_symbol)
+            else:
+                # a lower numbered move only has to tie the best one, the
+                # same tie-break as _search_root
+                bound = max(alpha, best_score)
+                if move < best_move:
+                    bound -= NULL_WINDOW
+                score = -self.negascout(board, 0, -bound - NULL_WINDOW, -bound, opponent_symbol)
+                if bound < score < beta:
+                    score = -self.negascout(board, 0, -beta, -bound, opponent_symbol)
+            board.undo_move(move)
+            if score > best_score or (score == best_score and move < best_move):
+                best_score = score
+                best_move = move
+            if best_score >= beta:
+                break
+        return best_move, best_score
+
+    def _search_root_negascout(self, board, moves):
+        # aspiration window around the last root score, widened to the full
+        # window if the real score falls outside it
+        guess = self._aspiration_guess
+        if guess is not None and not math.isinf(guess):
+            alpha = guess - ASPIRATION_WINDOW
+            beta = guess + ASPIRATION_WINDOW
+            best_move, best_score = self._negascout_root(board, moves, alpha, beta)
+            if alpha < best_score < beta:
+                self._aspiration_guess = best_score
+                return best_move, best_score
+            self.aspiration_researches += 1
+        best_move, best_score = self._negascout_root(board, moves, -math.inf, math.inf)
+        self._aspiration_guess = best_score
+        return best_move, best_score
+
+    def _score_root_move(self, board, move, alpha=-math.inf, root_node=None):
+        """Score one root move, exactly if it beats alpha"""
+        board.make_move(move, self.side)
+        if self.use_negascout:
+            opponent_symbol = 'X' if self.side == 'O' else 'O'
+            score = -self.negascout(board, 0, -math.inf, -alpha, opponent_symbol)
+        elif self.use_alpha_beta:
+            score = self.alpha_beta_pruning(board, 0, alpha, math.inf, False, root_node)
+        else:
+            score = self.minimax(board, 0, False)
+        board.undo_move(move)
+        return score
+
+    def _search_root(self, board, moves, root_node):
+        if self.workers > 1 and self.tracer is None and len(moves) > 1:
+            if self._parallel is None:
+                from parallel_search import ParallelRootSearch
+                self._parallel = ParallelRootSearch(self.workers)
+            return self._parallel.search(self, board, moves)
+        if self.use_negascout:
+            return self._search_root_negascout(board, moves)
+        best_score = -math.inf
+        best_move = None
+        for move in moves:
+            score = self._score_root_move(board, move, root_node=root_node)
+            # ties go to the lowest numbered move whatever the search order
+            if score > best_score or (score == best_score and move < best_move):
+                best_score = score
+                best_move = move
+        return best_move, best_score
+
+    def _iterative_deepening(self, board, moves, root_node):
+        start_time = time.perf_counter()
+        max_depth = board.empty_count()
+        if self.max_depth is not None:
+            max_depth = min(max_depth, self.max_depth)
+        self._pv_moves = {}
+        self.completed_depth = None
+        best_move, best_score = moves[0], None
+        try:
+            for depth_limit in range(1, max_depth + 1):
+                self._depth_limit = depth_limit
+                try:
+                    best_move, best_score = self._search_root(board, moves, root_node)
+                except SearchTimeout:
+                    # unfinished iteration, keep the last completed one
+                    break
+                self.completed_depth = depth_limit
+                # principal variation first in the next iteration
+                moves = [best_move] + [move for move in moves if move != best_move]
+                self.principal_variation = self._extract_pv(board, best_move)
+                if best_score >= 1:
+                    break  # forced win found, a deeper search can't improve it
+                if self.time_limit is not None:
+                    # the first iteration always finishes so there is a move
+                    self._deadline = start_time + self.time_limit
+                    if time.perf_counter() >= self._deadline:
+                        break
+        finally:
+            self._depth_limit = None
+            self._deadline = None
+        return best_move, best_score
+
+    def _extract_pv(self, board, first_move):
+        line = [first_move]
+        played = []
+        symbol = self.side
+        move = first_move
+        while move is not None and board.make_move(move, symbol):
+            played.append(move)
+            symbol = 'X' if symbol == 'O' else 'O'
+            move = self._pv_moves.get(board.hash)
+            if move is not None:
+                line.append(move)
+        for move in reversed(played):
+            board.undo_move(move)
+        return line
+
+    def _full_pv(self, board, first_move):
+        """Line of play from first_move on, each reply the best move of a
+        search of the position it is played in. The counters, tracer and
+        aspiration window of the root search are left as they were."""
+        saved = (self.side, self.nodes_searched, self.cutoffs, self.first_move_cutoffs,
+                 self.cutoff_sources, self.aspiration_researches, self._aspiration_guess,
+                 self.stats, self.tracer)
+        self.stats = None
+        self.tracer = None
+        self._aspiration_guess = None
+        line = [first_move]
+        played = []
+        move = first_move
+        try:
+            while board.make_move(move, self.side):
+                played.append(move)
+                if board.check_winner() is not None:
+                    break
+                self.side = 'X' if self.side == 'O' else 'O'
+                moves = self._moves(board)
+                if self.use_symmetry:
+                    moves = unique_moves(board, moves)
+                move, _ = self._search_root(board, moves, None)
+                line.append(move)
+        finally:
+            for move in reversed(played):
+                board.undo_move(move)
+            (self.side, self.nodes_searched, self.cutoffs, self.first_move_cutoffs,
+             self.cutoff_sources, self.aspiration_researches, self._aspiration_guess,
+             self.stats, self.tracer) = saved
+        return line
+
+    def _book_for(self, size):
+        if self.opening_book is not True:
+            return self.opening_book
+        if size not in self._books:
+            from retrograde import SolvedTable
+
+            # a solved table (retrograde.py) plays perfectly wherever the book would
+            self._books[size] = SolvedTable.load_default(size) or OpeningBook.load_default(size)
+        return self._books[size]
+
+    def _prepare_search(self, board):
+        # wins must outscore losses at every depth of the bigger boards
+        self.win_score = max(10, board.cells)
+        self.nodes_searched = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.cutoff_sources = Counter()
+        self.aspiration_researches = 0
+        self.killers = []
+        cells = board.cells
+        if len(self.history_table.get('X', ())) != cells + 1:
+            self.history_table = {symbol: [0] * (cells + 1) for symbol in ('X', 'O')}
+        # one move list per ply, filled in place by _ply_moves
+        if len(self._move_stack) != cells + 1 or len(self._move_stack[0]) != cells:
+            self._move_stack = [[0] * cells for _ in range(cells + 1)]
+
+    def close(self):
+        """Shut down the worker processes of a parallel engine"""
+        if self._parallel is not None:
+            self._parallel.close()
+            self._parallel = None
+
+
+def search(position, side, max_depth=None, time_limit=None, collect_stats=False, pv=True, **options):
+    """One search with a new SearchEngine(**options), see SearchEngine.search"""
+    engine = SearchEngine(**options)
+    try:
+        return engine.search(position, side, max_depth, time_limit, collect_stats, pv)
+    finally:
+        engine.close()
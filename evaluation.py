@@ -0,0 +1,48 @@
+"""
+Static evaluation functions for depth-limited search.
+
+An evaluator is any callable evaluator(board, symbol) -> float that scores a
+non-terminal BitBoard from symbol's point of view. Scores must stay strictly
+between -1 and 1 so that a heuristic guess never outranks a real win or loss
+(those score at least 1 in absolute value).
+"""
+
+
+def open_lines(board, symbol):
+    """Count the lines each side can still complete, weighting every line by
+    how many pieces it already holds (x10 per piece)"""
+    opponent = 'O' if symbol == 'X' else 'X'
+    mine = board.bits[symbol]
+    theirs = board.bits[opponent]
+    score = 0
+    for line in board.lines:
+        if line & theirs == 0:
+            count = bin(line & mine).count('1')
+            if count:
+                score += 10 ** (count - 1)
+        elif line & mine == 0:
+            score -= 10 ** (bin(line & theirs).count('1') - 1)
+    # every line holds at most k - 1 pieces without being a win
+    bound = len(board.lines) * 10 ** (board.k - 2) + 1
+    return score / bound
+
+
+def line_count(board, symbol):
+    """Unweighted open_lines: each started line only symbol can still
+    complete scores +1, each one only the opponent can complete -1"""
+    opponent = 'O' if symbol == 'X' else 'X'
+    mine = board.bits[symbol]
+    theirs = board.bits[opponent]
+    score = 0
+    for line in board.lines:
+        if line & theirs == 0 and line & mine:
+            score += 1
+        elif line & mine == 0 and line & theirs:
+            score -= 1
+    return score / (len(board.lines) + 1)
+
+
+EVALUATORS = {
+    "open_lines": open_lines,
+    "line_count": line_count,
+}
@@ -1,100 +1,52 @@
 import random
-import time
+import sys
 
-from algorithm import AIPlayer
 from player import Player
-from gemini_player import GeminiPlayer
-
-
-
-class Board:
-    def __init__(self, size=3):
-        self.size = size
-        self.grid = [[' ' for _ in range(size)] for _ in range(size)]
-        self.current_player = None
-        # grid size 
-    def is_valid_move(self, move):
-        row = (move - 1) // self.size
-        col = (move - 1) % self.size
-        return self.grid[row][col] == ' '
-        # checks to see if move is valid
-    def make_move(self, move, symbol):
-        row = (move - 1) // self.size
-        col = (move - 1) % self.size
-        if self.is_valid_move(move):
-            self.grid[row][col] = symbol
-            return True
-        return False
-        # changes printed grid to show moves made
-    def check_winner(self):
-        # check rows
-        for row in self.grid:
-            if row.count(row[0]) == self.size and row[0] != ' ':
-                return row[0]
-        
-        # check columns
-        for col in range(self.size):
-            if all(self.grid[row][col] == self.grid[0][col] != ' ' for row in range(self.size)):
-                return self.grid[0][col]
-
-        # check diagonals
-        if all(self.grid[i][i] == self.grid[0][0] != ' ' for i in range(self.size)):
-            return self.grid[0][0]
-        if all(self.grid[i][self.size-1-i] == self.grid[0][self.size-1] != ' ' for i in range(self.size)):
-            return self.grid[0][self.size-1]
-
-        # check tie
-        if all(cell != ' ' for row in self.grid for cell in row):
-            return 'Tie'
-
-        return None
-
-    def display(self):
-        max_width = len(str(self.size * self.size))  
-        cell_width = max(max_width, 3)  # Ensure at least 3 spaces for X and O centering
-        for i, row in enumerate(self.grid):
-            display_row = []
-            for j, cell in enumerate(row):
-                if cell == ' ':
-                    num = str(i * self.size + j + 1)
-                    display_row.append(num.rjust(cell_width))  # right justify the number
-                else:
-                    display_row.append(cell.center(cell_width))  # center the X or O with consistent width
-            print(' | '.join(display_row))
-            if i < self.size - 1:  # don't print divider after the last row
-                print('-' * (self.size * (cell_width + 3) - 1))
-
-    def get_available_moves(self):
-        return [i * self.size + j + 1 for i in range(self.size) for j in range(self.size) if self.grid[i][j] == ' ']
-
-    def undo_move(self, move):
-        row = (move - 1) // self.size
-        col = (move - 1) % self.size
-        self.grid[row][col] = ' '
-
-def show_settings_menu():
+from board import Board
+from pacing import GameClock
+
+AI_TIME_LIMIT = 2.0  # seconds per move on boards bigger than 3x3
+MAX_GRID_SIZE = 15
+# beyond 5x5 the AI only considers cells next to the stones on the board
+CANDIDATE_RADIUS = 1
+# the search and the Gemini client are only imported for the modes using them
+AI_MODES = ("2", "3", "4", "6", "7", "8", "9")
+GEMINI_MODES = ("5", "6", "7")
+
+
+def ask_number(prompt, low, high):
+    while True:
+        try:
+            value = int(input(f"{prompt} ({low}-{high}): "))
+            if low <= value <= high:
+                return value
+            print(f"Please enter a number between {low} and {high}.")
+        except ValueError:
+            print("Please enter a valid number.")
+
+
+def show_settings_menu(grid_size, win_length):
     while True:
         print("\nSettings Menu:")
-        print("1. Change grid size")
-        print("2. Go back")
+        print(f"1. Change grid size (now {grid_size}x{grid_size})")
+        print(f"2. Change pieces in a row to win (now {win_length})")
+        print("3. Go back")
         
-        choice = input("Enter your choice (1-2): ")
+        choice = input("Enter your choice (1-3): ")
         if choice == "1":
-            while True:
-                try:
-                    size = int(input("Enter new grid size (3-5): "))
-                    if 3 <= size <= 5:
-                        return size
-                    print("Please enter a size between 3 and 5.")
-                except ValueError:
-                    print("Please enter a valid number.")
+            grid_size = ask_number("Enter new grid size", 3, MAX_GRID_SIZE)
+            # full rows up to 5x5, five in a row (gomoku) on bigger boards
+            win_length = min(grid_size, 5)
         elif choice == "2":
-            return None
+            win_length = ask_number("Enter pieces in a row to win", 3, grid_size)
+        elif choice == "3":
+            return grid_size, win_length
         else:
             print("Invalid choice. Please try again.")
     # settings menu
 def show_main_menu():
     grid_size = 3  # Default grid size
+    win_length = 3
     
     while True:
         print("\nMain Menu:")
@@ -104,19 +56,64 @@ def show_main_menu():
         choice = input("Enter your choice (1-2): ")
         
         if choice == "2":
-            new_size = show_settings_menu()
-            if new_size:
-                grid_size = new_size
+            grid_size, win_length = show_settings_menu(grid_size, win_length)
         elif choice == "1":
-            return grid_size
+            return grid_size, win_length
         else:
             print("Invalid choice. Please try again.")
 
-def main():
+def create_players(mode, grid_size):
+    """Players 1 (X) and 2 (O) of a game mode from the menu"""
+    if mode in AI_MODES:
+        from algorithm import AIPlayer
+    if mode in GEMINI_MODES:
+        from gemini_player import GeminiPlayer
+
+    player1 = Player("Player 1", "X")
+    player2 = Player("Player 2", "O")
+
+    # 4x4 and 5x5 can't be searched to the end, the AI searches as deep as
+    # it can in AI_TIME_LIMIT seconds per move instead
+    search_limits = {}
+    if grid_size > 3:
+        search_limits = {"time_limit": AI_TIME_LIMIT}
+    if grid_size > 5:
+        search_limits["candidate_radius"] = CANDIDATE_RADIUS
+
+    if mode == "2":
+        player2 = AIPlayer("AI (Minimax)", "O", **search_limits)
+    elif mode == "3":
+        player2 = AIPlayer("AI (Alpha-Beta)", "O", use_alpha_beta=True, use_transposition=True, use_symmetry=True, move_ordering=True, opening_book=True, ponder=True, **search_limits)
+    elif mode == "4":
+        player1 = AIPlayer("AI (Minimax)", "X", **search_limits)
+        player2 = AIPlayer("AI (Alpha-Beta)", "O", use_alpha_beta=True, use_transposition=True, use_symmetry=True, move_ordering=True, opening_book=True, **search_limits)
+    elif mode == "5":
+        player2 = GeminiPlayer("Gemini AI", "O")
+    elif mode == "6":
+        player1 = AIPlayer("AI (Minimax)", "X", **search_limits)
+        player2 = GeminiPlayer("Gemini AI", "O")
+    elif mode == "7":
+        player1 = AIPlayer("AI (Alpha-Beta)", "X", use_alpha_beta=True, use_transposition=True, use_symmetry=True, move_ordering=True, opening_book=True, ponder=True, **search_limits)
+        player2 = GeminiPlayer("Gemini AI", "O")
+    elif mode == "8":
+        player2 = AIPlayer("AI (Alpha-Beta with Visualization)", "O", use_alpha_beta=True, visualize_pruning=True, **search_limits)
+    elif mode == "9":
+        player1 = AIPlayer("AI (Minimax)", "X", **search_limits)
+        player2 = AIPlayer("AI (Alpha-Beta with Visualization)", "O", use_alpha_beta=True, visualize_pruning=True, **search_limits)
+    # chooses game style depending on user input
+    # the alpha-beta AI ponders while a human or Gemini is thinking
+    return player1, player2
+
+
+def main(clock=None):
+    # interactive pacing unless a clock is given, GameClock.instant() plays
+    # computer moves without any delay
+    if clock is None:
+        clock = GameClock.interactive()
     print("Welcome to Tic-Tac-Toe!")
     
     # Show main menu and get grid size
-    grid_size = show_main_menu()
+    grid_size, win_length = show_main_menu()
     
     print("\nChoose game mode:")
     print("1. Human vs Human")
@@ -134,62 +131,41 @@ def main():
         print("Invalid choice. Try again.")
         mode = input("Enter your choice (1-9): ")
 
-    player1 = Player("Player 1", "X")
-    player2 = Player("Player 2", "O")
-
-    if mode == "2":
-        player2 = AIPlayer("AI (Minimax)", "O")
-    elif mode == "3":
-        player2 = AIPlayer("AI (Alpha-Beta)", "O", use_alpha_beta=True)
-    elif mode == "4":
-        player1 = AIPlayer("AI (Minimax)", "X")
-        player2 = AIPlayer("AI (Alpha-Beta)", "O", use_alpha_beta=True)
-    elif mode == "5":
-        player2 = GeminiPlayer("Gemini AI", "O")
-    elif mode == "6":
-        player1 = AIPlayer("AI (Minimax)", "X")
-        player2 = GeminiPlayer("Gemini AI", "O")
-    elif mode == "7":
-        player1 = AIPlayer("AI (Alpha-Beta)", "X", use_alpha_beta=True)
-        player2 = GeminiPlayer("Gemini AI", "O")
-    elif mode == "8":
-        player2 = AIPlayer("AI (Alpha-Beta with Visualization)", "O", use_alpha_beta=True, visualize_pruning=True)
-    elif mode == "9":
-        player1 = AIPlayer("AI (Minimax)", "X")
-        player2 = AIPlayer("AI (Alpha-Beta with Visualization)", "O", use_alpha_beta=True, visualize_pruning=True)
-    # chooses game style depending on user input
+    player1, player2 = create_players(mode, grid_size)
 
-    if isinstance(player1, (AIPlayer, GeminiPlayer)) and isinstance(player2, (AIPlayer, GeminiPlayer)):
+    if not player1.is_human and not player2.is_human:
         print("\nChoosing starting AI player randomly...\n")
         if random.choice([True, False]):
             player1, player2 = player2, player1
     # if both players are AI it will randomly choose a starting player
     
-    board = Board(grid_size)
+    board = Board(grid_size, k=win_length)
     current_player = player1
     second_player = player2
 
-    print(f"Starting game with {grid_size}x{grid_size} grid")
-    print(f"Enter moves using numbers 1-{grid_size*grid_size}")
+    print(f"Starting game with {grid_size}x{grid_size} grid, {win_length} in a row wins")
+    print(f"Enter moves using numbers 1-{board.cells}")
 
     while True:
-        board.display()
-        time.sleep(1)
+        with clock.display():
+            board.display()
 
-        move = current_player.make_move(board)
+        move = clock.move(current_player, board)
         board.make_move(move, current_player.symbol)
 
         winner = board.check_winner()
         if winner:
-            board.display()
+            with clock.display():
+                board.display()
             if winner == 'Tie':
                 print(f"It's a tie! \n(Player 1 took {current_player.total_thinking_time:.6} seconds)\n(Player 2 took {second_player.total_thinking_time:.6} seconds)")
             else:
                 print(f"{current_player.name} wins! ({current_player.total_thinking_time:.6} seconds.)")
+            clock.report()
             break
 
         # Switch players
         current_player = player2 if current_player == player1 else player1
 
 if __name__ == "__main__":
-    main() 
+    main(GameClock.instant() if "--no-delay" in sys.argv else None) 
@@ -0,0 +1,138 @@
+"""
+Batched Gemini move requests for many concurrent games.
+
+GeminiPlayers that share a BatchDispatcher (GeminiPlayer(..., dispatcher=d))
+don't call the model themselves. The dispatcher collects the requests that
+arrive within max_wait seconds of each other, up to max_batch of them, and
+either sends them as one multi-board prompt whose "<game>: <move>" reply
+lines are handed back to the right games (batch_prompts=True), or sends
+each request's own prompt concurrently. Either way at most max_concurrency
+calls are in flight and at most rate_limit calls start per second.
+
+The games must run in one asyncio event loop, calling
+GeminiPlayer.make_move_async; see bench_gemini_batching in benchmark.py.
+"""
+
+import asyncio
+import re
+
+_ANSWER = re.compile(r"^\W*(?:game\s*)?(\d+)\s*[:.)=-]\s*(\d+)", re.IGNORECASE | re.MULTILINE)
+
+
+def batch_prompt(requests):
+    """One prompt asking for a move on every (board, symbol) of requests"""
+    parts = [
+        "you are an expert tic-tac-toe player. below are "
+        f"{len(requests)} independent games, choose the best move in each one "
+        "for the player to move: win if you can, otherwise block the opponent's "
+        "win, otherwise take the strongest square.\n"
+    ]
+    for game, (board, symbol) in enumerate(requests, 1):
+        rows = "\n".join(" | ".join(cell if cell != ' ' else '_' for cell in row) for row in board.grid)
+        parts.append(f"game {game}: you play '{symbol}'\n{rows}\n"
+                     f"available moves: {board.get_available_moves()}\n")
+    parts.append('respond with exactly one line per game in the form "<game number>: <move>". '
+                 "no explanations.")
+    return "\n".join(parts)
+
+
+def parse_batch_answer(text, count):
+    """Move text for each of count games, "" for games the reply skipped"""
+    answers = [""] * count
+    for game, move in _ANSWER.findall(text):
+        game = int(game)
+        if 1 <= game <= count and not answers[game - 1]:
+            answers[game - 1] = move
+    return answers
+
+
+class BatchDispatcher:
+    def __init__(self, model, max_batch=16, max_wait=0.01, batch_prompts=True,
+                 max_concurrency=4, rate_limit=None):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait  # seconds to wait for more requests after the first
+        self.batch_prompts = batch_prompts
+        self.max_concurrency = max_concurrency
+        self.rate_limit = rate_limit  # calls per second, None for no limit
+        self.calls = 0
+        self.requests = 0
+        self.batch_sizes = []
+        self._loop = None
+
+    def _start(self, loop):
+        # queues and semaphores belong to one event loop
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._next_call = loop.time()
+        self._collector = loop.create_task(self._collect())
+
+    async def request(self, board, symbol, prompt):
+        """Return the model's answer text for symbol to move on board;
+        prompt is used when the request is sent on its own"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._start(loop)
+        future = loop.create_future()
+        self.requests += 1
+        await self._queue.put((board, symbol, prompt, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self.batch_sizes.append(len(batch))
+            # sent in the background, the next batch is collected meanwhile
+            if self.batch_prompts and len(batch) > 1:
+                loop.create_task(self._send_batch(batch))
+            else:
+                for item in batch:
+                    loop.create_task(self._send_one(item))
+
+    async def _call(self, prompt):
+        async with self._slots:
+            if self.rate_limit:
+                loop = asyncio.get_running_loop()
+                start = max(loop.time(), self._next_call)
+                self._next_call = start + 1 / self.rate_limit
+                await asyncio.sleep(start - loop.time())
+            self.calls += 1
+            if hasattr(self.model, "generate_content_async"):
+                response = await self.model.generate_content_async(prompt)
+            else:
+                response = await asyncio.to_thread(self.model.generate_content, prompt)
+            return response.text
+
+    async def _send_one(self, item):
+        _, _, prompt, future = item
+        try:
+            text = await self._call(prompt)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(text)
+
+    async def _send_batch(self, batch):
+        try:
+            text = await self._call(batch_prompt([(board, symbol) for board, symbol, _, _ in batch]))
+        except Exception as e:
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (*_, future), answer in zip(batch, parse_batch_answer(text, len(batch))):
+            if not future.done():
+                future.set_result(answer)
@@ -0,0 +1,96 @@
+"""
+Persistent cache of GeminiPlayer's answers.
+
+Entries are keyed by model name, board shape, side to move and the
+symmetry-canonical position code (opening_book.canonical_code), so a
+rotated or mirrored position reuses the answer; the move is stored for the
+canonical image and mapped back on lookup. The cache keeps the most
+recently used max_entries answers in memory and in a JSON file next to the
+module (written with a temp file and rename, like the opening books).
+"""
+
+import json
+import os
+from collections import OrderedDict
+
+from bitboard import BitBoard
+from opening_book import canonical_code
+
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gemini_cache.json")
+
+
+def _bitboard(board):
+    return board if isinstance(board, BitBoard) else BitBoard.from_board(board)
+
+
+class GeminiCache:
+    def __init__(self, path=CACHE_PATH, max_entries=4096, autosave=True):
+        self.path = path  # None keeps the cache in memory only
+        self.max_entries = max_entries
+        self.autosave = autosave  # write the file after every new answer
+        self.entries = OrderedDict()  # key -> (canonical move, latency of the request)
+        self.hits = 0
+        self.misses = 0
+        self.saved_latency = 0.0  # seconds of requests that hits avoided
+        self.unsaved = 0  # answers stored since the file was last written
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    def _key(self, board, symbol, model_name):
+        board = _bitboard(board)
+        code, perm = canonical_code(board)
+        return f"{model_name}:{board.rows}x{board.cols}:{board.k}:{symbol}:{code}", perm
+
+    def lookup(self, board, symbol, model_name):
+        """Return the cached move for symbol to move on board, or None"""
+        key, perm = self._key(board, symbol, model_name)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        self.saved_latency += entry[1]
+        return perm.index(entry[0] - 1) + 1
+
+    def key(self, board, symbol, model_name):
+        return self._key(board, symbol, model_name)[0]
+
+    def contains(self, board, symbol, model_name):
+        """Like lookup() but without counting or reordering"""
+        return self.key(board, symbol, model_name) in self.entries
+
+    def store(self, board, symbol, model_name, move, latency):
+        key, perm = self._key(board, symbol, model_name)
+        self.entries[key] = (perm[move - 1] + 1, latency)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        self.unsaved += 1
+        if self.autosave and self.path is not None:
+            self.save()
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def save(self):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(list(self.entries.items()), f)
+        os.replace(tmp_path, self.path)
+        self.unsaved = 0
+
+    def close(self):
+        """Write the answers stored without autosave"""
+        if self.unsaved and self.path is not None:
+            self.save()
+
+    def load(self):
+        with open(self.path) as f:
+            entries = json.load(f)
+        # the file is ordered least recently used first
+        self.entries = OrderedDict((key, tuple(entry)) for key, entry in entries[-self.max_entries:])
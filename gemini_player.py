@@ -1,38 +1,212 @@
-import os
+import asyncio
 import time
-import google.generativeai as genai
 from player import Player
 
 # configure gemini api
 apeye_key = "AIzaSyAe" + "9Wkot3b1CY" + "XB_TN5o3G_t-OtJew5un4"
-genai.configure(api_key=apeye_key)
+
+MOVE_DEADLINE = 5.0  # seconds per move before the local search's move is played
+RETRIES = 2  # extra attempts after a failed or unusable reply
+BACKOFF = 0.25  # seconds before the first retry, doubled every retry
+
+
+def _gemini_model(model_name):
+    # only imported when a real model is needed, the stub model runs offline
+    import google.generativeai as genai
+
+    genai.configure(api_key=apeye_key)
+    return genai.GenerativeModel(model_name)
+
 
 class GeminiPlayer(Player):
-    def __init__(self, name, symbol, model_name="gemini-2.0-flash-lite"):
+    is_human = False
+
+    def __init__(self, name, symbol, model_name="gemini-2.0-flash-lite", model=None,
+                 deadline=MOVE_DEADLINE, retries=RETRIES, backoff=BACKOFF, local_fallback=True,
+                 cache=None, dispatcher=None):
         super().__init__(name, symbol)
-        self.model_name = model_name
-        self.model = genai.GenerativeModel(model_name)
+        # cache entries are per model, an injected model knows its own name
+        self.model_name = getattr(model, "model_name", model_name)
+        # any object with generate_content(prompt) (and optionally
+        # generate_content_async) works, e.g. gemini_stub.StubModel
+        self.model = model if model is not None else _gemini_model(model_name)
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        # alpha-beta search run alongside the request, played when the
+        # model misses the deadline or never gives a legal move
+        self.local_player = None
+        if local_fallback:
+            from algorithm import AIPlayer
+
+            self.local_player = AIPlayer(f"{name} (local)", symbol, use_alpha_beta=True,
+                                         use_transposition=True, move_ordering=True,
+                                         verbose=False)
+        # answers of earlier games: True for the default gemini_cache.json
+        # or pass a GeminiCache
+        if cache is True:
+            from gemini_cache import GeminiCache
+
+            cache = GeminiCache()
+        self.cache = cache
+        # a gemini_batch.BatchDispatcher shared by players of concurrent
+        # games sends their requests in batches instead of one by one
+        self.dispatcher = dispatcher
         self.total_thinking_time = 0
-        
+        self.last_source = None  # "cache", "gemini", "local" or "first" for the last move
+        self.attempts = 0
+        self.fallbacks = 0
+
     def make_move(self, board):
         print(f"{self.name} is thinking...")
-        start_time = time.time()
-        time.sleep(1)
-        
+        start_time = time.perf_counter()
+        move = asyncio.run(self.make_move_async(board))
+        self.time_calculation(start_time)
+        return move
+
+    async def make_move_async(self, board):
+        """Ask the model for a move within self.deadline seconds while the
+        local search runs in a thread; the local move is played if the
+        model fails"""
+        available_moves = board.get_available_moves()
+        if self.cache is not None:
+            move = self.cache.lookup(board, self.symbol, self.model_name)
+            if move in available_moves:
+                print(f"{self.name} plays {move} from the response cache.")
+                self.last_source = "cache"
+                return move
+        loop = asyncio.get_running_loop()
+        local = None
+        if self.local_player is not None:
+            # larger boards can't be solved, keep the search inside the deadline
+            if board.cells > 9:
+                self.local_player.time_limit = self.deadline * 0.8
+            local = loop.run_in_executor(None, self.local_player.find_best_move, board, True)
+
+        try:
+            move = await asyncio.wait_for(self._request_move(board, available_moves), self.deadline)
+        except asyncio.TimeoutError:
+            print(f"gemini api missed the {self.deadline}s deadline.")
+            move = None
+
+        if move is not None:
+            self.last_source = "gemini"
+            if local is not None:
+                await self._stop_local(local)
+            return move
+        self.fallbacks += 1
+        if local is not None:
+            self.last_source = "local"
+            move = await local
+            print(f"using the local search's move {move} instead.")
+            return move
+        print("choosing first available move instead.")
+        self.last_source = "first"
+        return available_moves[0]
+
+    async def _stop_local(self, local):
+        # abort the local search and wait for its thread, so it neither holds
+        # up asyncio.run's executor shutdown nor overlaps the next search
+        from engine import SearchTimeout
+
+        engine = self.local_player.engine
+        engine.stop()
+        try:
+            await local
+        except SearchTimeout:
+            pass
+        finally:
+            engine.stop_requested = False
+
+    async def _request_move(self, board, available_moves):
+        """Query the model until it names a legal move, backing off between
+        attempts. Returns None when every attempt failed."""
+        prompt = self._build_prompt(board, available_moves)
+        start_time = time.perf_counter()
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(delay)
+                delay *= 2
+            self.attempts += 1
+            try:
+                if self.dispatcher is not None:
+                    move_text = await self.dispatcher.request(board, self.symbol, prompt)
+                else:
+                    move_text = (await self._generate(prompt)).text
+            except Exception as e:
+                print(f"error communicating with gemini api: {e}")
+                continue
+            move_text = move_text.strip()
+            print(f"Gemini response: {move_text}")
+            move = self._parse_move(move_text, available_moves)
+            if move is not None:
+                if self.cache is not None:
+                    self.cache.store(board, self.symbol, self.model_name, move,
+                                     time.perf_counter() - start_time)
+                return move
+            print(f"gemini api didn't return a valid move.")
+        return None
+
+    def prewarm(self, boards, concurrency=4):
+        """Fill the cache with the model's answers for boards (this player
+        to move on each), concurrency requests at a time. Returns the number
+        of answers added."""
+        if self.cache is None:
+            raise ValueError("prewarm needs a GeminiPlayer with a cache")
+        # rewriting the file after every answer would make prewarming
+        # quadratic in the cache size, it is written once at the end
+        autosave, self.cache.autosave = self.cache.autosave, False
+        try:
+            return asyncio.run(self._prewarm(boards, concurrency))
+        finally:
+            self.cache.autosave = autosave
+            self.cache.close()
+
+    async def _prewarm(self, boards, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        # one request per symmetry class, only for positions not cached yet
+        pending = {}
+        for board in boards:
+            key = self.cache.key(board, self.symbol, self.model_name)
+            if key not in self.cache.entries:
+                pending.setdefault(key, board)
+
+        async def warm(board):
+            async with semaphore:
+                move = await self._request_move(board, board.get_available_moves())
+            return move is not None
+
+        return sum(await asyncio.gather(*(warm(board) for board in pending.values())))
+
+    async def _generate(self, prompt):
+        if hasattr(self.model, "generate_content_async"):
+            return await self.model.generate_content_async(prompt)
+        return await asyncio.to_thread(self.model.generate_content, prompt)
+
+    def _parse_move(self, move_text, available_moves):
+        # extract the move number from the response
+        for word in move_text.split():
+            if word.isdigit() and int(word) in available_moves:
+                return int(word)
+        return None
+
+    def _build_prompt(self, board, available_moves):
         # format the current board state for the prompt
         board_representation = self._format_board_for_prompt(board)
-        available_moves = board.get_available_moves()
         opponent_symbol = 'X' if self.symbol == 'O' else 'O'
-        
+
         # prompt for gemini
-        prompt = f"""
+        return f"""
         you are an expert tic-tac-toe player playing as '{self.symbol}'. your opponent is playing as '{opponent_symbol}'.
-        
+        the board has {board.rows} rows and {board.cols} columns, {board.k} in a row wins.
+
         current board state:
         {board_representation}
-        
+
         available moves: {available_moves}
-        
+
         follow these strategic priorities in order:
         1. if you can win immediately, make that move
         2. if opponent has two in a row/column/diagonal and can win next turn, block them immediately
@@ -41,43 +215,20 @@ class GeminiPlayer(Player):
         5. if opponent could create a fork next turn, block it
         6. take a corner if available
         7. take a side if available
-        
-        respond with ONLY the number of your chosen move (1-{board.size*board.size}). no explanations.
+
+        respond with ONLY the number of your chosen move (1-{board.cells}). no explanations.
         """
-        
-        try:
-            # generate response from gemini api
-            response = self.model.generate_content(prompt)
-            move_text = response.text.strip()
-            print(f"Gemini response: {move_text}")
-            # extract the move number from the response
-            for word in move_text.split():
-                if word.isdigit() and int(word) in available_moves:
-                    self.time_calculation(start_time)
-                    return int(word)
-            
-            # if no valid move found in response, choose first available move
-            print(f"gemini api didn't return a valid move. using first available move.")
-            self.time_calculation(start_time)
-            return available_moves[0]
-            
-        except Exception as e:
-            print(f"error communicating with gemini api: {e}")
-            print("choosing first available move instead.")
-            self.time_calculation(start_time)
-            return available_moves[0]
-    
+
     def _format_board_for_prompt(self, board):
         """Format the board as a string representation for the prompt"""
         formatted_board = ""
         for i, row in enumerate(board.grid):
             formatted_board += " | ".join(row) + "\n"
-            if i < board.size - 1:
-                formatted_board += "-" * (board.size * 3 + (board.size - 1) * 2) + "\n"
+            if i < board.rows - 1:
+                formatted_board += "-" * (board.cols * 3 + (board.cols - 1) * 2) + "\n"
         return formatted_board
 
     def time_calculation(self, start_time):
-        end_time = time.time()
-        thinking_time = end_time - start_time
-        self.total_thinking_time += thinking_time
-        print(f"{self.total_thinking_time:.6f} seconds total to decide, {thinking_time:.6f} seconds thinking.")
\ No newline at end of file
+        thinking_time = time.perf_counter() - start_time
+        self.record_thinking_time(thinking_time)
+        print(f"{self.total_thinking_time:.6f} seconds total to decide, {thinking_time:.6f} seconds thinking.")
@@ -0,0 +1,69 @@
+"""
+Offline stand-in for genai.GenerativeModel.
+
+StubModel answers GeminiPlayer's prompts without a network or API key, with
+a configurable delay and failures, so the timeout, retry and fallback paths
+can be exercised locally:
+
+    player = GeminiPlayer("Gemini", "O", model=StubModel(delay=0.2, failures=1))
+
+It also answers gemini_batch's multi-board prompts, one "<game>: <move>"
+line per board, taking per_board_delay longer for every extra board.
+"""
+
+import asyncio
+import random
+import re
+import time
+
+_AVAILABLE = re.compile(r"available moves: \[([\d, ]*)\]")
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    def __init__(self, delay=0.05, failures=0, answer="random", seed=None, model_name="stub",
+                 per_board_delay=0.0):
+        self.delay = delay  # seconds per request
+        self.per_board_delay = per_board_delay
+        self.failures = failures  # the first N requests raise
+        # "random", "first" or "garbage" (a reply without a legal move)
+        self.answer = answer
+        self.model_name = model_name
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0  # most requests served at the same time
+
+    def _reply(self, prompt):
+        self.requests += 1
+        if self.requests <= self.failures:
+            raise ConnectionError("stub model: simulated failure")
+        if self.answer == "garbage":
+            return StubResponse("I would rather not say.")
+        replies = []
+        for available in _AVAILABLE.findall(prompt):
+            moves = [int(m) for m in available.split(",") if m.strip()]
+            replies.append(moves[0] if self.answer == "first" else self.rng.choice(moves))
+        if len(replies) == 1:
+            return StubResponse(str(replies[0]))
+        return StubResponse("\n".join(f"{game}: {move}" for game, move in enumerate(replies, 1)))
+
+    def _delay(self, prompt):
+        return self.delay + self.per_board_delay * max(0, prompt.count("available moves:") - 1)
+
+    def generate_content(self, prompt):
+        time.sleep(self._delay(prompt))
+        return self._reply(prompt)
+
+    async def generate_content_async(self, prompt):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self._delay(prompt))
+        finally:
+            self.in_flight -= 1
+        return self._reply(prompt)
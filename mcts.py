@@ -0,0 +1,252 @@
+"""
+Monte Carlo Tree Search player.
+
+UCT (UCB1 applied to trees) with uniformly random playouts on a BitBoard.
+The search runs for a number of simulations and/or a time budget, so it
+plays any board size, including the ones exhaustive search can't finish.
+
+After a move the subtree under the played move is kept; when the position
+at the next turn is that subtree's position plus one opponent stone, the
+search continues from the matching grandchild instead of from scratch.
+
+With playout_batch > 1 every expanded node gets that many random playouts
+at once, run together on NumPy arrays by batch_eval.random_playouts
+("leaf parallelization"), and the node is backed up with all their results.
+
+With workers > 1 the playouts are split over worker processes that each
+grow their own tree from the same root ("root parallelization") and the
+visit counts of the root moves are added up.
+"""
+
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bitboard import BitBoard
+from player import Player
+
+EXPLORATION = math.sqrt(2)
+DEFAULT_SIMULATIONS = 2000
+
+
+class MCTSNode:
+    __slots__ = ("move", "parent", "children", "untried", "visits", "wins", "player")
+
+    def __init__(self, move, parent, untried, player):
+        self.move = move
+        self.parent = parent
+        self.children = []
+        self.untried = untried  # moves not expanded yet
+        self.visits = 0
+        self.wins = 0.0  # for player, the side that made self.move
+        self.player = player
+
+    def select_child(self, exploration):
+        log_visits = math.log(self.visits)
+        return max(self.children, key=lambda child: child.wins / child.visits
+                   + exploration * math.sqrt(log_visits / child.visits))
+
+
+def _other(symbol):
+    return 'O' if symbol == 'X' else 'X'
+
+
+def _batch_playouts(board, to_move, count, generator):
+    """(X wins, O wins, ties) of count random playouts from board"""
+    import batch_eval
+
+    states = batch_eval.states_from_bits([board.bits['X']], [board.bits['O']], board.cells)
+    results = batch_eval.random_playouts(states.repeat(count, axis=0), to_move,
+                                         board.rows, board.cols, board.k, generator)
+    totals = results.tolist()
+    return totals.count(batch_eval.X_WINS), totals.count(batch_eval.O_WINS), totals.count(batch_eval.TIE)
+
+
+def run_simulations(board, symbol, simulations, deadline, exploration, rng, root=None, playout_batch=1):
+    """Grow the tree below root (a new one if None) for symbol to move on
+    board. Stops after simulations playouts or at the deadline, whichever
+    comes first (either may be None), but always runs at least one
+    iteration so the root has a child to play. Returns (root, playouts
+    run)."""
+    if root is None:
+        root = MCTSNode(None, None, board.get_available_moves(), _other(symbol))
+    generator = None
+    if playout_batch > 1:
+        import numpy as np
+        generator = np.random.default_rng(rng.getrandbits(64))
+    count = 0
+    iterations = 0
+    while simulations is None or count < simulations:
+        # checked after the first iteration and every 64th after that
+        if deadline is not None and iterations & 63 == 1 and time.perf_counter() > deadline:
+            break
+        iterations += 1
+        node = root
+        played = []
+        to_move = symbol
+        # selection
+        while not node.untried and node.children:
+            node = node.select_child(exploration)
+            board.make_move(node.move, to_move)
+            played.append(node.move)
+            to_move = _other(to_move)
+        # expansion
+        if node.untried and board.check_winner() is None:
+            move = node.untried.pop(rng.randrange(len(node.untried)))
+            board.make_move(move, to_move)
+            played.append(move)
+            child = MCTSNode(move, node, board.get_available_moves(), to_move)
+            node.children.append(child)
+            node = child
+            to_move = _other(to_move)
+        # playout: random order of the remaining cells, as (playouts, X
+        # wins, O wins, ties)
+        winner = board.check_winner()
+        if winner is None and generator is not None:
+            results = (playout_batch,) + _batch_playouts(board, to_move, playout_batch, generator)
+        else:
+            if winner is None:
+                moves = board.get_available_moves()
+                rng.shuffle(moves)
+                playout = []
+                for move in moves:
+                    board.make_move(move, to_move)
+                    playout.append(move)
+                    to_move = _other(to_move)
+                    winner = board.check_winner()
+                    if winner is not None:
+                        break
+                for move in reversed(playout):
+                    board.undo_move(move)
+            results = (1, int(winner == 'X'), int(winner == 'O'), int(winner == 'Tie'))
+        for move in reversed(played):
+            board.undo_move(move)
+        # backpropagation
+        playouts, x_wins, o_wins, ties = results
+        while node is not None:
+            node.visits += playouts
+            node.wins += (x_wins if node.player == 'X' else o_wins) + 0.5 * ties
+            node = node.parent
+        count += playouts
+    return root, count
+
+
+def _worker_search(encoding, symbol, simulations, time_left, exploration, seed, playout_batch):
+    board = BitBoard.from_encoding(encoding)
+    deadline = None if time_left is None else time.perf_counter() + time_left
+    root, count = run_simulations(board, symbol, simulations, deadline, exploration, random.Random(seed),
+                                  playout_batch=playout_batch)
+    return {child.move: (child.visits, child.wins) for child in root.children}, count
+
+
+class MCTSPlayer(Player):
+    is_human = False
+
+    def __init__(self, name, symbol, simulations=None, time_limit=None, exploration=EXPLORATION,
+                 reuse_tree=True, workers=1, seed=None, verbose=True, playout_batch=1):
+        super().__init__(name, symbol)
+        if simulations is None and time_limit is None:
+            simulations = DEFAULT_SIMULATIONS
+        self.simulations = simulations
+        self.time_limit = time_limit  # seconds per move
+        self.exploration = exploration
+        self.reuse_tree = reuse_tree
+        self.workers = workers
+        self.playout_batch = playout_batch  # random playouts per expanded node
+        self.verbose = verbose
+        self.rng = random.Random(seed)
+        self._executor = None
+        # tree kept from the last move: the node after our move and its position
+        self._root = None
+        self._root_position = None
+        self.playouts = 0  # playouts run for the last move
+        self.reused_visits = 0  # visits the last move inherited from the previous search
+        self.root_visits = {}  # move -> visits at the root of the last search
+
+    def make_move(self, board):
+        print(f"{self.name} is thinking...")
+        return self.find_best_move(board)
+
+    def _reused_root(self, board, symbol):
+        """The kept node for board's position, if it is one opponent move
+        away from the position after our last move"""
+        if self._root is None or self._root_position is None:
+            return None
+        rows, cols, k, x_bits, o_bits = self._root_position
+        if (rows, cols, k) != (board.rows, board.cols, board.k):
+            return None
+        mine = x_bits if symbol == 'X' else o_bits
+        theirs = o_bits if symbol == 'X' else x_bits
+        if board.bits[symbol] != mine:
+            return None
+        reply = board.bits[_other(symbol)] ^ theirs
+        if reply & (reply - 1) or reply & theirs or not reply:
+            return None  # not exactly one new opponent stone
+        move = reply.bit_length()
+        for child in self._root.children:
+            if child.move == move:
+                child.parent = None  # the rest of the old tree can be freed
+                return child
+        return None
+
+    def find_best_move(self, board):
+        start_time = time.perf_counter()
+        board = BitBoard.from_encoding(board.encode()) if isinstance(board, BitBoard) else BitBoard.from_board(board)
+        deadline = None if self.time_limit is None else start_time + self.time_limit
+
+        if self.workers > 1:
+            visits, self.playouts = self._parallel_search(board)
+            self.reused_visits = 0
+            root = None
+        else:
+            root = self._reused_root(board, self.symbol) if self.reuse_tree else None
+            self.reused_visits = root.visits if root is not None else 0
+            root, self.playouts = run_simulations(board, self.symbol, self.simulations, deadline,
+                                                  self.exploration, self.rng, root, self.playout_batch)
+            visits = {child.move: (child.visits, child.wins) for child in root.children}
+
+        # most visited move, ties to the lowest number
+        best_move = max(visits, key=lambda move: (visits[move][0], -move))
+        self.root_visits = {move: count for move, (count, _) in sorted(visits.items())}
+        if root is not None and self.reuse_tree:
+            self._root = next(child for child in root.children if child.move == best_move)
+            board.make_move(best_move, self.symbol)
+            self._root_position = board.encode()
+
+        thinking_time = time.perf_counter() - start_time
+        self.record_thinking_time(thinking_time)
+        if self.verbose:
+            count, wins = visits[best_move]
+            print(f"{self.total_thinking_time:.6f} seconds total to decide, {thinking_time:.6f} seconds thinking.")
+            print(f"{self.playouts} playouts ({self.reused_visits} reused), move {best_move} "
+                  f"won {wins / count:.1%} of {count} visits.")
+        return best_move
+
+    def _parallel_search(self, board):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.workers)
+        simulations = None
+        if self.simulations is not None:
+            simulations = -(-self.simulations // self.workers)
+        futures = [
+            self._executor.submit(_worker_search, board.encode(), self.symbol, simulations,
+                                  self.time_limit, self.exploration, self.rng.getrandbits(32),
+                                  self.playout_batch)
+            for _ in range(self.workers)
+        ]
+        visits = {}
+        playouts = 0
+        for future in futures:
+            counts, count = future.result()
+            playouts += count
+            for move, (child_visits, wins) in counts.items():
+                total_visits, total_wins = visits.get(move, (0, 0.0))
+                visits[move] = (total_visits + child_visits, total_wins + wins)
+        return visits, playouts
+
+    def close(self):
+        """Shut down the worker processes of a root-parallel player"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
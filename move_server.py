@@ -0,0 +1,330 @@
+"""
+Move-suggestion server and load generator.
+
+The server answers "best move for this position" over TCP or a Unix socket,
+one JSON object per line each way, any number of requests in flight per
+connection (answers carry the request's id):
+
+    {"id": 7, "position": [rows, cols, k, x_bits, o_bits], "side": "O", "max_depth": 4}
+    {"id": 7, "move": 5, "score": 0.0, "pv": [5, 1], "source": "search"}
+
+position is BitBoard.encode(); side defaults to the side whose turn it is
+when X moved first, max_depth / time_limit to the server's limits.
+{"op": "stats"} returns the server's counters.
+
+Searches run on a process pool whose workers each keep one
+engine.SearchEngine, so transposition tables stay warm between requests
+(for either side, the tables are keyed on the side to move).
+Answers go into one LRU cache shared by all clients, keyed by the
+symmetry-canonical position (a rotated or mirrored position is a hit), and
+concurrent requests for the same position wait on a single search
+("source" says which of cache, shared or search answered).
+
+    python move_server.py serve --port 8765 --workers 4
+    python move_server.py load --port 8765 --size 4 --requests 2000 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from bitboard import BitBoard
+from opening_book import canonical_code
+from tournament import percentile
+
+DEFAULT_PORT = 8765
+MAX_CELLS = 15 * 15
+ENGINE_OPTIONS = dict(use_negascout=True, use_transposition=True, move_ordering=True, tt_size=1 << 18)
+
+_engine = None
+
+
+def _init_worker(options):
+    global _engine
+    from engine import SearchEngine
+
+    _engine = SearchEngine(**options)
+
+
+def _search(encoding, side, max_depth, time_limit):
+    result = _engine.search(encoding, side, max_depth, time_limit)
+    return result.move, result.score, result.pv, result.stats.nodes
+
+
+def parse_position(encoding, side=None):
+    """(BitBoard, side) for a request, ValueError if it is not a legal
+    position with a move left to play"""
+    if not isinstance(encoding, (list, tuple)) or len(encoding) != 5:
+        raise ValueError("position must be [rows, cols, k, x_bits, o_bits]")
+    if not all(isinstance(value, int) and value >= 0 for value in encoding):
+        raise ValueError("position values must be non-negative integers")
+    rows, cols, k, x_bits, o_bits = encoding
+    if not (1 <= rows and 1 <= cols and rows * cols <= MAX_CELLS and 1 <= k <= max(rows, cols)):
+        raise ValueError(f"unsupported board {rows}x{cols} with k={k}")
+    if x_bits & o_bits or (x_bits | o_bits) >> (rows * cols):
+        raise ValueError("stones overlap or lie outside the board")
+    board = BitBoard.from_encoding(tuple(encoding))
+    if board.check_winner() is not None:
+        raise ValueError("the game is already over")
+    if side is None:
+        side = 'X' if x_bits.bit_count() == o_bits.bit_count() else 'O'
+    elif side not in ('X', 'O'):
+        raise ValueError("side must be 'X' or 'O'")
+    return board, side
+
+
+class MoveServer:
+    def __init__(self, workers=None, cache_size=100000, max_depth=None, time_limit=1.0,
+                 engine_options=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.cache_size = cache_size
+        # limits of requests that don't set their own
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self.engine_options = dict(ENGINE_OPTIONS if engine_options is None else engine_options)
+        self.cache = OrderedDict()  # key -> (canonical move, score, canonical pv)
+        self.in_flight = {}  # key -> future of the search for it
+        self.counts = Counter()  # requests, cache, shared, search, error
+        self.nodes = 0
+        self.search_time = 0.0
+        self._executor = None
+        self._server = None
+        self._clients = {}  # writer -> handler task of each open connection
+
+    async def start(self, host="127.0.0.1", port=DEFAULT_PORT, path=None):
+        """Listen on a Unix socket at path, or on host:port"""
+        self._executor = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                             initargs=(self.engine_options,))
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._serve_client, path)
+        else:
+            self._server = await asyncio.start_server(self._serve_client, host, port)
+        return self._server
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._clients):
+                writer.close()
+            await asyncio.gather(*self._clients.values(), return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    async def suggest(self, encoding, side=None, max_depth=None, time_limit=None):
+        """Answer one request: {"move", "score", "pv", "source"}"""
+        self.counts["requests"] += 1
+        board, side = parse_position(encoding, side)
+        if max_depth is None and time_limit is None:
+            max_depth, time_limit = self.max_depth, self.time_limit
+        code, perm = canonical_code(board)
+        key = (board.rows, board.cols, board.k, code, side, max_depth, time_limit)
+
+        entry = self.cache.get(key)
+        if entry is not None:
+            self.cache.move_to_end(key)
+            source = "cache"
+        elif key in self.in_flight:
+            entry = await asyncio.shield(self.in_flight[key])
+            source = "shared"
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self.in_flight[key] = future
+            try:
+                entry = await self._search(board, side, max_depth, time_limit, perm)
+            except Exception as e:
+                future.set_exception(e)
+                future.exception()  # retrieved, waiters get their own copy
+                raise
+            finally:
+                del self.in_flight[key]
+            future.set_result(entry)
+            self.cache[key] = entry
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+            source = "search"
+        self.counts[source] += 1
+        move, score, pv = entry
+        # back from the canonical image to the request's orientation
+        return {"move": perm.index(move - 1) + 1, "score": score,
+                "pv": [perm.index(step - 1) + 1 for step in pv], "source": source}
+
+    async def _search(self, board, side, max_depth, time_limit, perm):
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        move, score, pv, nodes = await loop.run_in_executor(
+            self._executor, _search, board.encode(), side, max_depth, time_limit)
+        self.search_time += time.perf_counter() - start
+        self.nodes += nodes
+        # stored for the canonical image so every symmetric position shares it
+        return perm[move - 1] + 1, score, [perm[step - 1] + 1 for step in pv]
+
+    def stats(self):
+        return {"requests": self.counts["requests"], "cache_hits": self.counts["cache"],
+                "shared": self.counts["shared"], "searches": self.counts["search"],
+                "errors": self.counts["error"], "cache_entries": len(self.cache),
+                "in_flight": len(self.in_flight), "nodes": self.nodes,
+                "search_time_s": round(self.search_time, 3)}
+
+    async def _serve_client(self, reader, writer):
+        tasks = set()
+        self._clients[writer] = asyncio.current_task()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.create_task(self._answer(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except ConnectionError:
+            pass
+        finally:
+            self._clients.pop(writer, None)
+            writer.close()
+
+    async def _answer(self, line, writer):
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            if request.get("op") == "stats":
+                reply = self.stats()
+            else:
+                reply = await self.suggest(request.get("position"), request.get("side"),
+                                           request.get("max_depth"), request.get("time_limit"))
+        except (ValueError, TypeError, AttributeError) as e:
+            self.counts["error"] += 1
+            reply = {"error": str(e)}
+        reply["id"] = request_id
+        writer.write(json.dumps(reply).encode() + b"\n")
+        await writer.drain()
+
+
+async def serve(host="127.0.0.1", port=DEFAULT_PORT, path=None, **options):
+    server = MoveServer(**options)
+    listener = await server.start(host, port, path)
+    print(f"Serving moves on {path or f'{host}:{port}'} with {server.workers} workers")
+    try:
+        await listener.serve_forever()
+    finally:
+        await server.close()
+
+
+def sample_positions(size=3, count=200, seed=0):
+    """Encodings of count positions from random games, none of them over"""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board = BitBoard(size)
+        symbol = 'X'
+        for _ in range(rng.randrange(size * size - 1)):
+            board.make_move(rng.choice(board.get_available_moves()), symbol)
+            symbol = 'O' if symbol == 'X' else 'X'
+            if board.check_winner() is not None:
+                break
+        if board.check_winner() is None:
+            positions.append(board.encode())
+    return positions
+
+
+async def _open(host, port, path):
+    if path is not None:
+        return await asyncio.open_unix_connection(path, limit=1 << 20)
+    return await asyncio.open_connection(host, port, limit=1 << 20)
+
+
+async def run_load(positions, requests=1000, concurrency=16, host="127.0.0.1", port=DEFAULT_PORT,
+                   path=None, seed=0, **limits):
+    """Send requests picked at random from positions over concurrency
+    connections, each waiting for its answer before the next request.
+    Returns throughput, p50/p99 latency and where the answers came from."""
+    rng = random.Random(seed)
+    picks = [rng.choice(positions) for _ in range(requests)]
+    latencies = []
+    sources = Counter()
+
+    async def client(first):
+        reader, writer = await _open(host, port, path)
+        try:
+            for n in range(first, requests, concurrency):
+                request = {"id": n, "position": list(picks[n]), **limits}
+                start = time.perf_counter()
+                writer.write(json.dumps(request).encode() + b"\n")
+                await writer.drain()
+                reply = json.loads(await reader.readline())
+                latencies.append(time.perf_counter() - start)
+                sources[reply.get("source", "error")] += 1
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(first) for first in range(concurrency)))
+    seconds = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "seconds": round(seconds, 3),
+        "requests_per_s": round(requests / seconds, 1),
+        "latency_p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "latency_p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "sources": dict(sources),
+    }
+
+
+async def server_stats(host="127.0.0.1", port=DEFAULT_PORT, path=None):
+    reader, writer = await _open(host, port, path)
+    writer.write(b'{"op": "stats"}\n')
+    await writer.drain()
+    reply = json.loads(await reader.readline())
+    writer.close()
+    return reply
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("command", choices=("serve", "load"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", default=None, help="Unix socket path instead of TCP")
+    parser.add_argument("--workers", type=int, default=None, help="search processes (default: all cores)")
+    parser.add_argument("--max-depth", type=int, default=None)
+    parser.add_argument("--time-limit", type=float, default=None,
+                        help="seconds per search (serve default 1.0)")
+    parser.add_argument("--size", type=int, default=3, help="load: board size of the positions")
+    parser.add_argument("--positions", type=int, default=200, help="load: distinct positions")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        time_limit = 1.0 if args.time_limit is None and args.max_depth is None else args.time_limit
+        try:
+            asyncio.run(serve(args.host, args.port, args.unix, workers=args.workers,
+                              max_depth=args.max_depth, time_limit=time_limit))
+        except KeyboardInterrupt:
+            pass
+        return
+    limits = {}
+    if args.max_depth is not None:
+        limits["max_depth"] = args.max_depth
+    if args.time_limit is not None:
+        limits["time_limit"] = args.time_limit
+    positions = sample_positions(args.size, args.positions, args.seed)
+    report = asyncio.run(run_load(positions, args.requests, args.concurrency, args.host, args.port,
+                                  args.unix, args.seed, **limits))
+    report["server"] = asyncio.run(server_stats(args.host, args.port, args.unix))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
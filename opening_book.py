@@ -0,0 +1,256 @@
+"""
+Precomputed opening book / endgame tablebase.
+
+A position is numbered by its base-3 code: cell i contributes digit
+0 (empty), 1 (X) or 2 (O) times 3**i. Together with the side to move
+(0 for X, 1 for O) that gives the book index code * 2 + side.
+
+3x3 books are dense: every reachable position is solved once, offline, and
+the table holds 2 bytes per index (best move, value + 128) so a lookup is
+one read from the memory-mapped file. The value uses AIPlayer's scoring
+(win_score - depth from the side to move's point of view) and ties go to
+the lowest numbered move, so the book plays exactly like the full search.
+
+Bigger boards can't be solved this way. For them a sparse book covers the
+positions of the first N plies: sorted index keys of the symmetry-canonical
+positions with the move and value AIPlayer's search found for each, looked
+up by binary search.
+
+Generate the default books with `python opening_book.py`.
+"""
+
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left
+
+from bitboard import BitBoard
+from symmetry import symmetries
+
+MAGIC = b"TTTB"
+HEADER = struct.Struct("<4sBBBxI")  # magic, version, size, sparse, count
+VERSION = 1
+BOOK_DIR = os.path.dirname(os.path.abspath(__file__))
+NO_MOVE = 0xFF
+
+
+def book_path(size):
+    return os.path.join(BOOK_DIR, f"book_{size}x{size}.bin")
+
+
+def position_code(board):
+    """Base-3 code of a BitBoard's position"""
+    code = 0
+    x_bits = board.bits['X']
+    o_bits = board.bits['O']
+    power = 1
+    for i in range(board.cells):
+        if x_bits >> i & 1:
+            code += power
+        elif o_bits >> i & 1:
+            code += 2 * power
+        power *= 3
+    return code
+
+
+def board_from_code(code, size):
+    """Inverse of position_code()"""
+    board = BitBoard(size)
+    for i in range(size * size):
+        code, digit = divmod(code, 3)
+        if digit:
+            board.make_move(i + 1, 'X' if digit == 1 else 'O')
+    return board
+
+
+def canonical_code(board):
+    """Return (smallest code among the symmetric images, perm that maps the
+    position onto that image)"""
+    x_bits = board.bits['X']
+    o_bits = board.bits['O']
+    best = None
+    for perm in symmetries(board.rows, board.cols):
+        code = 0
+        for i in range(board.cells):
+            if x_bits >> i & 1:
+                code += 3 ** perm[i]
+            elif o_bits >> i & 1:
+                code += 2 * 3 ** perm[i]
+        if best is None or code < best[0]:
+            best = (code, perm)
+    return best
+
+
+def _side(symbol):
+    return 0 if symbol == 'X' else 1
+
+
+class OpeningBook:
+    def __init__(self, size, sparse, data=None, keys=None, moves=None, values=None):
+        self.size = size
+        self.sparse = sparse
+        self.data = data  # dense: bytes-like, 2 bytes per index
+        self.keys = keys  # sparse: sorted array('Q') of indexes
+        self.moves = moves
+        self.values = values  # sparse: value * 1000 as array('i')
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, board, symbol):
+        """Return (best move, value) for symbol to move on board, or None
+        when the position isn't in the book"""
+        if board.size != self.size or board.k != self.size:
+            return None
+        if not self.sparse:
+            index = (position_code(board) * 2 + _side(symbol)) * 2
+            move = self.data[index]
+            if move == NO_MOVE:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return move, self.data[index + 1] - 128
+
+        code, perm = canonical_code(board)
+        key = code * 2 + _side(symbol)
+        i = bisect_left(self.keys, key)
+        if i == len(self.keys) or self.keys[i] != key:
+            self.misses += 1
+            return None
+        self.hits += 1
+        # the stored move is for the canonical image, map it back
+        move = perm.index(self.moves[i] - 1) + 1
+        return move, self.values[i] / 1000
+
+    def save(self, path):
+        # write then rename, so a process loading the book never sees half a file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            if not self.sparse:
+                f.write(HEADER.pack(MAGIC, VERSION, self.size, 0, len(self.data) // 2))
+                f.write(bytes(self.data))
+            else:
+                f.write(HEADER.pack(MAGIC, VERSION, self.size, 1, len(self.keys)))
+                self.keys.tofile(f)
+                self.moves.tofile(f)
+                self.values.tofile(f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            magic, version, size, sparse, count = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not an opening book")
+            if not sparse:
+                # the dense table is read straight from the page cache
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                return cls(size, False, data=memoryview(data)[HEADER.size:])
+            keys, moves, values = array('Q'), array('B'), array('i')
+            keys.fromfile(f, count)
+            moves.fromfile(f, count)
+            values.fromfile(f, count)
+            return cls(size, True, keys=keys, moves=moves, values=values)
+
+    @classmethod
+    def load_default(cls, size, build_missing=True):
+        """Load book_{size}x{size}.bin, building the 3x3 book first if it
+        doesn't exist yet. Returns None if there is no book for the size."""
+        path = book_path(size)
+        if not os.path.exists(path):
+            if size != 3 or not build_missing:
+                return None
+            build_dense_book(3).save(path)
+        return cls.load(path)
+
+
+def build_dense_book(size=3, win_score=10):
+    """Solve every position reachable from the empty board, with either
+    side starting"""
+    table = bytearray([NO_MOVE, 128]) * (3 ** (size * size) * 2)
+    board = BitBoard(size)
+    solved = {}
+
+    def solve(symbol):
+        # score of the best move for symbol, AIPlayer's scale
+        key = (board.bits['X'], board.bits['O'], symbol)
+        if key in solved:
+            return solved[key]
+        opponent = 'O' if symbol == 'X' else 'X'
+        best_score, best_move = None, None
+        for move in board.get_available_moves():
+            board.make_move(move, symbol)
+            winner = board.check_winner()
+            if winner == symbol:
+                score = win_score
+            elif winner == 'Tie':
+                score = 0
+            else:
+                # one ply further from the end than the opponent's score
+                reply = solve(opponent)
+                score = -reply + 1 if reply > 0 else -reply - 1 if reply < 0 else 0
+            board.undo_move(move)
+            if best_score is None or score > best_score:
+                best_score, best_move = score, move
+        index = (position_code(board) * 2 + _side(symbol)) * 2
+        table[index] = best_move
+        table[index + 1] = best_score + 128
+        solved[key] = best_score
+        return best_score
+
+    solve('X')
+    solve('O')
+    return OpeningBook(size, False, data=table)
+
+
+def build_sparse_book(size=4, plies=3, time_limit=0.5, progress=True):
+    """Search every symmetry-canonical position of the first `plies` plies
+    (either side starting) with the search engine and keep its move and score"""
+    from engine import search
+
+    positions = {}
+    frontier = []
+    for first in ('X', 'O'):
+        frontier.append((BitBoard(size), first))
+    for _ in range(plies):
+        next_frontier = []
+        for board, symbol in frontier:
+            if board.check_winner() is not None:
+                continue
+            key = canonical_code(board)[0] * 2 + _side(symbol)
+            if key in positions:
+                continue
+            positions[key] = (board, symbol)
+            opponent = 'O' if symbol == 'X' else 'X'
+            for move in board.get_available_moves():
+                child = board.copy()
+                child.make_move(move, symbol)
+                next_frontier.append((child, opponent))
+        frontier = next_frontier
+
+    keys, moves, values = array('Q'), array('B'), array('i')
+    start = time.perf_counter()
+    for n, key in enumerate(sorted(positions)):
+        board, symbol = positions[key]
+        _, perm = canonical_code(board)
+        result = search(board, symbol, time_limit=time_limit, use_negascout=True, use_transposition=True,
+                        use_symmetry=True, move_ordering=True)
+        keys.append(key)
+        moves.append(perm[result.move - 1] + 1)  # stored for the canonical image
+        values.append(round(result.score * 1000))
+        if progress:
+            print(f"\r{n + 1}/{len(positions)} positions, {time.perf_counter() - start:.0f}s", end="")
+    if progress:
+        print()
+    return OpeningBook(size, True, keys=keys, moves=moves, values=values)
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    build_dense_book(3).save(book_path(3))
+    print(f"3x3 book written to {book_path(3)} in {time.perf_counter() - start:.1f}s")
+    plies = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    build_sparse_book(4, plies).save(book_path(4))
+    print(f"4x4 book ({plies} plies) written to {book_path(4)}")
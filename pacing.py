@@ -0,0 +1,70 @@
+"""
+Move pacing and game clocks.
+
+All deliberate waiting happens in a GameClock, never inside a player's
+make_move: interactive pacing pauses before computer moves so a human can
+follow the game, zero-delay pacing (GameClock.instant()) doesn't wait at
+all. The clock times every move with time.perf_counter and keeps the
+players' engine time apart from display time (printing boards, drawing
+visualizations) and pacing time.
+"""
+
+import time
+from contextlib import contextmanager
+
+INTERACTIVE_DELAY = 1.0  # seconds before each computer move
+
+
+class GameClock:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.engine_time = {}  # player name -> seconds reported by the player
+        self.moves = {}  # player name -> moves played
+        self.display_time = 0.0
+        self.pacing_time = 0.0
+
+    @classmethod
+    def interactive(cls, delay=INTERACTIVE_DELAY):
+        return cls(delay)
+
+    @classmethod
+    def instant(cls):
+        return cls(0.0)
+
+    def pause(self):
+        if self.delay > 0:
+            start = time.perf_counter()
+            time.sleep(self.delay)
+            self.pacing_time += time.perf_counter() - start
+
+    @contextmanager
+    def display(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.display_time += time.perf_counter() - start
+
+    def move(self, player, board):
+        """Get player's move, pausing first for computer players. Time the
+        player reports through record_thinking_time counts as engine time,
+        the rest of make_move (its printing, visualizations) as display."""
+        if not player.is_human:
+            self.pause()
+        player.last_thinking_time = None
+        start = time.perf_counter()
+        move = player.make_move(board)
+        elapsed = time.perf_counter() - start
+        thinking = player.last_thinking_time
+        if thinking is None:
+            thinking = elapsed
+        self.engine_time[player.name] = self.engine_time.get(player.name, 0.0) + thinking
+        self.moves[player.name] = self.moves.get(player.name, 0) + 1
+        self.display_time += max(0.0, elapsed - thinking)
+        return move
+
+    def report(self):
+        for name, seconds in self.engine_time.items():
+            moves = self.moves[name]
+            print(f"{name}: {seconds:.6f} seconds over {moves} moves ({seconds / moves:.6f} per move).")
+        print(f"Display {self.display_time:.3f} seconds, pacing {self.pacing_time:.3f} seconds.")
@@ -0,0 +1,110 @@
+"""
+Root-split parallel search.
+
+The root moves of a position are spread over a ProcessPoolExecutor, in the
+spirit of Young Brothers Wait: the first ("eldest") root move is searched
+in the calling process to get a real score, then the remaining moves go to
+the workers. All workers share the best root score found so far through a
+multiprocessing.Value and use it as their alpha, so a worker that starts
+after a strong move was found gets the same cutoffs the serial search would.
+
+Workers only receive the compact BitBoard encoding (rows, cols, k, X bits, O bits)
+and the engine's search options. Each worker process keeps its own
+SearchEngine, so its transposition table lives on between tasks.
+"""
+
+import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bitboard import BitBoard
+
+_shared_alpha = None
+_engines = {}
+
+
+def _init_worker(shared_alpha):
+    global _shared_alpha
+    _shared_alpha = shared_alpha
+
+
+def _worker_engine(options):
+    from engine import SearchEngine
+
+    key = repr(sorted(options.items()))
+    if key not in _engines:
+        _engines[key] = SearchEngine(**options)
+    return _engines[key]
+
+
+def _search_move(encoding, move, symbol, options, depth_limit, time_left):
+    """Score one root move in a worker. Returns (move, score, nodes); score
+    is None if the time ran out."""
+    from engine import SearchTimeout, NULL_WINDOW
+
+    engine = _worker_engine(options)
+    engine.side = symbol
+    board = BitBoard.from_encoding(encoding, engine.use_symmetry)
+    engine._prepare_search(board)
+    engine._depth_limit = depth_limit
+    if time_left is not None:
+        engine._deadline = time.perf_counter() + time_left
+    # just under the best score, so a move that ties it is still scored
+    # exactly and the lowest numbered of equal moves can win
+    alpha = _shared_alpha.value - NULL_WINDOW
+    try:
+        score = engine._score_root_move(board, move, alpha)
+    except SearchTimeout:
+        return move, None, engine.nodes_searched
+    finally:
+        engine._depth_limit = None
+        engine._deadline = None
+    with _shared_alpha.get_lock():
+        if score > _shared_alpha.value:
+            _shared_alpha.value = score
+    return move, score, engine.nodes_searched
+
+
+class ParallelRootSearch:
+    def __init__(self, workers):
+        self.workers = workers
+        self.shared_alpha = multiprocessing.Value('d', -math.inf)
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(self.shared_alpha,)
+        )
+
+    def search(self, engine, board, moves):
+        """Return (best move, score) for engine.side to move on board"""
+        from engine import SearchTimeout
+
+        # eldest brother first, in this process, so the workers start with
+        # a real alpha instead of -infinity
+        best_move = moves[0]
+        best_score = engine._score_root_move(board, best_move)
+        self.shared_alpha.value = best_score
+
+        time_left = None
+        if engine._deadline is not None:
+            time_left = max(0.0, engine._deadline - time.perf_counter())
+        encoding = board.encode()
+        futures = [
+            self.executor.submit(_search_move, encoding, move, engine.side,
+                                 engine.search_options, engine._depth_limit, time_left)
+            for move in moves[1:]
+        ]
+        timed_out = False
+        for future in futures:
+            move, score, nodes = future.result()
+            engine.nodes_searched += nodes
+            if score is None:
+                timed_out = True
+            elif score > best_score or (score == best_score and move < best_move):
+                best_score = score
+                best_move = move
+        if timed_out:
+            raise SearchTimeout()
+        return best_move, best_score
+
+    def close(self):
+        self.executor.shutdown()
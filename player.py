@@ -2,23 +2,29 @@ import time
 
 
 class Player:
+    is_human = True  # computer players pause before moving in interactive games
+
     def __init__(self, name, symbol):
         self.name = name
         self.symbol = symbol  # 'X' or 'O'
         self.total_thinking_time = 0
+        self.last_thinking_time = None
+
+    def record_thinking_time(self, seconds):
+        """Every player type reports the time spent deciding a move here"""
+        self.last_thinking_time = seconds
+        self.total_thinking_time += seconds
 
     def make_move(self, board):
         while True:
             try:
-                max_moves = board.size * board.size
-                start_time = time.time()
+                max_moves = board.cells
+                start_time = time.perf_counter()
                 move = int(input(f"{self.name}, enter number (1-{max_moves}): "))
                 if 1 <= move <= max_moves and board.is_valid_move(move):
-                    end_time = time.time()
-                    thinking_time = end_time - start_time
-                    self.total_thinking_time += thinking_time
+                    self.record_thinking_time(time.perf_counter() - start_time)
                     return move
                 else:
                     print("Invalid move! Try again.")
             except ValueError:
-                print(f"Please enter a number between 1 and {max_moves}!")
\ No newline at end of file
+                print(f"Please enter a number between 1 and {max_moves}!")
@@ -0,0 +1,133 @@
+"""
+Pondering: searching on the opponent's time.
+
+After an AIPlayer moves, a Ponderer thread takes the position with the
+opponent to move and searches our answer to each of their replies in turn,
+the predicted reply (second move of the principal variation) first and the
+rest best looking first. The searches use the player's own SearchEngine, so
+besides the finished answers the transposition table and history scores
+fill up for the real search.
+
+When the opponent's move comes in the thread is stopped (a search in
+progress is aborted, see SearchEngine.stop) and a finished answer for that
+reply is played at once. Everything else falls back to a normal search.
+
+The thread only gets CPU time while the opponent waits without holding the
+GIL: a human at input(), a GeminiPlayer waiting on the API. Against another
+AIPlayer in the same process it would only slow both down.
+"""
+
+import threading
+
+from engine import SearchTimeout, to_bitboard
+
+
+class Ponderer:
+    def __init__(self, engine, symbol, max_depth=None, time_limit=None, collect_stats=False):
+        self.engine = engine
+        self.symbol = symbol  # the side we ponder for
+        # limits of every pondered search, the player's per-move limits
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self.collect_stats = collect_stats
+        self.results = {}  # position encoding after a reply -> SearchResult
+        self.predicted = None  # the reply expected by the principal variation
+        self._thread = None
+        self._saved = None
+        # over the whole game: opponent moves pondered on, moves answered from
+        # a finished ponder search, and moves that were the predicted reply
+        self.moves = 0
+        self.hits = 0
+        self.predicted_hits = 0
+        self.searched = 0  # ponder searches finished
+
+    def start(self, board, move, pv=()):
+        """Ponder the position after our move on board (the caller's board
+        is not modified). pv is the principal variation starting with move."""
+        self.stop()
+        position = to_bitboard(board)
+        position.make_move(move, self.symbol)
+        self.results = {}
+        self.predicted = pv[1] if len(pv) > 1 else None
+        if position.check_winner() is not None:
+            return
+        engine = self.engine
+        # ponder searches draw no trees and stay in this process
+        self._saved = (engine.tracer, engine.workers)
+        engine.tracer = None
+        engine.workers = 1
+        engine.stop_requested = False
+        self._thread = threading.Thread(target=self._run, args=(position,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Abort pondering and wait for the thread, the engine is free again
+        on return"""
+        if self._thread is None:
+            return
+        self.engine.stop()
+        self._thread.join()
+        self._thread = None
+        self.engine.tracer, self.engine.workers = self._saved
+        self.engine.stop_requested = False
+
+    def answer(self, board):
+        """Stop pondering and return the finished SearchResult for board's
+        position, or None; counted towards the hit rate"""
+        pondering = self._thread is not None
+        self.stop()
+        if not pondering:
+            return None
+        position = to_bitboard(board)
+        self.moves += 1
+        if self.predicted is not None and position.bits[_other(self.symbol)] >> (self.predicted - 1) & 1:
+            self.predicted_hits += 1
+        result = self.results.get(position.encode())
+        self.results = {}
+        if result is not None:
+            self.hits += 1
+        return result
+
+    def hit_rate(self):
+        return self.hits / self.moves if self.moves else 0.0
+
+    def _replies(self, position):
+        opponent = _other(self.symbol)
+        evaluator = self.engine.evaluator
+        scores = {}
+        for reply in position.get_available_moves():
+            position.make_move(reply, opponent)
+            winner = position.check_winner()
+            scores[reply] = 2 if winner == opponent else evaluator(position, opponent) if winner is None else 0
+            position.undo_move(reply)
+        replies = sorted(scores, key=lambda reply: (-scores[reply], reply))
+        if self.predicted in scores:
+            replies.remove(self.predicted)
+            replies.insert(0, self.predicted)
+        return replies
+
+    def _run(self, position):
+        engine = self.engine
+        opponent = _other(self.symbol)
+        for reply in self._replies(position):
+            if engine.stop_requested:
+                return
+            position.make_move(reply, opponent)
+            try:
+                if position.check_winner() is None:
+                    result = engine.search(position, self.symbol, self.max_depth, self.time_limit,
+                                           collect_stats=self.collect_stats, pv=False, stoppable=True)
+                    # an iterative deepening search returns its last finished
+                    # iteration when stopped, that's not the full answer
+                    if engine.stop_requested:
+                        return
+                    self.results[position.encode()] = result
+                    self.searched += 1
+            except SearchTimeout:
+                return
+            finally:
+                position.undo_move(reply)
+
+
+def _other(symbol):
+    return 'O' if symbol == 'X' else 'X'
@@ -0,0 +1,326 @@
+"""
+Retrograde solver: the game-theoretic value of every position of a small
+square board (k = size, X moves first), for perfect play on 4x4.
+
+Positions are solved level by level, from the full board back to the empty
+one: a level is every position with the same number of stones, and each
+position's value only depends on its children one level up, which are all
+solved by then. Terminal positions (a line for the side that just moved, or
+a full board) are valued directly.
+
+Values are 2 bits per position (WIN, DRAW or LOSS for the side to move,
+UNKNOWN for positions that are unreachable or not solved yet) in a
+memory-mapped file indexed by the position's base-3 code (opening_book's
+position_code). Only the symmetry-canonical position of each class is
+solved and stored, its images stay UNKNOWN; lookups canonicalize first.
+4x4 is 3**16 codes, a 10.8MB file, of which about 1.3 million positions
+are canonical and reachable.
+
+A level is split into blocks of the code space (the high digits fixed) that
+worker processes solve against the memory-mapped table; the main process
+writes their results, so no two processes ever write one byte. After every
+level the table is flushed and a checkpoint file records it, and running
+the solver again resumes below the last finished level.
+
+    python retrograde.py --size 4 --workers 4
+
+AIPlayer(opening_book=True) plays from solved_NxN.bin when it exists (see
+SearchEngine._book_for), or pass opening_book=SolvedTable.load(path).
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from opening_book import BOOK_DIR
+from symmetry import symmetries
+
+MAGIC = b"TTTR"
+HEADER = struct.Struct("<4sBBBB")  # magic, version, size, k, complete
+VERSION = 1
+UNKNOWN, LOSS, DRAW, WIN = 0, 1, 2, 3  # for the side to move
+# a block of the code space holds every setting of this many low digits
+BLOCK_DIGITS = 12
+
+_contexts = {}
+
+
+def table_path(size):
+    return os.path.join(BOOK_DIR, f"solved_{size}x{size}.bin")
+
+
+def _checkpoint_path(path):
+    return f"{path}.checkpoint"
+
+
+def _table_bytes(size):
+    return (3 ** (size * size) + 3) // 4
+
+
+class _Context:
+    """Per-process arrays for solving blocks of one table"""
+
+    def __init__(self, path, size):
+        import numpy as np
+        from batch_eval import line_matrix
+
+        cells = size * size
+        self.size = size
+        self.low_digits = min(BLOCK_DIGITS, cells)
+        self.high_digits = cells - self.low_digits
+        codes = np.arange(3 ** self.low_digits, dtype=np.int64)
+        self.digits = ((codes[:, None] // 3 ** np.arange(self.low_digits, dtype=np.int64)) % 3).astype(np.int8)
+        self.x_counts = (self.digits == 1).sum(axis=1, dtype=np.int8)
+        self.o_counts = (self.digits == 2).sum(axis=1, dtype=np.int8)
+        # powers[i, s]: value of one X on cell i in the code of symmetric image s
+        self.powers = np.array([[3 ** perm[i] for perm in symmetries(size)] for i in range(cells)], dtype=np.int64)
+        self.lines = line_matrix(size, size, size)
+        self.table = np.memmap(path, dtype=np.uint8, mode="r", offset=HEADER.size, shape=(_table_bytes(size),))
+
+
+def _context(path, size):
+    if (path, size) not in _contexts:
+        _contexts[path, size] = _Context(path, size)
+    return _contexts[path, size]
+
+
+def _read(table, codes):
+    return (table[codes >> 2] >> ((codes & 3) * 2).astype(table.dtype)) & 3
+
+
+def _solve_block(path, size, level, block):
+    """(codes, values) of the canonical positions with level stones whose
+    high digits are block"""
+    import numpy as np
+
+    context = _context(path, size)
+    cells = size * size
+    high = [block // 3 ** i % 3 for i in range(context.high_digits)]
+    x_count = (level + 1) // 2
+    o_count = level // 2
+    low = np.flatnonzero((context.x_counts == x_count - high.count(1))
+                         & (context.o_counts == o_count - high.count(2)))
+    empty = np.empty(0, dtype=np.int64)
+    if not low.size:
+        return empty, empty.astype(np.uint8)
+    codes = block * 3 ** context.low_digits + low
+    digits = np.empty((low.size, cells), dtype=np.int8)
+    digits[:, :context.low_digits] = context.digits[low]
+    digits[:, context.low_digits:] = high
+
+    images = digits.astype(np.int64) @ context.powers
+    canonical = images.min(axis=1) == codes
+    codes, digits, images = codes[canonical], digits[canonical], images[canonical]
+    values = np.zeros(len(codes), dtype=np.uint8)
+
+    x_lines = ((digits == 1).astype(np.float32) @ context.lines == size).any(axis=1)
+    o_lines = ((digits == 2).astype(np.float32) @ context.lines == size).any(axis=1)
+    # X is to move on even levels
+    mover_lines, last_lines = (x_lines, o_lines) if level % 2 == 0 else (o_lines, x_lines)
+    values[last_lines & ~mover_lines] = LOSS
+    open_positions = ~x_lines & ~o_lines
+    if level == cells:
+        values[open_positions] = DRAW
+    elif open_positions.any():
+        digits, images = digits[open_positions], images[open_positions]
+        mover = 1 if level % 2 == 0 else 2
+        # canonical code of every child: the images of the parent plus the new stone
+        children = (images[:, None, :] + mover * context.powers[None, :, :]).min(axis=2)
+        legal = digits == 0
+        child_values = _read(context.table, np.where(legal, children, 0))
+        if (child_values[legal] == UNKNOWN).any():
+            raise RuntimeError(f"level {level + 1} of {path} is not solved")
+        # a child's loss for the opponent is a win for us
+        values[open_positions] = np.where(legal, 4 - child_values.astype(np.int8), 0).max(axis=1)
+    solved = values != UNKNOWN
+    return codes[solved], values[solved]
+
+
+def _solve_block_task(args):
+    return _solve_block(*args)
+
+
+def _write_header(path, size, complete):
+    with open(path, "r+b") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, size, size, complete))
+
+
+def solve(size=4, path=None, workers=None, progress=True):
+    """Solve the size x size table into path (table_path(size) by default),
+    resuming from its checkpoint when there is one. Returns the path."""
+    import numpy as np
+
+    path = table_path(size) if path is None else path
+    checkpoint_path = _checkpoint_path(path)
+    cells = size * size
+    next_level = cells
+    if os.path.exists(path) and os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as f:
+            checkpoint = json.load(f)
+        if checkpoint["size"] != size:
+            raise ValueError(f"{checkpoint_path} is for a {checkpoint['size']}x{checkpoint['size']} table")
+        next_level = checkpoint["solved_level"] - 1
+        if progress:
+            print(f"Resuming {path} at level {next_level}")
+    elif os.path.exists(path) and SolvedTable.load(path) is not None:
+        return path
+    else:
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, size, size, 0))
+            f.truncate(HEADER.size + _table_bytes(size))
+
+    context = _context(path, size)
+    blocks = 3 ** context.high_digits
+    workers = workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(workers) if workers > 1 else None
+    table = np.memmap(path, dtype=np.uint8, mode="r+", offset=HEADER.size, shape=(_table_bytes(size),))
+    try:
+        for level in range(next_level, -1, -1):
+            start = time.perf_counter()
+            tasks = [(path, size, level, block) for block in range(blocks)]
+            results = executor.map(_solve_block_task, tasks) if executor else map(_solve_block_task, tasks)
+            count = 0
+            for codes, values in results:
+                np.bitwise_or.at(table, codes >> 2, (values << ((codes & 3) * 2).astype(np.uint8)))
+                count += len(codes)
+            table.flush()
+            tmp_path = f"{checkpoint_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"size": size, "solved_level": level}, f)
+            os.replace(tmp_path, checkpoint_path)
+            if progress:
+                print(f"level {level}: {count} positions in {time.perf_counter() - start:.1f}s")
+    finally:
+        del table
+        if executor is not None:
+            executor.shutdown()
+    _write_header(path, size, 1)
+    os.remove(checkpoint_path)
+    return path
+
+
+class SolvedTable:
+    """Lookups in a finished table, in the OpeningBook interface"""
+
+    def __init__(self, size, data):
+        self.size = size
+        self.cells = size * size
+        self.data = data  # the 2-bit values, bytes-like
+        # powers[s][i]: value of one X on cell i in the code of image s
+        self.powers = [[3 ** perm[i] for i in range(self.cells)] for perm in symmetries(size)]
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, path):
+        """The table at path, None while it is unfinished"""
+        with open(path, "rb") as f:
+            magic, version, size, k, complete = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not a solved table")
+            if not complete:
+                return None
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(size, memoryview(data)[HEADER.size:])
+
+    @classmethod
+    def load_default(cls, size):
+        path = table_path(size)
+        return cls.load(path) if os.path.exists(path) else None
+
+    def _value(self, code):
+        return self.data[code >> 2] >> ((code & 3) * 2) & 3
+
+    def value(self, board, symbol):
+        """WIN, DRAW or LOSS for symbol to move on board, None for a
+        position the table doesn't hold"""
+        images = self._images(board, symbol)
+        return None if images is None else self._value(min(images[0]))
+
+    def _images(self, board, symbol):
+        """(image codes, mover digit) of the position as an X-started game"""
+        if board.rows != self.size or board.cols != self.size or board.k != self.size:
+            return None
+        x_bits, o_bits = board.bits['X'], board.bits['O']
+        x_count, o_count = x_bits.bit_count(), o_bits.bit_count()
+        if symbol == 'O':
+            # an O-started game is the X-started one with the colours swapped
+            if x_count == o_count:
+                x_bits, o_bits = o_bits, x_bits
+            elif x_count != o_count + 1:
+                return None
+        elif o_count == x_count + 1:
+            x_bits, o_bits = o_bits, x_bits
+        elif x_count != o_count:
+            return None
+        images = []
+        for powers in self.powers:
+            code = 0
+            for bits, digit in ((x_bits, 1), (o_bits, 2)):
+                while bits:
+                    low = bits & -bits
+                    code += digit * powers[low.bit_length() - 1]
+                    bits ^= low
+            images.append(code)
+        mover = 1 if x_bits.bit_count() == o_bits.bit_count() else 2
+        return images, mover
+
+    def lookup(self, board, symbol):
+        """(best move, score) for symbol to move on a BitBoard, or None.
+        Among equally valued moves an immediate win comes first, then (when
+        losing) a move that leaves no immediate loss, then the lowest number.
+        The table has no distance to the end, so a win scores
+        win_score - empty cells, the latest it can come."""
+        found = self._images(board, symbol)
+        if found is None or board.check_winner() is not None:
+            self.misses += 1
+            return None
+        images, mover = found
+        opponent = 'O' if symbol == 'X' else 'X'
+        best = None
+        for move in board.get_available_moves():
+            cell = move - 1
+            child = min(image + mover * powers[cell] for image, powers in zip(images, self.powers))
+            value = 4 - self._value(child)
+            if value > WIN:
+                self.misses += 1
+                return None  # a child the table doesn't hold
+            board.make_move(move, symbol)
+            wins_now = board.check_winner() == symbol
+            threatened = not wins_now and any(
+                line & board.bits[symbol] == 0 and (line & board.bits[opponent]).bit_count() == board.k - 1
+                for line in board.lines)
+            board.undo_move(move)
+            key = (value, wins_now, not threatened, -move)
+            if best is None or key > best[0]:
+                best = (key, move)
+        self.hits += 1
+        (value, _, _, _), move = best
+        win_score = max(10, self.cells)
+        score = {WIN: win_score - board.empty_count(), DRAW: 0, LOSS: board.empty_count() - win_score}[value]
+        return move, score
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve every position of a size x size board backwards")
+    parser.add_argument("--size", type=int, default=4)
+    parser.add_argument("--path", default=None, help="table file (default solved_NxN.bin next to the code)")
+    parser.add_argument("--workers", type=int, default=None, help="processes per level (default: all cores)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    path = solve(args.size, args.path, args.workers)
+    table = SolvedTable.load(path)
+    from bitboard import BitBoard
+
+    value = table.value(BitBoard(args.size), 'X')
+    print(f"{path} solved in {time.perf_counter() - start:.1f}s, "
+          f"the empty board is a {({WIN: 'win', DRAW: 'draw', LOSS: 'loss'})[value]} for X")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Per-move search statistics.
+
+AIPlayer(collect_stats=True) fills one SearchStats per move and keeps it in
+player.last_stats (and every move's in player.stats_history). With
+collect_stats off the search only pays a None check per node.
+"""
+
+
+class SearchStats:
+    __slots__ = ("move", "score", "nodes", "terminal_nodes", "cutoffs_by_index",
+                 "max_depth", "elapsed", "tt_hits", "tt_misses", "book_hit")
+
+    def __init__(self):
+        self.move = None
+        self.score = None
+        self.nodes = 0
+        self.terminal_nodes = 0
+        # cutoffs_by_index[i]: beta cutoffs caused by the i-th move tried,
+        # a well ordered search has almost all of them at index 0
+        self.cutoffs_by_index = []
+        self.max_depth = 0  # deepest ply below the root that was visited
+        self.elapsed = 0.0
+        self.tt_hits = 0
+        self.tt_misses = 0
+        self.book_hit = False
+
+    def enter(self, depth):
+        # depth 0 is the position after the root move, ply 1
+        if depth >= self.max_depth:
+            self.max_depth = depth + 1
+
+    def record_cutoff(self, move_index):
+        cutoffs = self.cutoffs_by_index
+        while len(cutoffs) <= move_index:
+            cutoffs.append(0)
+        cutoffs[move_index] += 1
+
+    @property
+    def cutoffs(self):
+        return sum(self.cutoffs_by_index)
+
+    @property
+    def first_move_cutoff_rate(self):
+        total = self.cutoffs
+        return self.cutoffs_by_index[0] / total if total else 0.0
+
+    @property
+    def nodes_per_second(self):
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def branching_factor(self):
+        """Effective branching factor: nodes ** (1 / max_depth)"""
+        if self.max_depth == 0 or self.nodes == 0:
+            return 0.0
+        return self.nodes ** (1 / self.max_depth)
+
+    def as_dict(self):
+        result = {name: getattr(self, name) for name in self.__slots__}
+        result["cutoffs_by_index"] = list(self.cutoffs_by_index)
+        result["cutoffs"] = self.cutoffs
+        result["first_move_cutoff_rate"] = self.first_move_cutoff_rate
+        result["nodes_per_second"] = self.nodes_per_second
+        result["branching_factor"] = self.branching_factor
+        return result
+
+    def __repr__(self):
+        return (f"SearchStats(move={self.move}, nodes={self.nodes}, terminal={self.terminal_nodes}, "
+                f"cutoffs={self.cutoffs}, max_depth={self.max_depth}, "
+                f"nps={self.nodes_per_second:.0f}, tt={self.tt_hits}/{self.tt_misses})")
@@ -0,0 +1,115 @@
+"""
+Streaming search trace.
+
+TraceWriter has PruningVisualizer's recording API (reset, add_node,
+set_node_value, mark_pruned, visualize) but appends every event as one JSON
+line to a log file instead of building a graph, so memory stays constant
+however big the search gets. Boards are written as base-3 position codes
+(opening_book.position_code) and labels are only built when a log is
+replayed:
+
+    python search_trace.py trace.jsonl [tree]
+
+or PruningVisualizer.replay(path, tree) from code. Records, one JSON array
+per line:
+
+    ["tree", index, board size]        start of one search (one per move)
+    ["node", id, parent, depth, is_maximizing, alpha, beta, board]
+    ["value", id, value]
+    ["pruned", parent, child]
+    ["end", title, node count]
+"""
+
+import json
+import sys
+
+_encode = json.JSONEncoder(separators=(",", ":")).encode
+
+
+class TraceWriter:
+    def __init__(self, path, board_size=3):
+        self.path = path
+        # AIPlayer sets this to the size of the board being searched
+        self.board_size = board_size
+        self.node_count = 0
+        self.trees = 0
+        self._file = open(path, "a", buffering=1 << 16)
+        self._in_tree = False
+
+    def _write(self, record):
+        self._file.write(_encode(record))
+        self._file.write("\n")
+
+    def reset(self):
+        # the next node starts a new tree
+        self._in_tree = False
+        self.node_count = 0
+
+    def add_node(self, board_state, depth, is_maximizing, alpha, beta, parent=None):
+        if not self._in_tree:
+            self._write(["tree", self.trees, self.board_size])
+            self.trees += 1
+            self._in_tree = True
+        node_id = self.node_count
+        self.node_count += 1
+        self._write(["node", node_id, parent, depth, is_maximizing, alpha, beta, board_state])
+        return node_id
+
+    def set_node_value(self, node_id, value):
+        if node_id is None:
+            return
+        self._write(["value", node_id, value])
+
+    def mark_pruned(self, parent_id, child_id):
+        if parent_id is None or child_id is None:
+            return
+        self._write(["pruned", parent_id, child_id])
+
+    def visualize(self, title="Alpha-Beta Pruning Visualization"):
+        """Close the current tree; drawing happens offline from the log"""
+        self._write(["end", title, self.node_count])
+        self._file.flush()
+        self._in_tree = False
+        print(f"Search trace of {self.node_count} nodes appended to '{self.path}' "
+              f"(replay with: python search_trace.py {self.path} {self.trees - 1})")
+
+    def close(self):
+        self._file.close()
+
+
+def tree_offsets(path):
+    """File offsets of the "tree" records of a log, read line by line"""
+    offsets = []
+    with open(path, "rb") as f:
+        offset = 0
+        for line in f:
+            if line.startswith(b'["tree"'):
+                offsets.append(offset)
+            offset += len(line)
+    return offsets
+
+
+def read_tree(path, tree=-1):
+    """Yield the records of one tree of a log, the last one by default"""
+    offsets = tree_offsets(path)
+    if not offsets:
+        raise ValueError(f"{path} holds no search trees")
+    start = offsets[tree]
+    with open(path, "rb") as f:
+        f.seek(start)
+        for n, line in enumerate(f):
+            record = json.loads(line)
+            if record[0] == "tree" and n > 0:
+                return
+            yield record
+            if record[0] == "end":
+                return
+
+
+if __name__ == "__main__":
+    from visualization import PruningVisualizer
+
+    trace_path = sys.argv[1]
+    tree = int(sys.argv[2]) if len(sys.argv) > 2 else -1
+    visualizer, title = PruningVisualizer.replay(trace_path, tree)
+    visualizer.visualize(title)
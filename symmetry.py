@@ -0,0 +1,83 @@
+"""
+Symmetries of the tic-tac-toe board.
+
+A size x size board has 8 symmetries (4 rotations, each optionally mirrored),
+a rows x cols board with rows != cols only 4 (identity, half turn and the
+two mirrors). Every symmetry is stored as a permutation of cell indexes:
+perm[i] is the index cell i is moved to. Index 0 is always the identity.
+"""
+
+_SYMMETRY_CACHE = {}
+
+
+def symmetries(rows, cols=None):
+    """Return the cell permutations of a rows x cols board, 8 when it is
+    square (cols defaults to rows) and 4 otherwise"""
+    cols = rows if cols is None else cols
+    key = (rows, cols)
+    if key not in _SYMMETRY_CACHE:
+        n = rows - 1
+        m = cols - 1
+        transforms = (
+            lambda r, c: (r, c),          # identity
+            lambda r, c: (n - r, m - c),  # rotate 180
+            lambda r, c: (r, m - c),      # mirror left/right
+            lambda r, c: (n - r, c),      # mirror top/bottom
+        )
+        if rows == cols:
+            transforms = transforms[:1] + (
+                lambda r, c: (c, n - r),      # rotate 90
+                transforms[1],
+                lambda r, c: (n - c, r),      # rotate 270
+                transforms[2],
+                transforms[3],
+                lambda r, c: (c, r),          # main diagonal
+                lambda r, c: (n - c, n - r),  # anti diagonal
+            )
+        perms = []
+        for transform in transforms:
+            perm = []
+            for i in range(rows * cols):
+                r, c = transform(i // cols, i % cols)
+                perm.append(r * cols + c)
+            perms.append(tuple(perm))
+        _SYMMETRY_CACHE[key] = tuple(perms)
+    return _SYMMETRY_CACHE[key]
+
+
+def transform_bits(bits, perm):
+    """Apply a cell permutation to a bitmask"""
+    result = 0
+    while bits:
+        low = bits & -bits
+        result |= 1 << perm[low.bit_length() - 1]
+        bits ^= low
+    return result
+
+
+def stabilizer(board):
+    """Return the symmetries that map the board's position onto itself"""
+    x_bits = board.bits['X']
+    o_bits = board.bits['O']
+    return [
+        perm for perm in symmetries(board.rows, board.cols)
+        if transform_bits(x_bits, perm) == x_bits and transform_bits(o_bits, perm) == o_bits
+    ]
+
+
+def unique_moves(board, moves):
+    """Drop moves that a symmetry of the current position makes equivalent
+    to an earlier move. The lowest numbered move of each group is kept, so
+    the search still picks the same move the full move list would."""
+    perms = stabilizer(board)
+    if len(perms) == 1:
+        return list(moves)
+    kept = []
+    seen = set()
+    for move in sorted(moves):
+        if move in seen:
+            continue
+        kept.append(move)
+        for perm in perms:
+            seen.add(perm[move - 1] + 1)
+    return kept
@@ -0,0 +1,31 @@
+import pytest
+
+from engine import SearchEngine
+from move_server import sample_positions
+
+TT_ENGINES = (
+    dict(use_transposition=True),
+    dict(use_alpha_beta=True, use_transposition=True, move_ordering=True),
+    dict(use_alpha_beta=True, use_transposition=True, use_symmetry=True, move_ordering=True),
+    dict(use_negascout=True, use_transposition=True, move_ordering=True),
+)
+
+
+def exact_positions(size, count, min_stones):
+    # searched to the end: a warm table can't change an exact answer, while
+    # a depth-limited one may legitimately improve on a fresh search
+    return [encoding for encoding in sample_positions(size, count, seed=1)
+            if (encoding[3] | encoding[4]).bit_count() >= min_stones]
+
+
+@pytest.mark.parametrize("options", TT_ENGINES)
+@pytest.mark.parametrize("size, count, min_stones", [(3, 60, 0), (4, 60, 9)])
+def test_shared_engine_answers_for_both_sides(options, size, count, min_stones):
+    # one engine searching both sides of the same positions, as a server
+    # worker does, must answer like a fresh engine every time
+    shared = SearchEngine(**options)
+    for encoding in exact_positions(size, count, min_stones):
+        for side in ('X', 'O'):
+            got = shared.search(encoding, side)
+            want = SearchEngine(**options).search(encoding, side)
+            assert (got.move, round(got.score, 9)) == (want.move, round(want.score, 9)), (encoding, side)
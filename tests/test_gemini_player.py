@@ -0,0 +1,51 @@
+import time
+
+from board import Board
+from gemini_cache import GeminiCache
+from gemini_player import GeminiPlayer
+from gemini_stub import StubModel
+
+
+def test_fast_model_does_not_wait_for_local_search():
+    # the local search of a 4x4 move runs for most of the deadline unless
+    # it is stopped when the model answers
+    player = GeminiPlayer("Gemini", "O", model=StubModel(delay=0.05, seed=0), deadline=4.0)
+    board = Board(4)
+    board.make_move(6, 'X')
+    for _ in range(2):
+        start = time.perf_counter()
+        move = player.make_move(board)
+        seconds = time.perf_counter() - start
+        assert player.last_source == "gemini"
+        assert move in board.get_available_moves()
+        assert seconds < 1.0
+        # and its engine is free for the next search
+        assert not player.local_player.engine.stop_requested
+
+
+def test_cache_is_keyed_on_the_injected_model():
+    cache = GeminiCache(path=None)
+    player = GeminiPlayer("Gemini", "O", model=StubModel(seed=0), cache=cache, local_fallback=False)
+    board = Board(3)
+    board.make_move(5, 'X')
+    move = player.make_move(board)
+    assert player.model_name == "stub"
+    assert cache.lookup(board, 'O', "stub") == move
+    assert cache.lookup(board, 'O', "gemini-2.0-flash-lite") is None
+
+
+def test_prewarm_writes_the_cache_once(tmp_path, monkeypatch):
+    cache = GeminiCache(path=str(tmp_path / "cache.json"))
+    saves = []
+    save = cache.save
+    monkeypatch.setattr(cache, "save", lambda: (saves.append(1), save()))
+    player = GeminiPlayer("Gemini", "O", model=StubModel(delay=0.0, seed=0), cache=cache,
+                          local_fallback=False)
+    boards = []
+    for first in range(1, 10):
+        board = Board(3)
+        board.make_move(first, 'X')
+        boards.append(board)
+    assert player.prewarm(boards) == 3  # corner, edge and centre
+    assert len(saves) == 1
+    assert len(GeminiCache(path=cache.path)) == 3
@@ -0,0 +1,22 @@
+import pytest
+
+from board import Board
+from mcts import MCTSPlayer
+
+
+@pytest.mark.parametrize("size", [3, 15])
+@pytest.mark.parametrize("workers", [1, 2])
+def test_zero_time_limit_still_plays_a_move(size, workers):
+    # the deadline has passed before the first playout
+    player = MCTSPlayer("MCTS", 'O', time_limit=0, workers=workers, seed=1, verbose=False)
+    board = Board(size)
+    board.make_move(1, 'X')
+    try:
+        for _ in range(2):  # the second move starts from the reused tree
+            move = player.find_best_move(board)
+            assert move in board.get_available_moves()
+            board.make_move(move, 'O')
+            board.make_move(board.get_available_moves()[0], 'X')
+    finally:
+        player.close()
+    assert player.playouts >= 1
@@ -0,0 +1,31 @@
+import asyncio
+
+import move_server
+from engine import SearchEngine
+from move_server import ENGINE_OPTIONS, MoveServer, sample_positions
+
+
+def test_worker_engine_answers_for_both_sides():
+    # a worker keeps one engine for every request, whichever side asks
+    move_server._init_worker(ENGINE_OPTIONS)
+    for encoding in sample_positions(3, 80, seed=3):
+        for side in ('X', 'O'):
+            move, score, _, _ = move_server._search(encoding, side, None, None)
+            want = SearchEngine(**ENGINE_OPTIONS).search(encoding, side)
+            assert (move, round(score, 9)) == (want.move, round(want.score, 9)), (encoding, side)
+
+
+def test_server_answers_for_both_sides():
+    async def run(positions):
+        server = MoveServer(workers=1, max_depth=None, time_limit=None)
+        await server.start(port=0)
+        try:
+            return [(encoding, side, await server.suggest(encoding, side))
+                    for encoding in positions for side in ('X', 'O')]
+        finally:
+            await server.close()
+
+    for encoding, side, reply in asyncio.run(run(sample_positions(3, 40, seed=4))):
+        want = SearchEngine(**ENGINE_OPTIONS).search(encoding, side)
+        # a symmetric position may be answered with an equivalent move
+        assert round(reply["score"], 9) == round(want.score, 9), (encoding, side)
@@ -0,0 +1,42 @@
+import re
+import shutil
+import subprocess
+
+import pytest
+
+pytest.importorskip("networkx")
+pytest.importorskip("matplotlib")
+
+from bitboard import BitBoard  # noqa: E402
+from engine import SearchEngine  # noqa: E402
+from visualization import PruningVisualizer  # noqa: E402
+
+
+def traced_page(tmp_path, board):
+    visualizer = PruningVisualizer()
+    SearchEngine(use_alpha_beta=True, tracer=visualizer).search(board, 'X', max_depth=2)
+    path = tmp_path / "tree.html"
+    visualizer.render(path=str(path), show=False)
+    return visualizer, path.read_text(encoding="utf-8")
+
+
+@pytest.mark.parametrize("rows, cols", [(3, 3), (3, 4), (4, 2)])
+def test_html_boards_have_the_board_shape(tmp_path, rows, cols):
+    board = BitBoard(rows=rows, cols=cols, k=3)
+    board.make_move(1, 'X')
+    board.make_move(rows * cols, 'O')
+    visualizer, page = traced_page(tmp_path, board)
+    assert f"ROWS = {rows}, COLS = {cols};" in page
+
+    code = next(state for state in visualizer.node_boards.values() if isinstance(state, int))
+    expected = visualizer.format_board(code)
+    assert [len(line.split(" | ")) for line in expected.splitlines()] == [cols] * rows
+
+    node = shutil.which("node")
+    if node is None:
+        return
+    # the page's own board() must draw the same grid as format_board
+    script = re.search(r"<script>(.*?)ROOTS\.forEach", page, re.S).group(1)
+    drawn = subprocess.run([node, "-e", script + f"process.stdout.write(board({code}));"],
+                           capture_output=True, text=True, check=True).stdout
+    assert drawn == expected
@@ -0,0 +1,225 @@
+"""
+Headless self-play tournament runner.
+
+Plays many games between configured player types without menus, sleeps or
+board printing, spread over worker processes, and writes win/draw/loss
+counts, per-move latency percentiles and node counts to a JSON or CSV file.
+
+    python tournament.py alphabeta negascout --games 1000 --size 3 --workers 4 --out results.json
+
+Every pairing of the given player types plays `--games` games, alternating
+who plays X (X moves first). AI players are deterministic, so the first
+`--random-opening` plies of every game are random moves (seeded, so a run
+can be reproduced with --seed).
+"""
+
+import argparse
+import csv
+import json
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+from bitboard import BitBoard
+from player import Player
+
+# AIPlayer options of every player type
+PLAYER_TYPES = {
+    "random": None,
+    "minimax": {},
+    "alphabeta": {"use_alpha_beta": True},
+    "alphabeta-tt": {"use_alpha_beta": True, "use_transposition": True,
+                     "use_symmetry": True, "move_ordering": True},
+    "negascout": {"use_negascout": True, "use_transposition": True, "move_ordering": True},
+    "book": {"use_negascout": True, "use_transposition": True, "move_ordering": True,
+             "opening_book": True},
+}
+# MCTSPlayer options of the Monte Carlo player types
+MCTS_PLAYER_TYPES = {
+    "mcts": {"simulations": 2000},
+    "mcts-10k": {"simulations": 10000},
+}
+
+
+class RandomPlayer(Player):
+    is_human = False
+
+    def __init__(self, name, symbol, seed=None):
+        super().__init__(name, symbol)
+        self.rng = random.Random(seed)
+
+    def find_best_move(self, board):
+        return self.rng.choice(board.get_available_moves())
+
+    def make_move(self, board):
+        return self.find_best_move(board)
+
+
+def make_player(player_type, symbol, size, time_limit=None, seed=None):
+    if player_type in MCTS_PLAYER_TYPES:
+        from mcts import MCTSPlayer
+
+        options = dict(MCTS_PLAYER_TYPES[player_type])
+        if size > 3 and time_limit:
+            options["time_limit"] = time_limit
+        return MCTSPlayer(player_type, symbol, seed=seed, verbose=False, **options)
+    if player_type not in PLAYER_TYPES:
+        raise ValueError(f"unknown player type {player_type!r}, "
+                         f"choose from {sorted(PLAYER_TYPES) + sorted(MCTS_PLAYER_TYPES)}")
+    options = PLAYER_TYPES[player_type]
+    if options is None:
+        return RandomPlayer(player_type, symbol, seed)
+    from algorithm import AIPlayer
+
+    options = dict(options)
+    if size > 3 and time_limit:
+        options["time_limit"] = time_limit
+    return AIPlayer(player_type, symbol, verbose=False, **options)
+
+
+def play_game(size, x_type, o_type, seed, random_opening=1, time_limit=None):
+    """Play one silent game, returning its result and per-move measurements"""
+    rng = random.Random(seed)
+    players = {
+        'X': make_player(x_type, 'X', size, time_limit, rng.random()),
+        'O': make_player(o_type, 'O', size, time_limit, rng.random()),
+    }
+    board = BitBoard(size)
+    symbol = 'X'
+    latencies = {'X': [], 'O': []}
+    nodes = {'X': [], 'O': []}
+    moves = []
+    while board.check_winner() is None:
+        if len(moves) < random_opening:
+            move = rng.choice(board.get_available_moves())
+        else:
+            player = players[symbol]
+            start = time.perf_counter()
+            move = player.find_best_move(board)
+            latencies[symbol].append(time.perf_counter() - start)
+            nodes[symbol].append(getattr(player, "nodes_searched", getattr(player, "playouts", 0)))
+        board.make_move(move, symbol)
+        moves.append(move)
+        symbol = 'O' if symbol == 'X' else 'X'
+    return {
+        "x": x_type,
+        "o": o_type,
+        "winner": board.check_winner(),
+        "moves": moves,
+        "latencies": latencies,
+        "nodes": nodes,
+    }
+
+
+def _play_game(args):
+    return play_game(*args)
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a list, q in [0, 100]"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def schedule(player_types, games, size, seed, random_opening, time_limit):
+    """One (size, x, o, seed, ...) tuple per game, colours alternating"""
+    rng = random.Random(seed)
+    pairings = list(combinations(player_types, 2)) if len(player_types) > 1 else [(player_types[0],) * 2]
+    jobs = []
+    for a, b in pairings:
+        for game in range(games):
+            x_type, o_type = (a, b) if game % 2 == 0 else (b, a)
+            jobs.append((size, x_type, o_type, rng.getrandbits(32), random_opening, time_limit))
+    return jobs
+
+
+def summarize(results):
+    stats = {}
+    for result in results:
+        for symbol, player_type in (('X', result["x"]), ('O', result["o"])):
+            entry = stats.setdefault(player_type, {
+                "games": 0, "wins": 0, "draws": 0, "losses": 0, "latencies": [], "nodes": [],
+            })
+            entry["games"] += 1
+            if result["winner"] == 'Tie':
+                entry["draws"] += 1
+            elif result["winner"] == symbol:
+                entry["wins"] += 1
+            else:
+                entry["losses"] += 1
+            entry["latencies"].extend(result["latencies"][symbol])
+            entry["nodes"].extend(result["nodes"][symbol])
+
+    summary = {}
+    for player_type, entry in sorted(stats.items()):
+        latencies = entry.pop("latencies")
+        nodes = entry.pop("nodes")
+        entry["moves"] = len(latencies)
+        for q in (50, 90, 99):
+            value = percentile(latencies, q)
+            entry[f"latency_p{q}_ms"] = None if value is None else round(value * 1000, 3)
+        entry["latency_max_ms"] = round(max(latencies) * 1000, 3) if latencies else None
+        entry["nodes_total"] = sum(nodes)
+        entry["nodes_per_move"] = round(sum(nodes) / len(nodes), 1) if nodes else None
+        summary[player_type] = entry
+    return summary
+
+
+def run_tournament(player_types, games=100, size=3, workers=None, seed=0,
+                   random_opening=1, time_limit=0.5):
+    jobs = schedule(player_types, games, size, seed, random_opening, time_limit)
+    start = time.perf_counter()
+    if workers == 1:
+        results = [_play_game(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_play_game, jobs, chunksize=max(1, len(jobs) // 64)))
+    return {
+        "config": {
+            "players": list(player_types), "games_per_pairing": games, "size": size,
+            "seed": seed, "random_opening": random_opening, "time_limit": time_limit,
+        },
+        "games": len(results),
+        "wall_time_s": round(time.perf_counter() - start, 3),
+        "players": summarize(results),
+    }
+
+
+def write_report(report, path):
+    if path.endswith(".csv"):
+        with open(path, "w", newline="") as f:
+            rows = [{"player": name, **entry} for name, entry in report["players"].items()]
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("players", nargs="+", choices=sorted(PLAYER_TYPES) + sorted(MCTS_PLAYER_TYPES))
+    parser.add_argument("--games", type=int, default=100, help="games per pairing")
+    parser.add_argument("--size", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--random-opening", type=int, default=1, help="random plies at the start")
+    parser.add_argument("--time-limit", type=float, default=0.5,
+                        help="seconds per move for AI players on boards bigger than 3x3")
+    parser.add_argument("--out", default="tournament.json", help=".json or .csv")
+    args = parser.parse_args(argv)
+
+    report = run_tournament(args.players, args.games, args.size, args.workers, args.seed,
+                            args.random_opening, args.time_limit)
+    write_report(report, args.out)
+    print(f"{report['games']} games in {report['wall_time_s']}s, results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
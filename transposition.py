@@ -0,0 +1,68 @@
+"""
+Transposition table for the AI search.
+
+Entries live in a fixed number of slots indexed by the position's Zobrist
+hash, so memory use is capped no matter how long the table is kept around.
+Each entry stores the full key, the value, what kind of value it is and how
+many plies were searched below the position:
+
+    EXACT        the value is the true minimax value
+    LOWER_BOUND  the search failed high, the true value is >= value
+    UPPER_BOUND  the search failed low, the true value is <= value
+
+Bounds keep cached results correct under alpha-beta pruning.
+"""
+
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+REPLACEMENT_POLICIES = ("depth", "always")
+
+
+class TranspositionTable:
+    def __init__(self, max_entries=1 << 20, replacement="depth"):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        if replacement not in REPLACEMENT_POLICIES:
+            raise ValueError(f"replacement must be one of {REPLACEMENT_POLICIES}, got {replacement!r}")
+        self.max_entries = max_entries
+        self.replacement = replacement
+        self.clear()
+
+    def clear(self):
+        self.slots = [None] * self.max_entries
+        self.entries = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.collisions = 0  # stores that evicted a different position
+
+    def __len__(self):
+        return self.entries
+
+    def probe(self, key):
+        """Return (key, value, flag, depth) for key, or None"""
+        entry = self.slots[key % self.max_entries]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def store(self, key, value, flag, depth):
+        index = key % self.max_entries
+        old = self.slots[index]
+        if old is None:
+            self.entries += 1
+        elif old[0] != key:
+            # depth-preferred keeps the entry that cost the most to compute
+            if self.replacement == "depth" and old[3] > depth:
+                return
+            self.collisions += 1
+        self.slots[index] = (key, value, flag, depth)
+        self.stores += 1
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
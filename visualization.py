@@ -2,8 +2,75 @@ import networkx as nx
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 from matplotlib.colors import LinearSegmentedColormap
+from matplotlib.collections import LineCollection
+from collections import deque
+import html
+import json
 import math
 
+# trees with more nodes than this are drawn by render() instead of one
+# labelled box per node
+DETAILED_NODE_LIMIT = 150
+# render() only writes text next to the nodes of smaller drawings
+LABEL_LIMIT = 60
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<style>
+body {{ font-family: monospace; }}
+ul {{ list-style: none; padding-left: 1.5em; }}
+li.closed > ul {{ display: none; }}
+span {{ cursor: pointer; padding: 1px 4px; border-radius: 3px; }}
+.max {{ background: lightblue; }} .min {{ background: lightgreen; }}
+.pruned {{ color: red; text-decoration: line-through; }}
+</style></head><body>
+<h3>{title}</h3><p>{summary}</p><ul id="tree"></ul>
+<script>
+// [is_maximizing, value, alpha, beta, board, subtree size, pruned below, pruned, children]
+const NODES = {nodes}, ROOTS = {roots}, ROWS = {rows}, COLS = {cols};
+function board(b) {{
+  if (typeof b !== "number") return String(b);
+  const rows = [];
+  for (let r = 0; r < ROWS; r++) {{
+    const row = [];
+    for (let c = 0; c < COLS; c++) {{ row.push("_XO"[b % 3]); b = Math.floor(b / 3); }}
+    rows.push(row.join(" | "));
+  }}
+  return rows.join("\\n");
+}}
+function item(id) {{
+  const n = NODES[id], li = document.createElement("li"), span = document.createElement("span");
+  span.className = (n[0] ? "max" : "min") + (n[7] ? " pruned" : "");
+  span.textContent = `value=${{n[1]}} \u03b1=${{n[2]}} \u03b2=${{n[3]}}` +
+    (n[8].length ? ` (${{n[5]}} nodes, ${{n[6]}} pruned)` : "");
+  span.title = board(n[4]);
+  li.appendChild(span);
+  if (n[8].length) {{
+    li.className = "closed";
+    // children are only built the first time a node is opened
+    span.onclick = () => {{
+      if (li.lastChild.tagName !== "UL") {{
+        const ul = document.createElement("ul");
+        n[8].forEach(c => ul.appendChild(item(c)));
+        li.appendChild(ul);
+      }}
+      li.classList.toggle("closed");
+    }};
+  }}
+  return li;
+}}
+ROOTS.forEach(r => document.getElementById("tree").appendChild(item(r)));
+</script></body></html>
+"""
+
+
+def _json_number(value):
+    # JSON has no infinities
+    if value is None or not math.isinf(value):
+        return value
+    return "inf" if value > 0 else "-inf"
+
+
 class PruningVisualizer:
     def __init__(self):
         self.G = nx.DiGraph()
@@ -11,9 +78,11 @@ class PruningVisualizer:
         self.pruned_edges = set()
         self.node_values = {}
         self.node_depths = {}
-        self.node_labels = {}
+        self.node_bounds = {}  # alpha, beta when the node was entered
         self.node_player = {}  # To track if node is maximizing or minimizing
         self.node_boards = {}  # To store board representations
+        # size of the boards given as base-3 position codes
+        self.board_size = 3
 
     def reset(self):
         self.G = nx.DiGraph()
@@ -21,12 +90,26 @@ class PruningVisualizer:
         self.pruned_edges = set()
         self.node_values = {}
         self.node_depths = {}
-        self.node_labels = {}
+        self.node_bounds = {}
         self.node_player = {}
         self.node_boards = {}
 
+    def _board_shape(self):
+        # board_size is (rows, cols) for boards that aren't square
+        if isinstance(self.board_size, (tuple, list)):
+            return tuple(self.board_size)
+        return self.board_size, self.board_size
+
     def format_board(self, board_state):
-        """Format board state string into a readable grid"""
+        """Format board state string or base-3 position code into a readable grid"""
+        if isinstance(board_state, int):
+            rows, cols = self._board_shape()
+            cells = []
+            for _ in range(rows * cols):
+                board_state, digit = divmod(board_state, 3)
+                cells.append("_XO"[digit])
+            return "\n".join(" | ".join(cells[i * cols:(i + 1) * cols]) for i in range(rows))
+
         # Handle the root or pruned case
         if isinstance(board_state, str) and (board_state == "Root" or "Pruned" in board_state):
             return board_state
@@ -60,13 +143,7 @@ class PruningVisualizer:
         self.node_depths[node_id] = depth
         self.node_player[node_id] = is_maximizing
         self.node_boards[node_id] = board_state
-        
-        # Format the board for display
-        formatted_board = self.format_board(board_state)
-        
-        # Create label with board state and α/β values
-        label = f"α={alpha:.1f}, β={beta:.1f}\n{formatted_board}"
-        self.node_labels[node_id] = label
+        self.node_bounds[node_id] = (alpha, beta)
         
         self.G.add_node(node_id)
         
@@ -80,22 +157,193 @@ class PruningVisualizer:
             return
             
         self.node_values[node_id] = value
-        # Add value to the existing label
-        if node_id in self.node_labels:
-            # Find the first line of the label (contains alpha-beta)
-            first_line, rest = self.node_labels[node_id].split('\n', 1)
-            # Create new label with value and original content
-            self.node_labels[node_id] = f"{first_line}, value={value:.1f}\n{rest}"
+
+    def label(self, node_id):
+        # built only when drawn, formatting every board while searching is slow
+        alpha, beta = self.node_bounds[node_id]
+        first_line = f"α={alpha:.1f}, β={beta:.1f}"
+        if node_id in self.node_values:
+            first_line += f", value={self.node_values[node_id]:.1f}"
+        return f"{first_line}\n{self.format_board(self.node_boards[node_id])}"
 
     def mark_pruned(self, parent_id, child_id):
         if parent_id is None or child_id is None:
             return
         self.pruned_edges.add((parent_id, child_id))
 
+    @classmethod
+    def replay(cls, path, tree=-1):
+        """Rebuild one search tree of a search_trace log, the last one by
+        default. Returns (visualizer, title)."""
+        from search_trace import read_tree
+
+        visualizer = cls()
+        title = f"{path} tree {tree}"
+        ids = {}
+        for record in read_tree(path, tree):
+            kind = record[0]
+            if kind == "node":
+                _, node_id, parent, depth, is_maximizing, alpha, beta, board_state = record
+                ids[node_id] = visualizer.add_node(board_state, depth, is_maximizing, alpha, beta,
+                                                   ids.get(parent))
+            elif kind == "value":
+                visualizer.set_node_value(ids[record[1]], record[2])
+            elif kind == "pruned":
+                visualizer.mark_pruned(ids[record[1]], ids[record[2]])
+            elif kind == "tree":
+                visualizer.board_size = record[2]
+            elif kind == "end":
+                title = record[1]
+        return visualizer, title
+
+    def _tree(self):
+        """Return (roots, children, subtree sizes, pruned counts below)"""
+        children = {node: [] for node in self.G.nodes()}
+        for parent, child in self.G.edges():
+            children[parent].append(child)
+        has_parent = {child for kids in children.values() for child in kids}
+        roots = [node for node in children if node not in has_parent]
+        sizes = {}
+        pruned = {}
+        # children are always added after their parent
+        for node in sorted(children, reverse=True):
+            sizes[node] = 1 + sum(sizes[child] for child in children[node])
+            pruned[node] = sum(pruned[child] + ((node, child) in self.pruned_edges)
+                               for child in children[node])
+        return roots, children, sizes, pruned
+
+    def render(self, title="Alpha-Beta Pruning Visualization", max_depth=4, max_nodes=200,
+               path="pruning_visualization.png", show=True):
+        """Draw a big tree readably: at most max_depth levels and max_nodes
+        nodes, expanded breadth first, the rest collapsed into summary nodes
+        (node count, value, pruned count). Nodes and edges are drawn as one
+        scatter and two LineCollections. A path ending in .svg writes an SVG,
+        .html an interactive page holding the whole tree that builds each
+        level only when it is opened."""
+        if self.node_count == 0:
+            print("No nodes to visualize")
+            return
+        roots, children, sizes, pruned = self._tree()
+        if path.endswith(".html"):
+            self._write_html(path, title, roots, children, sizes, pruned)
+            print(f"Interactive tree of {self.node_count} nodes saved to '{path}'")
+            return
+
+        # expand breadth first while the node budget lasts
+        expanded = set()
+        levels = {root: 0 for root in roots}
+        budget = max_nodes - len(roots)
+        queue = deque(roots)
+        while queue:
+            node = queue.popleft()
+            kids = children[node]
+            if kids and levels[node] < max_depth and len(kids) <= budget:
+                expanded.add(node)
+                budget -= len(kids)
+                for child in kids:
+                    levels[child] = levels[node] + 1
+                    queue.append(child)
+
+        # leaves get consecutive x positions, parents sit over their children
+        pos = {}
+        next_x = 0
+
+        def place(node):
+            nonlocal next_x
+            if node in expanded:
+                xs = [place(child) for child in children[node]]
+                x = (xs[0] + xs[-1]) / 2
+            else:
+                x = next_x
+                next_x += 1
+            pos[node] = (x, -levels[node])
+            return x
+
+        for root in roots:
+            place(root)
+
+        regular, cut = [], []
+        for node in expanded:
+            for child in children[node]:
+                segment = (pos[node], pos[child])
+                (cut if (node, child) in self.pruned_edges else regular).append(segment)
+
+        shown = list(pos)
+        collapsed = [node for node in shown if children[node] and node not in expanded]
+        colors = []
+        sizes_pt = []
+        for node in shown:
+            if node in expanded or not children[node]:
+                colors.append('lightblue' if self.node_player.get(node, True) else 'lightgreen')
+                sizes_pt.append(60)
+            else:
+                colors.append('lightgray')
+                sizes_pt.append(60 + 30 * math.log2(sizes[node]))
+
+        width = min(40, 4 + next_x * 0.25)
+        height = min(20, 2 + 1.2 * (max(levels[node] for node in shown) + 1))
+        fig, ax = plt.subplots(figsize=(width, height))
+        ax.add_collection(LineCollection(regular, colors='black', linewidths=0.8, zorder=1))
+        ax.add_collection(LineCollection(cut, colors='red', linewidths=1.2, linestyles='dashed', zorder=1))
+        xs, ys = zip(*(pos[node] for node in shown))
+        ax.scatter(xs, ys, c=colors, s=sizes_pt, edgecolors='black', linewidths=0.5, zorder=2)
+        if len(shown) <= LABEL_LIMIT:
+            for node in shown:
+                value = self.node_values.get(node)
+                text = "" if value is None else f"{value:.1f}"
+                if node in collapsed:
+                    text += f"\n{sizes[node]} nodes\n{pruned[node]} pruned"
+                x, y = pos[node]
+                ax.text(x, y - 0.15, text, fontsize=7, ha='center', va='top')
+
+        legend_elements = [
+            patches.Patch(facecolor='lightblue', edgecolor='black', label='Maximizing Player'),
+            patches.Patch(facecolor='lightgreen', edgecolor='black', label='Minimizing Player'),
+            patches.Patch(facecolor='lightgray', edgecolor='black', label='Collapsed Subtree'),
+            patches.Patch(facecolor='white', edgecolor='red', label='Pruned Branch', linestyle='--')
+        ]
+        ax.legend(handles=legend_elements, loc='upper right')
+        total_pruned = len(self.pruned_edges)
+        fig.text(0.01, 0.01, f"Total nodes: {self.node_count}, shown: {len(shown)} "
+                             f"({len(collapsed)} collapsed), pruned branches: {total_pruned}", fontsize=9)
+        ax.set_title(title)
+        ax.autoscale_view()
+        ax.axis('off')
+        fig.tight_layout()
+        fig.savefig(path, dpi=100, bbox_inches='tight')
+        if show:
+            plt.show()
+        plt.close(fig)
+        print(f"Visualization of {len(shown)} of {self.node_count} nodes saved to '{path}'")
+
+    def _write_html(self, path, title, roots, children, sizes, pruned):
+        nodes = []
+        for node in range(self.node_count):
+            alpha, beta = self.node_bounds[node]
+            parents = list(self.G.predecessors(node))
+            nodes.append([
+                self.node_player.get(node, True), _json_number(self.node_values.get(node)),
+                _json_number(alpha), _json_number(beta), self.node_boards[node],
+                sizes[node], pruned[node], bool(parents) and (parents[0], node) in self.pruned_edges,
+                children[node],
+            ])
+        summary = f"{self.node_count} nodes, {len(self.pruned_edges)} pruned branches. " \
+                  f"Click a node to open it, hover it for the board."
+        rows, cols = self._board_shape()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(HTML_TEMPLATE.format(
+                title=html.escape(title), summary=summary, rows=rows, cols=cols,
+                nodes=json.dumps(nodes, separators=(",", ":")), roots=json.dumps(roots),
+            ))
+
     def visualize(self, title="Alpha-Beta Pruning Visualization"):
         if len(self.G.nodes()) == 0:
             print("No nodes to visualize")
             return
+        if self.node_count > DETAILED_NODE_LIMIT:
+            # a labelled box per node is slow and unreadable for big trees
+            self.render(title)
+            return
             
         plt.figure(figsize=(15, 10))
         
@@ -154,7 +402,7 @@ class PruningVisualizer:
         
         # Draw labels with variable font size
         for node, (x, y) in pos.items():
-            plt.text(x, y, self.node_labels[node], 
+            plt.text(x, y, self.label(node), 
                     fontsize=font_sizes[node],
                     ha='center', va='center',
                     bbox=dict(boxstyle='round,pad=0.5', 